@@ -0,0 +1,224 @@
+# backend/app/admission.py
+"""
+Control de admisión para la ingesta de archivos.
+Limita cuántas ingestas corren a la vez y cuántos bytes de archivos subidos
+están en memoria al mismo tiempo. Lo que no cabe espera en una cola FIFO
+acotada; si la cola está llena se responde 429 y si la espera vence, 503
+(ambos con Retry-After). Así el CRUD de zonas y rutas sigue respondiendo
+aunque lleguen varias subidas grandes juntas.
+"""
+import asyncio
+import re
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from starlette.responses import JSONResponse
+
+from .config import settings
+
+# Subidas directas: el cuerpo multipart se recibe antes de llegar al handler,
+# por eso se admiten en el middleware (las sesiones se admiten en su handler)
+DIRECT_UPLOAD_PATHS = re.compile(r"^/uploads/(trips-parquet|trips-arrow)/?$")
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> dict:
+        return {"Retry-After": str(self.retry_after)}
+
+
+class _AsyncWaiter:
+    def __init__(self, size: int):
+        self.size = size
+        self.granted = False
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def wake(self) -> None:
+        self.loop.call_soon_threadsafe(self.event.set)
+
+
+class _ThreadWaiter:
+    def __init__(self, size: int):
+        self.size = size
+        self.granted = False
+        self.event = threading.Event()
+
+    def wake(self) -> None:
+        self.event.set()
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent: int, max_inflight_bytes: int, max_queue: int,
+                 queue_timeout_seconds: float, retry_after_seconds: int):
+        self.max_concurrent = max_concurrent
+        self.max_inflight_bytes = max_inflight_bytes
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.retry_after_seconds = retry_after_seconds
+
+        self.active = 0
+        self.inflight_bytes = 0
+        self.admitted_total = 0
+        self.rejected_queue_full_total = 0
+        self.rejected_timeout_total = 0
+        self._queue = deque()
+        # Se usa desde el event loop y desde hilos (trabajos en segundo plano)
+        self._lock = threading.Lock()
+
+    # Las llamadas a estos métodos privados se hacen con self._lock tomado
+
+    def _fits(self, size: int) -> bool:
+        if self.active >= self.max_concurrent:
+            return False
+        # Un archivo más grande que el presupuesto se admite solo, sin nada más en curso
+        return self.active == 0 or self.inflight_bytes + size <= self.max_inflight_bytes
+
+    def _grant(self, waiter) -> None:
+        waiter.granted = True
+        self.active += 1
+        self.inflight_bytes += waiter.size
+        self.admitted_total += 1
+
+    def _enqueue_or_grant(self, waiter) -> None:
+        with self._lock:
+            if not self._queue and self._fits(waiter.size):
+                self._grant(waiter)
+                return
+            if len(self._queue) >= self.max_queue:
+                self.rejected_queue_full_total += 1
+                raise AdmissionRejected(429, "Too many concurrent uploads, retry later", self.retry_after_seconds)
+            self._queue.append(waiter)
+
+    def _abandon(self, waiter) -> bool:
+        """Saca de la cola a un waiter que dejó de esperar; True si ya tenía turno."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._queue.remove(waiter)
+            self.rejected_timeout_total += 1
+            # Quitarlo puede dejar pasar a los que esperaban detrás
+            woken = self._grant_queued()
+        for other in woken:
+            other.wake()
+        return False
+
+    def _grant_queued(self) -> list:
+        woken = []
+        while self._queue and self._fits(self._queue[0].size):
+            waiter = self._queue.popleft()
+            self._grant(waiter)
+            woken.append(waiter)
+        return woken
+
+    def _timeout_rejection(self) -> AdmissionRejected:
+        return AdmissionRejected(503, "Upload queue wait timed out, retry later", self.retry_after_seconds)
+
+    def release(self, size: int) -> None:
+        with self._lock:
+            self.active -= 1
+            self.inflight_bytes -= size
+            woken = self._grant_queued()
+        for waiter in woken:
+            waiter.wake()
+
+    async def acquire(self, size: int) -> int:
+        """Espera turno en el event loop; devuelve los bytes reservados (para release)."""
+        waiter = _AsyncWaiter(max(size, 0))
+        self._enqueue_or_grant(waiter)
+        if not waiter.granted:
+            try:
+                await asyncio.wait_for(waiter.event.wait(), self.queue_timeout_seconds)
+            except asyncio.TimeoutError:
+                if not self._abandon(waiter):
+                    raise self._timeout_rejection()
+            except BaseException:
+                # Cliente desconectado mientras esperaba
+                if self._abandon(waiter):
+                    self.release(waiter.size)
+                raise
+        return waiter.size
+
+    def acquire_blocking(self, size: int) -> int:
+        """Igual que acquire, para código que corre en un hilo."""
+        waiter = _ThreadWaiter(max(size, 0))
+        self._enqueue_or_grant(waiter)
+        if not waiter.granted and not waiter.event.wait(self.queue_timeout_seconds):
+            if not self._abandon(waiter):
+                raise self._timeout_rejection()
+        return waiter.size
+
+    @asynccontextmanager
+    async def slot(self, size: int):
+        reserved = await self.acquire(size)
+        try:
+            yield
+        finally:
+            self.release(reserved)
+
+    @contextmanager
+    def slot_blocking(self, size: int):
+        reserved = self.acquire_blocking(size)
+        try:
+            yield
+        finally:
+            self.release(reserved)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "active": self.active,
+                "inflight_bytes": self.inflight_bytes,
+                "queued": len(self._queue),
+                "max_concurrent": self.max_concurrent,
+                "max_inflight_bytes": self.max_inflight_bytes,
+                "max_queue": self.max_queue,
+                "admitted_total": self.admitted_total,
+                "rejected_queue_full_total": self.rejected_queue_full_total,
+                "rejected_timeout_total": self.rejected_timeout_total,
+            }
+
+
+admission_controller = AdmissionController(
+    max_concurrent=settings.ingest_max_concurrent,
+    max_inflight_bytes=settings.ingest_max_inflight_bytes,
+    max_queue=settings.ingest_max_queue,
+    queue_timeout_seconds=settings.ingest_queue_timeout_seconds,
+    retry_after_seconds=settings.ingest_retry_after_seconds,
+)
+
+
+class AdmissionMiddleware:
+    """Admite las subidas directas antes de que se reciba y parsee su cuerpo."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not DIRECT_UPLOAD_PATHS.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length", b"0")
+        try:
+            size = int(content_length)
+        except ValueError:
+            size = 0
+
+        try:
+            reserved = await admission_controller.acquire(size)
+        except AdmissionRejected as e:
+            response = JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission_controller.release(reserved)
@@ -0,0 +1,115 @@
+# backend/app/changes.py
+"""
+Registro de cambios (change feed) de zonas y rutas.
+Cada mutación del store publica un evento con número de secuencia creciente en
+un ring buffer en memoria; los clientes se reanudan desde el último que vieron.
+"""
+import asyncio
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from .config import settings
+
+
+def _jsonable(record: dict) -> dict:
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in record.items()}
+
+
+class ChangeFeed:
+    def __init__(self, capacity: int):
+        self._events = deque(maxlen=capacity)
+        self._seq = 0
+        # Identifica esta instancia del feed: al reiniciar el proceso la secuencia
+        # vuelve a empezar y las réplicas lo detectan porque cambia el epoch
+        self.epoch = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        # Suscriptores async esperando eventos nuevos: {(loop, asyncio.Event)}
+        self._waiters = set()
+
+    @property
+    def latest_seq(self) -> int:
+        return self._seq
+
+    def _oldest_unlocked(self) -> int:
+        return self._events[0]["seq"] if self._events else self._seq + 1
+
+    @property
+    def oldest_seq(self) -> int:
+        """Secuencia del evento más antiguo que sigue en el buffer (latest + 1 si está vacío)."""
+        with self._lock:
+            return self._oldest_unlocked()
+
+    def publish(self, entity: str, op: str, record_id: int, record: Optional[dict] = None) -> dict:
+        """Registra un cambio. entity: zone|route; op: create|update|delete."""
+        with self._lock:
+            self._seq += 1
+            event = {
+                "seq": self._seq,
+                "ts": time.time(),
+                "entity": entity,
+                "op": op,
+                "id": record_id,
+                "data": _jsonable(record) if record is not None else None,
+            }
+            self._events.append(event)
+            waiters = list(self._waiters)
+        # Despertar a los suscriptores en su propio event loop (publish puede
+        # llamarse desde el threadpool)
+        for loop, wakeup in waiters:
+            loop.call_soon_threadsafe(wakeup.set)
+        return event
+
+    def since(self, seq: int, limit: Optional[int] = None) -> Tuple[List[dict], bool]:
+        """
+        Eventos con secuencia > seq. El segundo valor indica si hubo eventos que
+        ya salieron del buffer, o si seq es posterior a la última secuencia (el
+        proceso se reinició y el feed volvió a empezar): en ambos casos el
+        cliente debe volver a cargar todo.
+        """
+        with self._lock:
+            truncated = self._oldest_unlocked() > seq + 1 or seq > self._seq
+            if not self._events or self._events[-1]["seq"] <= seq:
+                return [], truncated
+            # Los eventos son consecutivos: se ubica el inicio sin recorrer el buffer
+            start = max(0, seq + 1 - self._events[0]["seq"])
+            end = len(self._events) if limit is None else min(len(self._events), start + limit)
+            return [self._events[i] for i in range(start, end)], truncated
+
+    def reset(self) -> int:
+        """
+        Descarta el buffer y avanza la secuencia: quien estaba en una posición
+        anterior recibe truncated y vuelve a cargar todo (el store se reemplazó entero).
+        """
+        with self._lock:
+            self._events.clear()
+            self._seq += 1
+            waiters = list(self._waiters)
+        for loop, wakeup in waiters:
+            loop.call_soon_threadsafe(wakeup.set)
+        return self._seq
+
+    async def wait(self, seq: int, timeout: float) -> bool:
+        """Espera hasta que haya eventos posteriores a seq; False si vence el timeout."""
+        if self._seq > seq:
+            return True
+        wakeup = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), wakeup)
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            if self._seq > seq:
+                return True
+            await asyncio.wait_for(wakeup.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+change_feed = ChangeFeed(settings.change_feed_capacity)
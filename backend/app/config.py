@@ -0,0 +1,52 @@
+# backend/app/config.py
+"""
+Configuración del servicio leída de variables de entorno.
+"""
+import os
+import tempfile
+
+from pydantic_settings import BaseSettings
+
+
+class Settings(BaseSettings):
+    # Carpeta donde se guardan los bloques de las subidas por partes
+    upload_spool_dir: str = os.path.join(tempfile.gettempdir(), "trips-uploads")
+    # Tiempo que se conserva una subida incompleta antes de descartarla
+    upload_session_ttl_seconds: int = 24 * 60 * 60
+    # Eventos que conserva el change feed (GET /changes) antes de descartar los más antiguos
+    change_feed_capacity: int = 10_000
+    # Respuestas guardadas para reintentos con Idempotency-Key
+    idempotency_max_entries: int = 10_000
+    idempotency_ttl_seconds: int = 24 * 60 * 60
+    # Control de admisión de la ingesta (POST /uploads/...)
+    ingest_max_concurrent: int = 2
+    ingest_max_inflight_bytes: int = 512 * 1024 * 1024
+    ingest_max_queue: int = 8
+    ingest_queue_timeout_seconds: float = 30.0
+    ingest_retry_after_seconds: int = 10
+    # Planes de ingesta (mode=plan) que se guardan para aplicarlos después
+    upload_plan_max_entries: int = 32
+    upload_plan_ttl_seconds: int = 60 * 60
+    # Hilos que decodifican row groups en paralelo (0 = uno por CPU)
+    ingest_decode_workers: int = 0
+    # GeoJSON (lon/lat) de las zonas TLC para asignar zonas a coordenadas; vacío = sin geometría
+    taxi_zones_geojson: str = ""
+    # taxi_zone_lookup.csv (o parquet) de TLC: nombres reales para las zonas nuevas de la ingesta
+    taxi_zone_lookup: str = ""
+    # Importar pandas/pyarrow en segundo plano al arrancar (si no, en la primera subida)
+    prewarm_ingest: bool = True
+    # Replicación: con la URL del líder este proceso es una réplica de solo lectura
+    replication_leader_url: str = ""
+    # Espera máxima de cada long poll a /replication/log y eventos por respuesta
+    replication_poll_seconds: float = 10.0
+    replication_batch_size: int = 1000
+    # Pausa antes de reintentar cuando el líder no responde
+    replication_retry_seconds: float = 1.0
+    # Monitor del event loop (GET /health/diagnostics): cada cuánto se mide el
+    # lag y desde qué retraso se considera que un handler bloqueó el loop
+    loop_monitor: bool = True
+    loop_monitor_interval_seconds: float = 0.1
+    loop_block_threshold_seconds: float = 0.25
+
+
+settings = Settings()
@@ -0,0 +1,215 @@
+# backend/app/diagnostics.py
+"""
+Monitor del event loop y del threadpool.
+Una tarea en el loop despierta cada `interval` segundos: el retraso con el que
+despierta es el lag del loop (cuánto esperan las corrutinas listas para correr)
+y en cada despertar se anota la ocupación del threadpool de Starlette (el
+CapacityLimiter de anyio que usan los handlers sync y run_in_threadpool).
+Un hilo watchdog vigila ese latido: si se atrasa más de `block_threshold`, el
+loop está bloqueado y el watchdog toma el stack del hilo del loop para atribuir
+el bloqueo a la petición cuya tarea está corriendo (DiagnosticsMiddleware
+registra qué tarea atiende cada petición) y a la línea donde está detenido.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+import anyio.to_thread
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Muestras de lag que se conservan (a 0.1 s por muestra, el último minuto)
+LAG_WINDOW = 600
+# Bloqueos atribuidos que se conservan
+BLOCKING_WINDOW = 50
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _frame_location(frame) -> str:
+    return f"{frame.f_code.co_filename}:{frame.f_lineno} in {frame.f_code.co_name}"
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = 0.1, block_threshold: float = 0.25):
+        self.interval = interval
+        self.block_threshold = block_threshold
+
+        self.started_at: Optional[float] = None
+        self._lags = deque(maxlen=LAG_WINDOW)
+        self.lag_max = 0.0
+        self.blocked_total = 0
+        self.blocking = deque(maxlen=BLOCKING_WINDOW)
+
+        self.threadpool_active = 0
+        self.threadpool_capacity = 0
+        self.threadpool_queued = 0
+        self.threadpool_max_queued = 0
+        self.threadpool_saturated_samples = 0
+
+        # Peticiones en curso: {id(tarea): (tarea, scope)}
+        self._requests: Dict[int, Tuple[asyncio.Task, dict]] = {}
+        self._lock = threading.Lock()
+        # Último latido del loop (time.monotonic) y bloqueo detectado por el watchdog
+        self._beat = time.monotonic()
+        self._pending: Optional[dict] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    # PETICIONES EN CURSO (llamadas desde el loop por el middleware)
+
+    def request_started(self, task: asyncio.Task, scope: dict) -> None:
+        with self._lock:
+            self._requests[id(task)] = (task, scope)
+
+    def request_finished(self, task: asyncio.Task) -> None:
+        with self._lock:
+            self._requests.pop(id(task), None)
+
+    # LATIDO EN EL LOOP
+
+    def start(self) -> None:
+        """Arranca el latido en el loop actual y el watchdog; se llama desde el lifespan."""
+        self.started_at = time.time()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self) -> None:
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            self._record_lag(max(now - expected, 0.0))
+            self._record_threadpool(limiter.statistics())
+
+    def _record_lag(self, lag: float) -> None:
+        self._lags.append(lag)
+        self.lag_max = max(self.lag_max, lag)
+        pending, self._pending = self._pending, None
+        if lag < self.block_threshold:
+            return
+        self.blocked_total += 1
+        # Sin atribución si el watchdog no llegó a ver el bloqueo
+        event = pending or {"at": time.time() - lag, "handler": None, "path": None, "location": None}
+        event["lag_ms"] = lag * 1000
+        self.blocking.append(event)
+        logger.warning("event loop blocked %.0f ms by %s (%s)", event["lag_ms"], event["handler"], event["location"])
+
+    def _record_threadpool(self, stats) -> None:
+        self.threadpool_active = stats.borrowed_tokens
+        self.threadpool_capacity = int(stats.total_tokens)
+        self.threadpool_queued = stats.tasks_waiting
+        self.threadpool_max_queued = max(self.threadpool_max_queued, stats.tasks_waiting)
+        if stats.borrowed_tokens >= stats.total_tokens:
+            self.threadpool_saturated_samples += 1
+
+    # WATCHDOG (hilo aparte)
+
+    def _watchdog(self) -> None:
+        while not self._stop.wait(self.interval / 2):
+            late = time.monotonic() - self._beat - self.interval
+            if late > self.block_threshold and self._pending is None:
+                self._pending = self._attribute(late)
+
+    def _attribute(self, late: float) -> dict:
+        """Qué está corriendo en el hilo del loop: la petición dueña de la tarea y la línea actual."""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = set()
+        innermost = frame
+        while frame is not None:
+            stack.add(frame)
+            frame = frame.f_back
+        handler = path = None
+        with self._lock:
+            requests = list(self._requests.values())
+        for task, scope in requests:
+            coro = task.get_coro()
+            if getattr(coro, "cr_frame", None) in stack:
+                # El router de Starlette deja el endpoint y la ruta en el scope
+                endpoint = scope.get("endpoint")
+                route = scope.get("route")
+                handler = f"{endpoint.__module__}.{endpoint.__qualname__}" if endpoint else None
+                path = f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+                break
+        return {
+            "at": time.time() - late - self.interval,
+            "handler": handler,
+            "path": path,
+            "location": _frame_location(innermost) if innermost is not None else None,
+        }
+
+    def snapshot(self) -> dict:
+        lags = list(self._lags)
+        recent = [event for event in self.blocking if event["at"] >= time.time() - 60]
+        return {
+            "status": "degraded" if recent or self.threadpool_queued else "ok",
+            "running": self._task is not None,
+            "uptime_seconds": time.time() - self.started_at if self.started_at else 0.0,
+            "event_loop": {
+                "interval_ms": self.interval * 1000,
+                "block_threshold_ms": self.block_threshold * 1000,
+                "samples": len(lags),
+                "lag_ms_last": lags[-1] * 1000 if lags else 0.0,
+                "lag_ms_p50": _percentile(lags, 0.5) * 1000,
+                "lag_ms_p99": _percentile(lags, 0.99) * 1000,
+                "lag_ms_max": self.lag_max * 1000,
+                "blocked_total": self.blocked_total,
+            },
+            "threadpool": {
+                "active": self.threadpool_active,
+                "capacity": self.threadpool_capacity,
+                "queued": self.threadpool_queued,
+                "max_queued": self.threadpool_max_queued,
+                "saturated_samples": self.threadpool_saturated_samples,
+            },
+            "in_flight_requests": len(self._requests),
+            "blocking": list(reversed(self.blocking)),
+        }
+
+
+loop_monitor = LoopMonitor(
+    interval=settings.loop_monitor_interval_seconds,
+    block_threshold=settings.loop_block_threshold_seconds,
+)
+
+
+class DiagnosticsMiddleware:
+    """Registra qué tarea atiende cada petición para atribuirle los bloqueos del loop."""
+
+    def __init__(self, app, monitor: LoopMonitor = loop_monitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        task = asyncio.current_task()
+        self.monitor.request_started(task, scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.monitor.request_finished(task)
@@ -0,0 +1,154 @@
+# backend/app/export.py
+"""
+Exportación en streaming de zonas y rutas.
+Los registros se serializan por lotes a medida que se envían, así la memoria
+no crece con el tamaño del store y el primer byte sale de inmediato.
+pyarrow se importa recién al exportar en parquet/arrow (no en el arranque).
+"""
+import json
+from datetime import datetime
+from typing import Iterable, Iterator, List, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+# Registros por lote (una línea NDJSON por registro, un record batch por lote)
+EXPORT_BATCH_SIZE = 10_000
+
+# Columnas exportadas: (nombre, tipo arrow); el schema se arma al exportar
+ExportFields = List[Tuple[str, str]]
+
+ZONE_EXPORT_FIELDS: ExportFields = [
+    ("id", "int64"),
+    ("borough", "string"),
+    ("zone_name", "string"),
+    ("service_zone", "string"),
+    ("active", "bool"),
+    ("lat", "double"),
+    ("lon", "double"),
+    ("created_at", "timestamp[us]"),
+]
+
+ROUTE_EXPORT_FIELDS: ExportFields = [
+    ("id", "int64"),
+    ("pickup_zone_id", "int64"),
+    ("dropoff_zone_id", "int64"),
+    ("name", "string"),
+    ("active", "bool"),
+    ("created_at", "timestamp[us]"),
+]
+
+
+def arrow_schema(fields: ExportFields):
+    import pyarrow as pa
+
+    return pa.schema([(name, pa.type_for_alias(type_name)) for name, type_name in fields])
+
+
+class _ChunkSink:
+    """
+    Archivo de solo escritura para los writers de pyarrow: acumula los bytes
+    escritos hasta que se vacían con drain(). tell() reporta la posición total,
+    que el writer de parquet necesita para los offsets del footer.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _batches(records: Iterable[dict], size: int) -> Iterator[list]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_ndjson(records: Iterable[dict]) -> Iterator[bytes]:
+    for batch in _batches(records, EXPORT_BATCH_SIZE):
+        yield "".join(json.dumps(record, default=_json_default) + "\n" for record in batch).encode()
+
+
+def _record_batch(batch: list, schema):
+    import pyarrow as pa
+
+    # Construcción por columnas: una lista por campo del schema
+    columns = [[record.get(name) for record in batch] for name in schema.names]
+    return pa.record_batch(columns, schema=schema)
+
+
+def iter_columnar(records: Iterable[dict], fields: ExportFields, export_format: str) -> Iterator[bytes]:
+    """Escribe un record batch por lote en formato parquet o Arrow IPC stream."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(fields)
+    sink = _ChunkSink()
+    if export_format == "parquet":
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    for batch in _batches(records, EXPORT_BATCH_SIZE):
+        writer.write_batch(_record_batch(batch, schema))
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
+
+
+def export_response(records: Iterable[dict], fields: ExportFields, export_format: str, name: str) -> StreamingResponse:
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    media_type, extension = EXPORT_FORMATS[export_format]
+
+    if export_format == "ndjson":
+        body = iter_ndjson(records)
+    else:
+        body = iter_columnar(records, fields, export_format)
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{extension}"'}
+    )
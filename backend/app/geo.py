@@ -0,0 +1,256 @@
+# backend/app/geo.py
+"""
+Asignación de zonas TLC a coordenadas (archivos anteriores a 2016, que traen
+pickup_longitude/latitude en lugar de PULocationID).
+Los polígonos de las zonas (GeoJSON en lon/lat) se indexan en una grilla
+regular: cada celda guarda las zonas cuyo bounding box la toca y, si ningún
+borde de polígono la cruza, directamente la zona que la contiene. Los puntos
+que caen en celdas de borde se resuelven con un test par/impar (ray casting)
+vectorizado solo contra las zonas candidatas de su celda.
+"""
+import json
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import settings
+from .ingest_types import IngestError
+
+logger = logging.getLogger(__name__)
+
+# Propiedades del GeoJSON donde se busca el ID de zona (TLC / NYC Open Data)
+ZONE_ID_PROPERTIES = ("LocationID", "location_id", "locationid", "LOCATIONID")
+
+# Celdas por lado de la grilla
+DEFAULT_GRID_SIZE = 256
+# Pares (punto, borde) evaluados por bloque en el ray casting
+_PIP_BLOCK = 1 << 22
+
+
+def _polygon_rings(geometry: dict) -> List[np.ndarray]:
+    if geometry is None:
+        return []
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        return []
+    return [np.asarray(ring, dtype=np.float64)[:, :2] for polygon in polygons for ring in polygon if len(ring) >= 3]
+
+
+def _feature_zone_id(feature: dict, id_property: Optional[str]) -> int:
+    properties = feature.get("properties") or {}
+    names = (id_property,) if id_property else ZONE_ID_PROPERTIES
+    for name in names:
+        if properties.get(name) is not None:
+            try:
+                return int(float(properties[name]))
+            except (TypeError, ValueError):
+                break
+    raise IngestError(f"Every feature needs a numeric zone id property ({', '.join(names)})")
+
+
+class _Zone:
+    """Bordes de todos los anillos de una zona (exteriores y huecos, de todas sus partes)."""
+
+    def __init__(self, zone_id: int, rings: List[np.ndarray]):
+        self.zone_id = zone_id
+        starts = np.concatenate([ring for ring in rings])
+        ends = np.concatenate([np.roll(ring, -1, axis=0) for ring in rings])
+        # Todos los bordes (también los horizontales) marcan celdas de borde en la grilla
+        self.edge_x0, self.edge_y0 = starts[:, 0], starts[:, 1]
+        self.edge_x1, self.edge_y1 = ends[:, 0], ends[:, 1]
+        # Para el ray casting se descartan los horizontales: nunca cruzan el rayo
+        keep = starts[:, 1] != ends[:, 1]
+        self.x0, self.y0 = starts[keep, 0], starts[keep, 1]
+        self.x1, self.y1 = ends[keep, 0], ends[keep, 1]
+        self.bounds = (starts[:, 0].min(), starts[:, 1].min(), starts[:, 0].max(), starts[:, 1].max())
+
+    def contains(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Regla par/impar: un rayo hacia +x cruza una cantidad impar de bordes si el punto está dentro."""
+        inside = np.zeros(len(x), dtype=bool)
+        if len(x) == 0 or len(self.x0) == 0:
+            return inside
+        step = max(1, _PIP_BLOCK // len(self.x0))
+        for begin in range(0, len(x), step):
+            px = x[begin:begin + step, None]
+            py = y[begin:begin + step, None]
+            spans = (self.y0 > py) != (self.y1 > py)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cross_x = self.x0 + (py - self.y0) * (self.x1 - self.x0) / (self.y1 - self.y0)
+            crossings = np.count_nonzero(spans & (px < cross_x), axis=1)
+            inside[begin:begin + step] = crossings % 2 == 1
+        return inside
+
+
+class ZoneLocator:
+    def __init__(self, zones: Dict[int, List[np.ndarray]], grid_size: int = DEFAULT_GRID_SIZE):
+        if not zones:
+            raise IngestError("Zone geometry has no polygons")
+        self.zones = [_Zone(zone_id, rings) for zone_id, rings in sorted(zones.items())]
+        self.grid_size = grid_size
+
+        bounds = np.array([zone.bounds for zone in self.zones])
+        self.min_x, self.min_y = bounds[:, 0].min(), bounds[:, 1].min()
+        self.max_x, self.max_y = bounds[:, 2].max(), bounds[:, 3].max()
+        self.cell_w = (self.max_x - self.min_x) / grid_size or 1.0
+        self.cell_h = (self.max_y - self.min_y) / grid_size or 1.0
+
+        self._build_candidates(bounds)
+        self._build_cell_labels()
+
+    @classmethod
+    def from_geojson(cls, data: dict, id_property: Optional[str] = None,
+                     grid_size: int = DEFAULT_GRID_SIZE) -> "ZoneLocator":
+        """FeatureCollection con Polygon/MultiPolygon en lon/lat (EPSG:4326)."""
+        if data.get("type") != "FeatureCollection":
+            raise IngestError("Zone geometry must be a GeoJSON FeatureCollection")
+        zones: Dict[int, List[np.ndarray]] = {}
+        for feature in data.get("features", []):
+            rings = _polygon_rings(feature.get("geometry"))
+            if rings:
+                zones.setdefault(_feature_zone_id(feature, id_property), []).extend(rings)
+        return cls(zones, grid_size=grid_size)
+
+    def _cell_range(self, low: np.ndarray, high: np.ndarray, origin: float, size: float) -> Tuple[np.ndarray, np.ndarray]:
+        first = np.clip(((low - origin) / size).astype(np.int64), 0, self.grid_size - 1)
+        last = np.clip(((high - origin) / size).astype(np.int64), 0, self.grid_size - 1)
+        return first, last
+
+    def _build_candidates(self, bounds: np.ndarray) -> None:
+        """CSR celda -> índices de zonas cuyo bounding box toca la celda."""
+        ix0, ix1 = self._cell_range(bounds[:, 0], bounds[:, 2], self.min_x, self.cell_w)
+        iy0, iy1 = self._cell_range(bounds[:, 1], bounds[:, 3], self.min_y, self.cell_h)
+        cells, owners = [], []
+        for index in range(len(self.zones)):
+            xs, ys = np.meshgrid(np.arange(ix0[index], ix1[index] + 1), np.arange(iy0[index], iy1[index] + 1))
+            cells.append((ys * self.grid_size + xs).ravel())
+            owners.append(np.full(cells[-1].size, index))
+        cells, owners = np.concatenate(cells), np.concatenate(owners)
+        order = np.argsort(cells, kind="stable")
+        self._candidates = owners[order]
+        counts = np.bincount(cells, minlength=self.grid_size * self.grid_size)
+        self._candidate_start = np.concatenate([[0], np.cumsum(counts)])
+
+    def _build_cell_labels(self) -> None:
+        """Zona de cada celda sin bordes que la crucen (0 = fuera de toda zona, -1 = celda de borde)."""
+        n = self.grid_size
+        boundary = np.zeros(n * n, dtype=bool)
+        for zone in self.zones:
+            # Bounding box de cada borde: marca (de más) las celdas que el borde puede cruzar
+            ix0, ix1 = self._cell_range(np.minimum(zone.edge_x0, zone.edge_x1),
+                                        np.maximum(zone.edge_x0, zone.edge_x1), self.min_x, self.cell_w)
+            iy0, iy1 = self._cell_range(np.minimum(zone.edge_y0, zone.edge_y1),
+                                        np.maximum(zone.edge_y0, zone.edge_y1), self.min_y, self.cell_h)
+            single = (ix0 == ix1) & (iy0 == iy1)
+            boundary[iy0[single] * n + ix0[single]] = True
+            for x0, x1, y0, y1 in zip(ix0[~single], ix1[~single], iy0[~single], iy1[~single]):
+                boundary.reshape(n, n)[y0:y1 + 1, x0:x1 + 1] = True
+
+        # Las celdas interiores toman la zona que contiene su centro
+        cells = np.arange(n * n)
+        centers_x = self.min_x + (cells % n + 0.5) * self.cell_w
+        centers_y = self.min_y + (cells // n + 0.5) * self.cell_h
+        labels = self._classify(centers_x, centers_y, cells)
+        labels[boundary] = -1
+        self._cell_labels = labels
+
+    def _classify(self, x: np.ndarray, y: np.ndarray, cells: np.ndarray) -> np.ndarray:
+        """Ray casting de cada punto contra las zonas candidatas de su celda."""
+        result = np.zeros(len(x), dtype=np.int64)
+        counts = self._candidate_start[cells + 1] - self._candidate_start[cells]
+        if not counts.any():
+            return result
+        # Pares (punto, zona candidata), agrupados por zona
+        points = np.repeat(np.arange(len(x)), counts)
+        offsets = np.arange(len(points)) - np.repeat(np.cumsum(counts) - counts, counts)
+        zones = self._candidates[self._candidate_start[cells][points] + offsets]
+        order = np.argsort(zones, kind="stable")
+        points, zones = points[order], zones[order]
+        bounds = np.flatnonzero(np.diff(zones)) + 1
+        for group_points, zone_index in zip(np.split(points, bounds), zones[np.concatenate([[0], bounds])]):
+            # Un punto ya asignado no se vuelve a probar (zonas superpuestas: gana la de menor ID)
+            group_points = group_points[result[group_points] == 0]
+            zone = self.zones[zone_index]
+            inside = zone.contains(x[group_points], y[group_points])
+            result[group_points[inside]] = zone.zone_id
+        return result
+
+    def locate(self, x, y) -> np.ndarray:
+        """ID de zona de cada punto (lon, lat); 0 si cae fuera de todas o es nulo/NaN."""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        result = np.zeros(len(x), dtype=np.int64)
+        valid = ((x >= self.min_x) & (x <= self.max_x) & (y >= self.min_y) & (y <= self.max_y))
+        index = np.flatnonzero(valid)
+        if index.size == 0:
+            return result
+        n = self.grid_size
+        ix = np.minimum(((x[index] - self.min_x) / self.cell_w).astype(np.int64), n - 1)
+        iy = np.minimum(((y[index] - self.min_y) / self.cell_h).astype(np.int64), n - 1)
+        cells = iy * n + ix
+        labels = self._cell_labels[cells]
+        result[index] = np.maximum(labels, 0)
+        on_boundary = labels < 0
+        if on_boundary.any():
+            edge = index[on_boundary]
+            result[edge] = self._classify(x[edge], y[edge], cells[on_boundary])
+        return result
+
+    def summary(self) -> dict:
+        return {
+            "zones": len(self.zones),
+            "edges": int(sum(len(zone.edge_x0) for zone in self.zones)),
+            "grid_size": self.grid_size,
+            "boundary_cells": int(np.count_nonzero(self._cell_labels < 0)),
+            "bounds": [float(self.min_x), float(self.min_y), float(self.max_x), float(self.max_y)],
+        }
+
+
+# Geometría cargada: se sube por POST /uploads/zone-geometry o se lee de
+# settings.taxi_zones_geojson la primera vez que se necesita. La lectura del
+# archivo se intenta una sola vez: si falla, el error queda para la ingesta y
+# GET /uploads/zone-geometry
+_locator: Optional[ZoneLocator] = None
+_locator_error: Optional[str] = None
+_geojson_attempted = False
+_locator_lock = threading.Lock()
+
+
+def load_zone_geojson(raw: bytes, id_property: Optional[str] = None) -> ZoneLocator:
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        raise IngestError("Zone geometry must be valid GeoJSON")
+    return ZoneLocator.from_geojson(data, id_property=id_property)
+
+
+def set_zone_locator(locator: Optional[ZoneLocator]) -> None:
+    """Reemplaza la geometría; con None se vuelve a intentar settings.taxi_zones_geojson."""
+    global _locator, _locator_error, _geojson_attempted
+    with _locator_lock:
+        _locator = locator
+        _locator_error = None
+        _geojson_attempted = locator is not None
+
+
+def get_zone_locator() -> Optional[ZoneLocator]:
+    global _locator, _locator_error, _geojson_attempted
+    with _locator_lock:
+        if _locator is None and settings.taxi_zones_geojson and not _geojson_attempted:
+            _geojson_attempted = True
+            try:
+                with open(settings.taxi_zones_geojson, "rb") as geojson:
+                    _locator = load_zone_geojson(geojson.read())
+            except (OSError, IngestError) as e:
+                _locator_error = f"Could not load {settings.taxi_zones_geojson}: {e}"
+                logger.error("%s; coordinate uploads are rejected until zone geometry is loaded", _locator_error)
+        return _locator
+
+
+def zone_locator_error() -> Optional[str]:
+    """Por qué no se pudo leer TAXI_ZONES_GEOJSON (None si no hubo error)."""
+    return _locator_error
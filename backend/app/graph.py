@@ -0,0 +1,138 @@
+# backend/app/graph.py
+"""
+Consultas sobre el grafo dirigido de rutas entre zonas.
+Trabajan sobre los índices de adyacencia de storage (out_edges / in_edges),
+así que el costo depende de las aristas visitadas y no del total de rutas.
+"""
+from typing import Dict, List, Optional
+
+from .storage import in_edges, out_edges, routes_db, store_lock
+
+DIRECTIONS = ("out", "in", "both")
+
+
+def _is_active_edge(route_ids) -> bool:
+    return any(routes_db[route_id]["active"] for route_id in route_ids if route_id in routes_db)
+
+
+def _indexes(direction: str):
+    if direction == "out":
+        return (out_edges,)
+    if direction == "in":
+        return (in_edges,)
+    return (out_edges, in_edges)
+
+
+def neighbors(zone_id: int, direction: str = "out", active_only: bool = False) -> Dict[int, set]:
+    """Zonas vecinas -> IDs de las rutas que las conectan con zone_id."""
+    result: Dict[int, set] = {}
+    with store_lock:
+        for index in _indexes(direction):
+            for other_id, route_ids in index.get(zone_id, {}).items():
+                if active_only and not _is_active_edge(route_ids):
+                    continue
+                result.setdefault(other_id, set()).update(route_ids)
+    return result
+
+
+def degree(zone_id: int) -> dict:
+    with store_lock:
+        outgoing = out_edges.get(zone_id, {})
+        incoming = in_edges.get(zone_id, {})
+        return {
+            "out_degree": len(outgoing),
+            "in_degree": len(incoming),
+            "out_routes": sum(len(route_ids) for route_ids in outgoing.values()),
+            "in_routes": sum(len(route_ids) for route_ids in incoming.values()),
+        }
+
+
+def reachable(zone_id: int, k: int, direction: str = "out", active_only: bool = False) -> Dict[int, int]:
+    """BFS acotado a k saltos: zona alcanzada -> número mínimo de saltos."""
+    with store_lock:
+        return _reachable(zone_id, k, direction, active_only)
+
+
+def _reachable(zone_id: int, k: int, direction: str, active_only: bool) -> Dict[int, int]:
+    indexes = _indexes(direction)
+    hops = {zone_id: 0}
+    frontier = [zone_id]
+    for level in range(1, k + 1):
+        next_frontier = []
+        for current in frontier:
+            for index in indexes:
+                for other_id, route_ids in index.get(current, {}).items():
+                    if other_id in hops:
+                        continue
+                    if active_only and not _is_active_edge(route_ids):
+                        continue
+                    hops[other_id] = level
+                    next_frontier.append(other_id)
+        if not next_frontier:
+            break
+        frontier = next_frontier
+    del hops[zone_id]
+    return hops
+
+
+def _expand_level(frontier, index, depth, parent, other_depth, active_only):
+    """Expande un nivel completo del BFS; devuelve el nuevo frontier y los nodos que tocan la otra búsqueda."""
+    next_frontier = []
+    meetings = []
+    for current in frontier:
+        for other_id, route_ids in index.get(current, {}).items():
+            if other_id in depth:
+                continue
+            if active_only and not _is_active_edge(route_ids):
+                continue
+            depth[other_id] = depth[current] + 1
+            parent[other_id] = current
+            next_frontier.append(other_id)
+            if other_id in other_depth:
+                meetings.append(other_id)
+    return next_frontier, meetings
+
+
+def shortest_path(source: int, target: int, active_only: bool = False) -> Optional[List[int]]:
+    """
+    Camino con menos saltos de source a target siguiendo la dirección de las rutas.
+    BFS bidireccional: se expande siempre el frontier más pequeño, nivel por nivel.
+    """
+    with store_lock:
+        return _shortest_path(source, target, active_only)
+
+
+def _shortest_path(source: int, target: int, active_only: bool) -> Optional[List[int]]:
+    if source == target:
+        return [source]
+
+    forward_depth, forward_parent = {source: 0}, {source: None}
+    backward_depth, backward_parent = {target: 0}, {target: None}
+    forward_frontier, backward_frontier = [source], [target]
+
+    while forward_frontier and backward_frontier:
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meetings = _expand_level(
+                forward_frontier, out_edges, forward_depth, forward_parent, backward_depth, active_only
+            )
+        else:
+            backward_frontier, meetings = _expand_level(
+                backward_frontier, in_edges, backward_depth, backward_parent, forward_depth, active_only
+            )
+
+        if meetings:
+            # Al completar el primer nivel con intersección, el mínimo es el camino más corto
+            middle = min(meetings, key=lambda zone_id: forward_depth[zone_id] + backward_depth[zone_id])
+            path = []
+            node = middle
+            while node is not None:
+                path.append(node)
+                node = forward_parent[node]
+            path.reverse()
+            node = backward_parent[middle]
+            while node is not None:
+                path.append(node)
+                node = backward_parent[node]
+            return path
+
+    return None
@@ -0,0 +1,208 @@
+# backend/app/idempotency.py
+"""
+Soporte de la cabecera Idempotency-Key para los POST (crear zonas, rutas y
+procesar archivos subidos).
+La primera petición con una clave se ejecuta normalmente y su respuesta se
+guarda en una caché acotada con TTL; los reintentos con la misma clave reciben
+la respuesta guardada sin volver a ejecutar el handler. Si llega un duplicado
+mientras el original sigue en curso, espera a que termine y recibe su respuesta.
+"""
+import asyncio
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from .cache import LRUCache
+from .config import settings
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+# Rechazos transitorios (timeout, sin capacidad, no disponible): el reintento
+# con la misma clave debe volver a ejecutarse, no recibir el mismo rechazo
+TRANSIENT_STATUSES = {408, 425, 429, 503}
+
+
+def _storable(status: Optional[int]) -> bool:
+    """Solo se guardan respuestas 2xx/3xx y 4xx deterministas."""
+    return status is not None and status < 500 and status not in TRANSIENT_STATUSES
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: str
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+
+
+@dataclass
+class _InFlight:
+    # Duplicados esperando al original: [(loop, asyncio.Event)]
+    waiters: list = field(default_factory=list)
+
+
+class _Fingerprint:
+    """
+    SHA-256 de método, ruta, query y cuerpo, calculado por bloques mientras el
+    cuerpo se lee. En multipart se ignora el boundary, que el cliente genera al
+    azar en cada intento.
+    """
+
+    def __init__(self, scope):
+        self._digest = hashlib.sha256(
+            b"%s %s?%s\n" % (scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""))
+        )
+        self._boundary = _multipart_boundary(scope)
+        self._tail = b""
+
+    def update(self, chunk: bytes) -> None:
+        if not self._boundary:
+            self._digest.update(chunk)
+            return
+        data = (self._tail + chunk).replace(self._boundary, b"")
+        # Conservar el final por si el boundary quedó partido entre dos bloques
+        keep = len(self._boundary) - 1
+        self._digest.update(data[:-keep])
+        self._tail = data[-keep:]
+
+    def hexdigest(self) -> str:
+        digest = self._digest.copy()
+        digest.update(self._tail)
+        return digest.hexdigest()
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+
+def _multipart_boundary(scope) -> Optional[bytes]:
+    content_type = _header(scope, b"content-type") or b""
+    if not content_type.startswith(b"multipart/"):
+        return None
+    for part in content_type.split(b";"):
+        name, _, value = part.strip().partition(b"=")
+        if name == b"boundary" and len(value.strip(b'"')) > 1:
+            return value.strip(b'"')
+    return None
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.app = app
+        self.responses = LRUCache(
+            max_entries=max_entries or settings.idempotency_max_entries,
+            ttl_seconds=ttl_seconds or settings.idempotency_ttl_seconds
+        )
+        self._in_flight: Dict[str, _InFlight] = {}
+        # Los handlers pueden correr en distintos event loops (p. ej. TestClient)
+        self._lock = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        raw_key = _header(scope, IDEMPOTENCY_HEADER)
+        if raw_key is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = raw_key.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            response = JSONResponse(
+                {"detail": f"Idempotency-Key must be between 1 and {MAX_KEY_LENGTH} characters"},
+                status_code=400
+            )
+            await response(scope, receive, send)
+            return
+
+        fingerprint = _Fingerprint(scope)
+        while True:
+            with self._lock:
+                stored = self.responses.get(key)
+                flight = None if stored is not None else self._in_flight.get(key)
+                if stored is None and flight is None:
+                    # Primera petición con esta clave: la ejecuta esta
+                    flight = self._in_flight[key] = _InFlight()
+                    break
+                if flight is not None:
+                    wakeup = asyncio.Event()
+                    flight.waiters.append((asyncio.get_running_loop(), wakeup))
+
+            if stored is not None:
+                await self._replay(stored, fingerprint, scope, receive, send)
+                return
+            # Duplicado concurrente: esperar al original y volver a consultar
+            # (si el original falló con 5xx no queda respuesta y este se ejecuta)
+            await wakeup.wait()
+
+        try:
+            await self._execute(key, fingerprint, scope, receive, send)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            for loop, wakeup in flight.waiters:
+                loop.call_soon_threadsafe(wakeup.set)
+
+    async def _execute(self, key, fingerprint, scope, receive, send):
+        body_read = False
+        status = None
+        headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+
+        async def receive_hashing():
+            nonlocal body_read
+            message = await receive()
+            if message["type"] == "http.request":
+                fingerprint.update(message.get("body", b""))
+                body_read = not message.get("more_body", False)
+            return message
+
+        async def send_capturing(message):
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, receive_hashing, send_capturing)
+        # La huella debe cubrir todo el cuerpo aunque el handler no lo haya leído
+        while not body_read:
+            if (await receive_hashing())["type"] != "http.request":
+                break
+
+        # Los errores 5xx y los rechazos transitorios no se guardan: el reintento vuelve a ejecutarse
+        if _storable(status):
+            self.responses.set(key, StoredResponse(fingerprint.hexdigest(), status, headers, b"".join(chunks)))
+
+    async def _replay(self, stored: StoredResponse, fingerprint, scope, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            fingerprint.update(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+
+        if fingerprint.hexdigest() != stored.fingerprint:
+            response = JSONResponse(
+                {"detail": "Idempotency-Key was already used with a different request"},
+                status_code=422
+            )
+            await response(scope, receive, send)
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": stored.status,
+            "headers": stored.headers + [(REPLAYED_HEADER, b"true")],
+        })
+        await send({"type": "http.response.body", "body": stored.body})
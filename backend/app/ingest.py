@@ -0,0 +1,628 @@
+# backend/app/ingest.py
+"""
+Lectura de archivos parquet de viajes NYC TLC.
+Los filtros de fecha y zona se empujan al lector (pushdown): los row groups
+cuyas estadísticas min/max no pueden contener filas válidas no se decodifican.
+El schema se valida solo con el footer, antes de leer páginas de datos.
+Los row groups se decodifican en paralelo (un hilo por row group; pyarrow
+libera el GIL mientras decodifica).
+"""
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .config import settings
+from .geo import get_zone_locator, zone_locator_error
+from .ingest_types import (  # noqa: F401
+    SAMPLE_RANDOM_ROW_GROUPS, IngestError, TripAggregation, TripFilters, _naive_utc, parse_zone_ids
+)
+from .route_counts import count_route_pairs
+
+REQUIRED_COLUMNS = ['PULocationID', 'DOLocationID']
+
+# Archivos TLC anteriores a 2016: coordenadas (lon, lat) en lugar de IDs de zona;
+# la zona se asigna con la geometría cargada en app.geo
+COORDINATE_COLUMNS = {
+    'PULocationID': ('pickup_longitude', 'pickup_latitude'),
+    'DOLocationID': ('dropoff_longitude', 'dropoff_latitude'),
+}
+
+# Nombre de la columna de fecha de recogida según el tipo de archivo TLC
+# (yellow, green, fhv)
+PICKUP_DATETIME_COLUMNS = ['tpep_pickup_datetime', 'lpep_pickup_datetime', 'pickup_datetime']
+
+
+@dataclass
+class ReadResult:
+    table: pa.Table
+    row_groups_total: int
+    row_groups_read: int
+    row_groups_skipped: int
+    bytes_skipped: int
+
+
+def find_pickup_datetime_column(schema: pa.Schema) -> Optional[str]:
+    for name in PICKUP_DATETIME_COLUMNS:
+        if name in schema.names:
+            return name
+    return None
+
+
+def _column_stats(row_group, column_index: int):
+    """Devuelve (min, max) de una columna del row group, o None si no hay estadísticas."""
+    stats = row_group.column(column_index).statistics
+    if stats is None or not stats.has_min_max:
+        return None
+    return _naive_utc(stats.min), _naive_utc(stats.max)
+
+
+def _row_group_may_match(row_group, column_indexes: dict, filters: TripFilters) -> bool:
+    """
+    Decide con las estadísticas del footer si el row group puede contener filas
+    que cumplan los filtros. Ante la duda (sin estadísticas) se lee.
+    """
+    if filters.by_date:
+        stats = _column_stats(row_group, column_indexes['datetime'])
+        if stats is not None:
+            min_value, max_value = stats
+            if filters.start is not None and max_value < filters.start:
+                return False
+            if filters.end is not None and min_value >= filters.end:
+                return False
+
+    # Con coordenadas no hay estadísticas de zona: el filtro se aplica fila a fila
+    if filters.by_zone and all(col in column_indexes for col in REQUIRED_COLUMNS):
+        ranges = [_column_stats(row_group, column_indexes[col]) for col in REQUIRED_COLUMNS]
+        if all(r is not None for r in ranges):
+            in_range = any(
+                low <= zone_id <= high
+                for low, high in ranges
+                for zone_id in filters.zone_ids
+            )
+            if not in_range:
+                return False
+
+    return True
+
+
+def _row_group_compressed_size(row_group) -> int:
+    return sum(row_group.column(i).total_compressed_size for i in range(row_group.num_columns))
+
+
+def open_parquet(source) -> pq.ParquetFile:
+    """Abre el archivo leyendo solo el footer (schema, row groups y estadísticas)."""
+    try:
+        return pq.ParquetFile(source)
+    except (pa.ArrowInvalid, OSError) as e:
+        raise IngestError(f"Invalid parquet file: {e}")
+
+
+def uses_coordinates(schema: pa.Schema) -> bool:
+    """True si el archivo no trae IDs de zona pero sí coordenadas de origen y destino."""
+    return (
+        any(col not in schema.names for col in REQUIRED_COLUMNS)
+        and all(col in schema.names for pair in COORDINATE_COLUMNS.values() for col in pair)
+    )
+
+
+def _zone_locator():
+    locator = get_zone_locator()
+    if locator is None:
+        error = zone_locator_error()
+        raise IngestError(
+            "Trip files with pickup/dropoff coordinates require taxi zone geometry "
+            "(POST /uploads/zone-geometry or TAXI_ZONES_GEOJSON)" + (f"; {error}" if error else "")
+        )
+    return locator
+
+
+def validate_schema(schema: pa.Schema, filters: TripFilters) -> Optional[str]:
+    """
+    Valida las columnas requeridas (IDs de zona, o coordenadas si hay geometría
+    de zonas cargada) y la de fecha si se filtra por fechas.
+    Devuelve la columna de fecha de recogida que se va a leer, si corresponde.
+    """
+    if uses_coordinates(schema):
+        _zone_locator()
+    else:
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in schema.names]
+        if missing_columns:
+            raise IngestError(f"Missing required columns: {', '.join(missing_columns)}")
+
+    if not filters.by_date:
+        return None
+    datetime_column = find_pickup_datetime_column(schema)
+    if datetime_column is None:
+        raise IngestError(
+            "start/end filters require a pickup datetime column "
+            f"({', '.join(PICKUP_DATETIME_COLUMNS)})"
+        )
+    return datetime_column
+
+
+def validate_parquet_footer(source, filters: Optional[TripFilters] = None) -> None:
+    """Rechaza un archivo inválido o sin las columnas necesarias sin decodificar datos."""
+    validate_schema(open_parquet(source).schema_arrow, filters or TripFilters())
+
+
+def _read_columns(schema: pa.Schema, datetime_column: Optional[str]) -> List[str]:
+    """Columnas que se decodifican: IDs de zona (o sus coordenadas) y la fecha si se filtra."""
+    if uses_coordinates(schema):
+        columns = [col for pair in COORDINATE_COLUMNS.values() for col in pair]
+    else:
+        columns = list(REQUIRED_COLUMNS)
+    if datetime_column is not None:
+        columns.append(datetime_column)
+    return columns
+
+
+def _column_indexes(metadata, columns: List[str], datetime_column: Optional[str]) -> dict:
+    """Índices en el footer de las columnas leídas (las estadísticas se consultan por posición)."""
+    column_indexes = {}
+    for i in range(metadata.num_columns):
+        path = metadata.schema.column(i).path
+        if path == datetime_column:
+            column_indexes['datetime'] = i
+        elif path in columns:
+            column_indexes[path] = i
+    return column_indexes
+
+
+def _assign_zones(table: pa.Table, locator, datetime_column: Optional[str]) -> pa.Table:
+    """Reemplaza las coordenadas por PULocationID/DOLocationID (0 si el punto no cae en ninguna zona)."""
+    columns = {}
+    for zone_column, (lon, lat) in COORDINATE_COLUMNS.items():
+        x = table[lon].cast(pa.float64()).to_numpy()
+        y = table[lat].cast(pa.float64()).to_numpy()
+        columns[zone_column] = pa.array(locator.locate(x, y))
+    if datetime_column is not None:
+        columns[datetime_column] = table[datetime_column]
+    return pa.table(columns)
+
+
+def _filter_rows(table: pa.Table, filters: TripFilters, datetime_column: Optional[str]) -> pa.Table:
+    """Aplica los filtros fila a fila sobre los row groups que sí se leyeron."""
+    mask = None
+
+    def combine(condition):
+        return condition if mask is None else pc.and_(mask, condition)
+
+    if filters.by_date:
+        column = table[datetime_column]
+        if filters.start is not None:
+            start = pa.scalar(filters.start, type=pa.timestamp('us')).cast(column.type)
+            mask = combine(pc.greater_equal(column, start))
+        if filters.end is not None:
+            end = pa.scalar(filters.end, type=pa.timestamp('us')).cast(column.type)
+            mask = combine(pc.less(column, end))
+
+    if filters.by_zone:
+        pickup = table['PULocationID']
+        dropoff = table['DOLocationID']
+        value_set = pa.array(sorted(filters.zone_ids), type=pa.int64())
+        mask = combine(pc.or_(
+            pc.is_in(pickup, value_set=value_set.cast(pickup.type)),
+            pc.is_in(dropoff, value_set=value_set.cast(dropoff.type)),
+        ))
+
+    if mask is None:
+        return table
+    return table.filter(pc.fill_null(mask, False))
+
+
+def _row_group_order(num_row_groups: int, filters: TripFilters) -> List[int]:
+    """Orden en que se recorren los row groups: el del archivo o uno al azar reproducible."""
+    order = list(range(num_row_groups))
+    if filters.sample == SAMPLE_RANDOM_ROW_GROUPS:
+        random.Random(filters.seed).shuffle(order)
+    return order
+
+
+def decode_workers(max_workers: Optional[int] = None) -> int:
+    return max_workers or settings.ingest_decode_workers or os.cpu_count() or 1
+
+
+def _read_row_group(source, metadata, index: int, columns: List[str]) -> pa.Table:
+    # Un lector por tarea sobre la misma fuente (lecturas posicionales, seguras
+    # entre hilos para memory_map/BufferReader) reutilizando el footer ya leído
+    reader = pq.ParquetFile(source, metadata=metadata)
+    return reader.read_row_group(index, columns=columns, use_threads=False)
+
+
+def read_trips(
+    source,
+    filters: Optional[TripFilters] = None,
+    limit_rows: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    max_workers: Optional[int] = None
+) -> ReadResult:
+    """
+    Lee solo las columnas necesarias de los row groups que pueden cumplir los filtros.
+    La lectura se detiene en cuanto se alcanzan `limit_rows` filas válidas.
+    Los row groups se recorren en orden o, con sample=random_row_groups, en un
+    orden al azar según `filters.seed`; se decodifican en tandas de hasta
+    `max_workers` hilos (por defecto settings.ingest_decode_workers).
+    `source` debe ser una ruta, un pa.memory_map o un pa.BufferReader.
+    `progress(filas_recorridas, filas_estimadas)` se llama tras cada row group.
+    """
+    # Copia normalizada: el TripFilters del llamador también es parte de la clave de caché
+    filters = filters or TripFilters()
+    filters = replace(filters, start=_naive_utc(filters.start), end=_naive_utc(filters.end))
+
+    parquet_file = open_parquet(source)
+    schema = parquet_file.schema_arrow
+    metadata = parquet_file.metadata
+
+    datetime_column = validate_schema(schema, filters)
+    columns = _read_columns(schema, datetime_column)
+    column_indexes = _column_indexes(metadata, columns, datetime_column)
+    locator = _zone_locator() if uses_coordinates(schema) else None
+
+    def decoded_trips(table: pa.Table) -> pa.Table:
+        return table if locator is None else _assign_zones(table, locator, datetime_column)
+
+    row_groups_total = metadata.num_row_groups
+    row_groups_read = 0
+    row_groups_skipped = 0
+    bytes_skipped = 0
+    tables: List[pa.Table] = []
+    rows_collected = 0
+
+    # Filas que se espera recorrer: sin filtros, la lectura se corta en limit_rows
+    filtered = filters.by_date or filters.by_zone
+    rows_scanned = 0
+    rows_expected = metadata.num_rows
+    if limit_rows and not filtered:
+        rows_expected = min(rows_expected, limit_rows)
+
+    def report():
+        if progress:
+            progress(min(rows_scanned, rows_expected), rows_expected)
+
+    report()
+    workers = decode_workers(max_workers)
+    executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    order = _row_group_order(row_groups_total, filters)
+    position = 0
+    try:
+        while position < len(order) and not (limit_rows and rows_collected >= limit_rows):
+            # Tanda: los row groups justos para completar limit_rows. Con filtros no
+            # se sabe cuántas filas cumplen, así que se toma al menos uno por hilo
+            wave = []
+            planned_rows = 0
+            while position < len(order):
+                enough_rows = limit_rows and planned_rows >= limit_rows - rows_collected
+                if enough_rows and (not filtered or len(wave) >= workers):
+                    break
+                index = order[position]
+                position += 1
+                row_group = metadata.row_group(index)
+                if filtered and not _row_group_may_match(row_group, column_indexes, filters):
+                    row_groups_skipped += 1
+                    bytes_skipped += _row_group_compressed_size(row_group)
+                    rows_scanned += row_group.num_rows
+                    report()
+                    continue
+                wave.append(index)
+                planned_rows += row_group.num_rows
+
+            if executor is not None and len(wave) > 1:
+                decoded = executor.map(lambda i: _read_row_group(source, metadata, i, columns), wave)
+            else:
+                decoded = (parquet_file.read_row_group(i, columns=columns) for i in wave)
+
+            for index, table in zip(wave, decoded):
+                row_groups_read += 1
+                rows_scanned += metadata.row_group(index).num_rows
+                table = _filter_rows(decoded_trips(table), filters, datetime_column)
+                tables.append(table)
+                rows_collected += table.num_rows
+                report()
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    if tables:
+        table = pa.concat_tables(tables)
+    else:
+        table = decoded_trips(schema.empty_table().select(columns))
+
+    if limit_rows and table.num_rows > limit_rows:
+        table = table.slice(0, limit_rows)
+
+    return ReadResult(
+        table=table,
+        row_groups_total=row_groups_total,
+        row_groups_read=row_groups_read,
+        row_groups_skipped=row_groups_skipped,
+        bytes_skipped=bytes_skipped,
+    )
+
+
+def _stat_value(value):
+    # Columnas binarias sin tipo lógico: las estadísticas llegan como bytes
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return _naive_utc(value)
+
+
+def _footer_columns(metadata, schema: pa.Schema) -> List[dict]:
+    """Tipo, tamaños y min/max/nulos de cada columna, combinando todos los row groups."""
+    columns = []
+    for i in range(metadata.num_columns):
+        name = metadata.schema.column(i).path
+        field_index = schema.get_field_index(name)
+        info = {
+            "name": name,
+            "type": str(schema.field(field_index).type) if field_index >= 0 else metadata.schema.column(i).physical_type,
+            "compressed_bytes": 0,
+            "uncompressed_bytes": 0,
+            "null_count": 0,
+            "min": None,
+            "max": None,
+        }
+        for index in range(metadata.num_row_groups):
+            chunk = metadata.row_group(index).column(i)
+            info["compressed_bytes"] += chunk.total_compressed_size
+            info["uncompressed_bytes"] += chunk.total_uncompressed_size
+            stats = chunk.statistics
+            if stats is None or not stats.has_null_count or info["null_count"] is None:
+                info["null_count"] = None
+            else:
+                info["null_count"] += stats.null_count
+            if stats is not None and stats.has_min_max:
+                low, high = _stat_value(stats.min), _stat_value(stats.max)
+                try:
+                    info["min"] = low if info["min"] is None else min(info["min"], low)
+                    info["max"] = high if info["max"] is None else max(info["max"], high)
+                except TypeError:
+                    pass
+        columns.append(info)
+    return columns
+
+
+def _estimate_read(metadata, column_indexes: dict, filters: TripFilters, limit_rows: Optional[int]) -> dict:
+    """
+    Lo que leería read_trips con estos parámetros, calculado con el footer.
+    Con filtros las filas válidas de cada row group no se conocen: se asume que
+    todas cumplen (cota superior de filas y bytes).
+    """
+    filtered = filters.by_date or filters.by_zone
+    estimate = {
+        "row_groups_to_read": 0,
+        "row_groups_skipped": 0,
+        "rows_to_scan": 0,
+        "compressed_bytes_to_read": 0,
+        "decoded_bytes": 0,
+    }
+    rows_collected = 0
+    for index in _row_group_order(metadata.num_row_groups, filters):
+        if limit_rows and rows_collected >= limit_rows:
+            break
+        row_group = metadata.row_group(index)
+        estimate["rows_to_scan"] += row_group.num_rows
+        if filtered and not _row_group_may_match(row_group, column_indexes, filters):
+            estimate["row_groups_skipped"] += 1
+            continue
+        estimate["row_groups_to_read"] += 1
+        rows_collected += row_group.num_rows
+        for column_index in column_indexes.values():
+            chunk = row_group.column(column_index)
+            estimate["compressed_bytes_to_read"] += chunk.total_compressed_size
+            estimate["decoded_bytes"] += chunk.total_uncompressed_size
+    return estimate
+
+
+def inspect_parquet(source, filters: Optional[TripFilters] = None, limit_rows: Optional[int] = None) -> dict:
+    """
+    Metadatos del archivo y costo estimado de ingerirlo, leyendo solo el footer.
+    Un schema inválido no es un error aquí: se informa en `errors`.
+    """
+    filters = filters or TripFilters()
+    filters = replace(filters, start=_naive_utc(filters.start), end=_naive_utc(filters.end))
+
+    parquet_file = open_parquet(source)
+    schema = parquet_file.schema_arrow
+    metadata = parquet_file.metadata
+
+    errors = []
+    datetime_column = None
+    try:
+        datetime_column = validate_schema(schema, filters)
+    except IngestError as e:
+        errors.append(str(e))
+
+    return {
+        "num_rows": metadata.num_rows,
+        "num_row_groups": metadata.num_row_groups,
+        "created_by": metadata.created_by,
+        "serialized_footer_bytes": metadata.serialized_size,
+        "pickup_datetime_column": datetime_column or find_pickup_datetime_column(schema),
+        "uses_coordinates": uses_coordinates(schema),
+        "columns": _footer_columns(metadata, schema),
+        "valid": not errors,
+        "errors": errors,
+        "estimate": None if errors else _estimate_read(
+            metadata, _column_indexes(metadata, _read_columns(schema, datetime_column), datetime_column),
+            filters, limit_rows
+        ),
+    }
+
+
+def _zone_column_numpy(column: pa.ChunkedArray) -> np.ndarray:
+    """IDs de zona como int64; los valores no numéricos o nulos quedan en 0."""
+    if pa.types.is_integer(column.type) or pa.types.is_floating(column.type):
+        return _clean_zone_column(column).to_numpy()
+    # Columnas de texto u otros tipos: misma conversión que pd.to_numeric
+    return pd.to_numeric(column.to_pandas(), errors='coerce').fillna(0).astype(np.int64).to_numpy()
+
+
+def aggregate_trips(read_result: ReadResult, top_n_routes: Optional[int]) -> TripAggregation:
+    """Limpia los IDs de zona y cuenta los pares (origen, destino) más frecuentes."""
+    table = read_result.table
+    rows_read = table.num_rows
+
+    # Convertir a numérico y manejar valores nulos
+    pickup = _zone_column_numpy(table['PULocationID'])
+    dropoff = _zone_column_numpy(table['DOLocationID'])
+
+    # Filtrar IDs inválidos (<= 0)
+    valid = (pickup > 0) & (dropoff > 0)
+    pickup, dropoff = pickup[valid], dropoff[valid]
+
+    if len(pickup) == 0:
+        raise IngestError("No valid rows found after cleaning data")
+
+    # Zonas únicas, pares distintos (sin pickup == dropoff) y top N por
+    # frecuencia, con el kernel de claves codificadas (sin groupby ni sort completo)
+    zone_ids, routes_detected, top_routes = count_route_pairs(pickup, dropoff, top_n_routes)
+
+    return TripAggregation(
+        rows_read=rows_read,
+        zone_ids=zone_ids,
+        routes_detected=routes_detected,
+        top_routes=top_routes,
+        row_groups_total=read_result.row_groups_total,
+        row_groups_read=read_result.row_groups_read,
+        row_groups_skipped=read_result.row_groups_skipped,
+        bytes_skipped=read_result.bytes_skipped,
+    )
+
+
+# INGESTA ARROW IPC / FEATHER
+# El archivo se lee sin copiar (los arrays apuntan al buffer recibido) y la
+# agregación se hace con pyarrow.compute, sin pasar por pandas.
+
+def read_trips_arrow(source, filters: Optional[TripFilters] = None, limit_rows: Optional[int] = None) -> ReadResult:
+    """
+    Lee un archivo Arrow IPC (formato file, que es Feather v2) o un stream IPC.
+    Los record batches se leen en orden y la lectura se detiene al alcanzar limit_rows.
+    """
+    filters = filters or TripFilters()
+    filters = replace(filters, start=_naive_utc(filters.start), end=_naive_utc(filters.end))
+
+    try:
+        reader = pa.ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        batches_total = reader.num_record_batches
+    except pa.ArrowInvalid:
+        source.seek(0)
+        try:
+            reader = pa.ipc.open_stream(source)
+        except pa.ArrowInvalid:
+            raise IngestError("File must be an Arrow IPC stream or Feather (v2) file")
+        batches = iter(reader)
+        batches_total = None
+    schema = reader.schema
+
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in schema.names]
+    if missing_columns:
+        raise IngestError(f"Missing required columns: {', '.join(missing_columns)}")
+    # La agregación arrow convierte los IDs con un cast numérico: texto u otros tipos son error de entrada
+    for name in REQUIRED_COLUMNS:
+        column_type = schema.field(name).type
+        if not (pa.types.is_integer(column_type) or pa.types.is_floating(column_type)
+                or pa.types.is_null(column_type)):
+            raise IngestError(f"Column {name} must contain numeric zone IDs (found {column_type})")
+
+    columns = list(REQUIRED_COLUMNS)
+    datetime_column = None
+    if filters.by_date:
+        datetime_column = find_pickup_datetime_column(schema)
+        if datetime_column is None:
+            raise IngestError(
+                "start/end filters require a pickup datetime column "
+                f"({', '.join(PICKUP_DATETIME_COLUMNS)})"
+            )
+        columns.append(datetime_column)
+
+    tables: List[pa.Table] = []
+    rows_collected = 0
+    batches_read = 0
+    for batch in batches:
+        if limit_rows and rows_collected >= limit_rows:
+            break
+        table = pa.Table.from_batches([batch]).select(columns)
+        batches_read += 1
+        table = _filter_rows(table, filters, datetime_column)
+        tables.append(table)
+        rows_collected += table.num_rows
+
+    table = pa.concat_tables(tables) if tables else schema.empty_table().select(columns)
+    if limit_rows and table.num_rows > limit_rows:
+        table = table.slice(0, limit_rows)
+
+    return ReadResult(
+        table=table,
+        row_groups_total=batches_total if batches_total is not None else batches_read,
+        row_groups_read=batches_read,
+        row_groups_skipped=0,
+        bytes_skipped=0,
+    )
+
+
+def _clean_zone_column(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Equivalente arrow de pd.to_numeric(...).fillna(0).astype(int)."""
+    if pa.types.is_floating(column.type):
+        column = pc.if_else(pc.is_nan(column), None, column)
+    column = pc.cast(column, pa.int64(), safe=False)
+    return pc.fill_null(column, 0)
+
+
+def aggregate_trips_arrow(read_result: ReadResult, top_n_routes: Optional[int]) -> TripAggregation:
+    """Misma agregación que aggregate_trips, hecha con group_by de pyarrow."""
+    table = read_result.table
+    rows_read = table.num_rows
+
+    pickup = _clean_zone_column(table['PULocationID'])
+    dropoff = _clean_zone_column(table['DOLocationID'])
+
+    # Filtrar IDs inválidos (<= 0)
+    valid = pc.and_(pc.greater(pickup, 0), pc.greater(dropoff, 0))
+    trips = pa.table({'PULocationID': pickup, 'DOLocationID': dropoff}).filter(valid)
+
+    if trips.num_rows == 0:
+        raise IngestError("No valid rows found after cleaning data")
+
+    all_zones = pa.chunked_array(trips['PULocationID'].chunks + trips['DOLocationID'].chunks)
+    zone_ids = sorted(pc.unique(all_zones).to_pylist())
+
+    # Pares (PULocationID, DOLocationID) y su conteo, sin pickup == dropoff
+    route_counts = trips.group_by(['PULocationID', 'DOLocationID']).aggregate([([], 'count_all')])
+    route_counts = route_counts.filter(
+        pc.not_equal(route_counts['PULocationID'], route_counts['DOLocationID'])
+    )
+    routes_detected = route_counts.num_rows
+
+    # Top N por frecuencia; empates desempatados por (origen, destino)
+    sort_keys = [('count_all', 'descending'), ('PULocationID', 'ascending'), ('DOLocationID', 'ascending')]
+    if top_n_routes == 0:
+        # select_k_unstable no acepta k=0
+        top_routes = route_counts.slice(0, 0)
+    elif top_n_routes is not None and top_n_routes < routes_detected:
+        top_routes = route_counts.take(pc.select_k_unstable(route_counts, k=top_n_routes, sort_keys=sort_keys))
+    else:
+        top_routes = route_counts.take(pc.sort_indices(route_counts, sort_keys=sort_keys))
+
+    return TripAggregation(
+        rows_read=rows_read,
+        zone_ids=zone_ids,
+        routes_detected=routes_detected,
+        top_routes=list(zip(
+            top_routes['PULocationID'].to_pylist(),
+            top_routes['DOLocationID'].to_pylist(),
+            top_routes['count_all'].to_pylist(),
+        )),
+        row_groups_total=read_result.row_groups_total,
+        row_groups_read=read_result.row_groups_read,
+        row_groups_skipped=read_result.row_groups_skipped,
+        bytes_skipped=read_result.bytes_skipped,
+    )
@@ -0,0 +1,74 @@
+# backend/app/ingest_types.py
+"""
+Tipos livianos de la ingesta (filtros, errores, resultado de la agregación).
+Están separados de ingest.py para que los routers puedan usarlos sin importar
+pandas/pyarrow al arrancar la API; ingest.py se carga recién al procesar un archivo.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional, Set
+
+
+# Qué row groups se leen cuando limit_rows es menor que el archivo
+SAMPLE_HEAD = "head"                            # los primeros, en orden
+SAMPLE_RANDOM_ROW_GROUPS = "random_row_groups"  # un subconjunto al azar (con semilla)
+SAMPLE_MODES = (SAMPLE_HEAD, SAMPLE_RANDOM_ROW_GROUPS)
+
+
+class IngestError(ValueError):
+    """Error de validación del archivo; el endpoint lo traduce a un 400."""
+
+
+@dataclass
+class TripFilters:
+    """
+    Filtros opcionales: rango [start, end) sobre la fecha de recogida y zonas de origen/destino.
+    `sample` decide qué row groups se leen hasta llegar a limit_rows (ver SAMPLE_MODES).
+    """
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    zone_ids: Optional[Set[int]] = None
+    sample: str = SAMPLE_HEAD
+    seed: Optional[int] = None
+
+    @property
+    def by_date(self) -> bool:
+        return self.start is not None or self.end is not None
+
+    @property
+    def by_zone(self) -> bool:
+        return bool(self.zone_ids)
+
+
+@dataclass
+class TripAggregation:
+    """Resultado de agregar un archivo: lo necesario para aplicar zonas y rutas al store."""
+    rows_read: int
+    zone_ids: List[int]
+    routes_detected: int
+    # (PULocationID, DOLocationID, count) ordenadas por frecuencia descendente
+    top_routes: List[tuple]
+    row_groups_total: int = 0
+    row_groups_read: int = 0
+    row_groups_skipped: int = 0
+    bytes_skipped: int = 0
+
+
+def _naive_utc(value):
+    """Normaliza datetimes con zona horaria a UTC sin tzinfo para poder compararlos."""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def parse_zone_ids(raw: Optional[str]) -> Optional[Set[int]]:
+    """Convierte '132,138, 161' en {132, 138, 161}."""
+    if raw is None or not raw.strip():
+        return None
+    try:
+        zone_ids = {int(part) for part in raw.split(',') if part.strip()}
+    except ValueError:
+        raise IngestError("zone_ids must be a comma-separated list of integers")
+    if any(zone_id <= 0 for zone_id in zone_ids):
+        raise IngestError("zone_ids must be positive integers")
+    return zone_ids
@@ -0,0 +1,102 @@
+# backend/app/jobs.py
+"""
+Trabajos de ingesta en segundo plano.
+El procesamiento de un archivo ya subido corre en un hilo aparte; el cliente
+consulta el estado (etapa, filas recorridas, filas/segundo y ETA) mientras tanto.
+"""
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Etapas: queued -> reading -> aggregating -> applying -> done | failed
+JOB_STAGES = ("queued", "reading", "aggregating", "applying", "done", "failed")
+FINISHED_STAGES = ("done", "failed")
+
+# Trabajos terminados que se conservan para consulta
+MAX_FINISHED_JOBS = 100
+
+
+@dataclass
+class IngestJob:
+    job_id: str
+    file_name: str
+    stage: str = "queued"
+    rows_processed: int = 0
+    rows_total: Optional[int] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = None
+    started: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+
+    def report(self, rows_processed: int, rows_total: Optional[int]) -> None:
+        """Callback de progreso del lector (se llama desde el hilo del trabajo)."""
+        self.rows_processed = rows_processed
+        self.rows_total = rows_total
+
+    @property
+    def finished(self) -> bool:
+        return self.stage in FINISHED_STAGES
+
+    @property
+    def rows_per_second(self) -> float:
+        if self.started is None:
+            return 0.0
+        elapsed = time.monotonic() - self.started
+        return self.rows_processed / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Tiempo restante estimado de la lectura (None si no hay datos suficientes)."""
+        if self.finished:
+            return 0.0
+        rate = self.rows_per_second
+        if self.rows_total is None or rate <= 0:
+            return None
+        return max(self.rows_total - self.rows_processed, 0) / rate
+
+
+# Formato: {job_id (str): IngestJob}
+ingest_jobs: Dict[str, IngestJob] = {}
+_jobs_lock = threading.Lock()
+
+
+def _prune_finished_jobs() -> None:
+    finished = [job for job in ingest_jobs.values() if job.finished]
+    for job in sorted(finished, key=lambda j: j.finished_at)[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        del ingest_jobs[job.job_id]
+
+
+def _run(job: IngestJob, work: Callable[[IngestJob], Any]) -> None:
+    job.started = time.monotonic()
+    try:
+        job.result = work(job)
+        job.stage = "done"
+    except Exception as e:
+        # HTTPException lleva el mensaje en detail
+        job.error = str(getattr(e, "detail", None) or e)
+        job.stage = "failed"
+    finally:
+        job.finished_at = datetime.now()
+
+
+def start_job(file_name: str, work: Callable[[IngestJob], Any]) -> IngestJob:
+    """Registra el trabajo y ejecuta work(job) en un hilo en segundo plano."""
+    job = IngestJob(job_id=uuid.uuid4().hex, file_name=file_name)
+    with _jobs_lock:
+        _prune_finished_jobs()
+        ingest_jobs[job.job_id] = job
+    threading.Thread(target=_run, args=(job, work), name=f"ingest-{job.job_id[:8]}", daemon=True).start()
+    return job
+
+
+def get_job(job_id: str) -> Optional[IngestJob]:
+    return ingest_jobs.get(job_id)
+
+
+def list_jobs() -> List[IngestJob]:
+    with _jobs_lock:
+        return sorted(ingest_jobs.values(), key=lambda job: job.created_at, reverse=True)
@@ -1,15 +1,67 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from .admission import AdmissionMiddleware
+from .diagnostics import DiagnosticsMiddleware, loop_monitor
+from .idempotency import IdempotencyMiddleware
+from .replication import ReplicaMiddleware, start_follower, stop_follower
 from .routes_zones import router as zones_router
 from .routes_routes import router as routes_router
 from .routes_uploads import router as uploads_router
+from .routes_graph import router as graph_router
+from .routes_stats import router as stats_router
+from .routes_changes import router as changes_router
+from .routes_replication import router as replication_router
+from .config import settings
+from .schemas import HealthDiagnostics
+from .warmup import start_prewarm
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # pandas/pyarrow se cargan en un hilo: el servidor acepta peticiones sin esperarlos
+    if settings.prewarm_ingest:
+        start_prewarm()
+    # Con replication_leader_url el proceso es una réplica de solo lectura
+    start_follower()
+    # Lag del event loop, ocupación del threadpool y handlers que bloquean el loop
+    if settings.loop_monitor:
+        loop_monitor.start()
+    yield
+    loop_monitor.stop()
+    stop_follower()
 
-app = FastAPI(title="Demand Prediction Service - PSet #1")
+
+app = FastAPI(title="Demand Prediction Service - PSet #1", lifespan=lifespan)
+
+# Límite de ingestas simultáneas y bytes en memoria (responde 429/503 si se supera)
+app.add_middleware(AdmissionMiddleware)
+# Reintentos con la cabecera Idempotency-Key reciben la respuesta original
+# (se agrega después para quedar por fuera: una respuesta repetida no ocupa turno)
+app.add_middleware(IdempotencyMiddleware)
+# En una réplica las escrituras se rechazan antes de la idempotencia y la admisión
+app.add_middleware(ReplicaMiddleware)
+# Por fuera de todo: cada petición queda asociada a su tarea desde que llega
+app.add_middleware(DiagnosticsMiddleware)
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
 
+@app.get("/health/diagnostics", response_model=HealthDiagnostics)
+async def health_diagnostics():
+    """
+    Lag del event loop (últimas muestras), ocupación y cola del threadpool, y
+    los últimos bloqueos del loop con el handler y la línea que los causaron.
+    status=degraded si hubo un bloqueo en el último minuto o hay tareas esperando hilo.
+    """
+    return loop_monitor.snapshot()
+
 app.include_router(zones_router)
 app.include_router(routes_router)
-app.include_router(uploads_router)
\ No newline at end of file
+app.include_router(uploads_router)
+app.include_router(graph_router)
+app.include_router(stats_router)
+app.include_router(changes_router)
+app.include_router(replication_router)
\ No newline at end of file
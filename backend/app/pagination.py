@@ -0,0 +1,26 @@
+# backend/app/pagination.py
+"""
+Paginación por limit/offset de los listados (GET /zones, GET /routes).
+El total de registros que cumplen los filtros se devuelve en la cabecera
+X-Total-Count para que el cliente pueda calcular el número de páginas.
+"""
+from typing import Iterable, List, Optional
+
+from fastapi import Response
+
+TOTAL_COUNT_HEADER = "X-Total-Count"
+MAX_PAGE_SIZE = 10_000
+
+
+def paginate(records: Iterable[dict], response: Response, limit: Optional[int], offset: int) -> List[dict]:
+    """Devuelve solo la página pedida; limit=None conserva el listado completo."""
+    end = None if limit is None else offset + limit
+    page = []
+    total = 0
+    for record in records:
+        # Solo se copian los registros de la página; el resto únicamente se cuenta
+        if total >= offset and (end is None or total < end):
+            page.append(record)
+        total += 1
+    response.headers[TOTAL_COUNT_HEADER] = str(total)
+    return page
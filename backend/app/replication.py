@@ -0,0 +1,199 @@
+# backend/app/replication.py
+"""
+Replicación líder/réplica del store por envío del registro de mutaciones.
+El líder es cualquier proceso sin replication_leader_url: acepta escrituras
+(incluidas las subidas) y expone GET /replication/snapshot y /replication/log,
+que es su change feed. Una réplica carga el snapshot, sigue el log con long
+polling aplicando cada evento a sus propios índices (storage.apply_change) y
+solo atiende lecturas; si queda más atrás de lo que conserva el feed del líder
+vuelve a cargar el snapshot. Las respuestas de una réplica informan el retraso
+en las cabeceras X-Replication-Seq y X-Replication-Lag-Seconds.
+"""
+import json
+import logging
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+from starlette.responses import JSONResponse
+
+from . import storage
+from .changes import change_feed
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Métodos que una réplica atiende; el resto son escrituras y van al líder
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class Follower:
+    def __init__(self, leader_url: str, poll_seconds: float = 10.0, batch_size: int = 1000,
+                 retry_seconds: float = 1.0):
+        self.leader_url = leader_url.rstrip("/")
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.retry_seconds = retry_seconds
+
+        # Posición del líder ya aplicada localmente (None hasta el primer snapshot),
+        # válida solo para la instancia del líder identificada por leader_epoch
+        self.applied_seq: Optional[int] = None
+        self.leader_epoch: Optional[str] = None
+        self.leader_seq: Optional[int] = None
+        self.snapshots_loaded = 0
+        self.events_applied = 0
+        self.last_error: Optional[str] = None
+        # Última vez que la réplica confirmó estar al día con el líder
+        self._in_sync = False
+        self._synced_at = time.time()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _get(self, path: str, **params) -> dict:
+        url = f"{self.leader_url}{path}"
+        if params:
+            url += "?" + urlencode(params)
+        # El long poll puede tardar poll_seconds en responder
+        with urlopen(url, timeout=self.poll_seconds + 10) as response:
+            return json.load(response)
+
+    def _mark(self, leader_seq: int) -> None:
+        self.leader_seq = leader_seq
+        self._in_sync = self.applied_seq >= leader_seq
+        if self._in_sync:
+            self._synced_at = time.time()
+
+    def load_snapshot(self) -> None:
+        snapshot = self._get("/replication/snapshot")
+        storage.load_snapshot(snapshot["zones"], snapshot["routes"], snapshot["next_route_id"])
+        self.applied_seq = snapshot["seq"]
+        self.leader_epoch = snapshot["epoch"]
+        self.snapshots_loaded += 1
+        self._mark(snapshot["seq"])
+
+    def poll(self, wait: float) -> int:
+        """Trae y aplica los eventos posteriores a applied_seq; devuelve cuántos aplicó."""
+        if self.applied_seq is None:
+            self.load_snapshot()
+        log = self._get("/replication/log", since=self.applied_seq, limit=self.batch_size, wait=wait)
+        if log["epoch"] != self.leader_epoch:
+            # El líder se reinició: sus secuencias ya no corresponden a lo aplicado
+            logger.warning("replication leader restarted (epoch %s), reloading snapshot", log["epoch"])
+            self.load_snapshot()
+            return 0
+        if log["truncated"]:
+            logger.warning("replication log truncated at seq %s, reloading snapshot", self.applied_seq)
+            self.load_snapshot()
+            return 0
+        for event in log["events"]:
+            storage.apply_change(event)
+            self.applied_seq = event["seq"]
+        self.events_applied += len(log["events"])
+        self._mark(log["latest_seq"])
+        return len(log["events"])
+
+    def run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                # Con eventos pendientes no se espera: se sigue hasta alcanzar al líder
+                self.poll(0 if not self._in_sync else self.poll_seconds)
+                self.last_error = None
+            except Exception as e:
+                self._in_sync = False
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.warning("replication from %s failed: %s", self.leader_url, self.last_error)
+                self._stop.wait(self.retry_seconds)
+
+    def start(self) -> threading.Thread:
+        self._thread = threading.Thread(target=self.run, name="replication-follower", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self) -> None:
+        # Un long poll en curso termina solo (a lo sumo poll_seconds después)
+        self._stop.set()
+
+    @property
+    def lag_seconds(self) -> float:
+        """Tiempo desde la última vez que la réplica estuvo al día (0 si lo está)."""
+        return 0.0 if self._in_sync else time.time() - self._synced_at
+
+    def status(self) -> dict:
+        applied = self.applied_seq or 0
+        return {
+            "role": "follower",
+            "seq": applied,
+            "leader_url": self.leader_url,
+            "leader_epoch": self.leader_epoch,
+            "leader_seq": self.leader_seq,
+            "lag_events": max((self.leader_seq or 0) - applied, 0),
+            "lag_seconds": self.lag_seconds,
+            "in_sync": self._in_sync,
+            "snapshots_loaded": self.snapshots_loaded,
+            "events_applied": self.events_applied,
+            "last_error": self.last_error,
+        }
+
+
+# Réplica de este proceso (None en el líder); se crea en el lifespan de main
+follower: Optional[Follower] = None
+
+
+def start_follower() -> Optional[Follower]:
+    global follower
+    if settings.replication_leader_url and follower is None:
+        follower = Follower(
+            settings.replication_leader_url,
+            poll_seconds=settings.replication_poll_seconds,
+            batch_size=settings.replication_batch_size,
+            retry_seconds=settings.replication_retry_seconds,
+        )
+        follower.start()
+    return follower
+
+
+def stop_follower() -> None:
+    global follower
+    if follower is not None:
+        follower.stop()
+        follower = None
+
+
+def replication_status() -> dict:
+    if follower is not None:
+        return follower.status()
+    return {"role": "leader", "seq": change_feed.latest_seq}
+
+
+class ReplicaMiddleware:
+    """En una réplica rechaza las escrituras (403) y agrega el retraso a cada respuesta."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        replica = follower
+        if scope["type"] != "http" or replica is None:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] not in READ_METHODS:
+            response = JSONResponse(
+                {"detail": "This replica is read-only; send writes to the leader"},
+                status_code=403,
+                headers={"X-Replication-Leader": replica.leader_url}
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_with_lag(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-replication-seq", str(replica.applied_seq or 0).encode()))
+                headers.append((b"x-replication-lag-seconds", f"{replica.lag_seconds:.3f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_lag)
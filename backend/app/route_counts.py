@@ -0,0 +1,93 @@
+# backend/app/route_counts.py
+"""
+Conteo de pares (origen, destino) para la ingesta de viajes.
+Cada par se codifica en un solo entero (pickup * span + dropoff) y se cuenta
+con np.bincount; si los IDs son dispersos se compactan primero y, si aun así
+la matriz de pares es demasiado grande, se cuenta con np.unique (hash/sort).
+El top N se elige con argpartition en lugar de ordenar todos los pares.
+Orden del resultado: conteo descendente, luego (origen, destino) ascendente.
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Celdas máximas de la matriz de conteo densa (span * span), ~32 MB en int64
+DENSE_MAX_CELLS = 1 << 22
+
+
+def _zone_presence(pickup: np.ndarray, dropoff: np.ndarray, span: int) -> np.ndarray:
+    present = np.bincount(pickup, minlength=span) > 0
+    present |= np.bincount(dropoff, minlength=span) > 0
+    return np.flatnonzero(present)
+
+
+def _count_keys(keys: np.ndarray, span: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Devuelve (claves presentes en orden ascendente, conteos), sin la diagonal."""
+    if span * span <= DENSE_MAX_CELLS:
+        counts = np.bincount(keys, minlength=span * span)
+        # La diagonal (pickup == dropoff) está en las posiciones i * (span + 1)
+        counts[::span + 1] = 0
+        present = np.flatnonzero(counts)
+        return present, counts[present]
+
+    unique_keys, counts = np.unique(keys, return_counts=True)
+    off_diagonal = unique_keys // span != unique_keys % span
+    return unique_keys[off_diagonal], counts[off_diagonal]
+
+
+def _top_indices(counts: np.ndarray, keys: np.ndarray, top_n: Optional[int]) -> np.ndarray:
+    """Índices de los top_n pares por (conteo desc, clave asc)."""
+    total = len(counts)
+    if top_n is not None and top_n < total:
+        if top_n <= 0:
+            return np.empty(0, dtype=np.int64)
+        # Umbral: el top_n-ésimo conteo más alto (selección O(P), sin ordenar todo)
+        partitioned = np.argpartition(counts, total - top_n)[total - top_n:]
+        threshold = counts[partitioned].min()
+        above = np.flatnonzero(counts > threshold)
+        # Empates en el umbral: entran los de clave menor (keys está ordenado)
+        ties = np.flatnonzero(counts == threshold)[:top_n - len(above)]
+        selected = np.concatenate([above, ties])
+    else:
+        selected = np.arange(total)
+    order = np.lexsort((keys[selected], -counts[selected]))
+    return selected[order]
+
+
+def count_route_pairs(
+    pickup: np.ndarray, dropoff: np.ndarray, top_n: Optional[int]
+) -> Tuple[List[int], int, List[tuple]]:
+    """
+    pickup/dropoff: IDs de zona enteros y > 0 (ya limpios), de igual longitud.
+    Devuelve (zone_ids ordenados, cantidad de pares distintos sin la diagonal,
+    [(pickup, dropoff, count), ...] con los top_n pares).
+    """
+    pickup = np.asarray(pickup, dtype=np.int64)
+    dropoff = np.asarray(dropoff, dtype=np.int64)
+    max_id = int(max(pickup.max(), dropoff.max()))
+
+    if (max_id + 1) ** 2 <= DENSE_MAX_CELLS:
+        # IDs chicos (caso TLC: 1..265): se usan directamente como coordenadas
+        span = max_id + 1
+        zone_ids = _zone_presence(pickup, dropoff, span)
+        keys = pickup * span + dropoff
+        decode = None
+    else:
+        # IDs dispersos: compactar a 0..Z-1 (zone_ids ordenado conserva el orden)
+        zone_ids = np.unique(np.concatenate([pickup, dropoff]))
+        span = len(zone_ids)
+        keys = np.searchsorted(zone_ids, pickup) * span + np.searchsorted(zone_ids, dropoff)
+        decode = zone_ids
+
+    pair_keys, pair_counts = _count_keys(keys, span)
+    top = _top_indices(pair_counts, pair_keys, top_n)
+    top_keys = pair_keys[top]
+    top_pickup, top_dropoff = top_keys // span, top_keys % span
+    if decode is not None:
+        top_pickup, top_dropoff = decode[top_pickup], decode[top_dropoff]
+
+    return (
+        zone_ids.tolist(),
+        len(pair_keys),
+        list(zip(top_pickup.tolist(), top_dropoff.tolist(), pair_counts[top].tolist())),
+    )
@@ -0,0 +1,64 @@
+import json
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from .changes import change_feed
+from .schemas import ChangeFeedPosition
+
+# Change feed de zonas y rutas vía Server-Sent Events
+router = APIRouter(prefix="/changes", tags=["Changes"])
+
+# Segundos sin eventos antes de enviar un comentario keep-alive
+KEEPALIVE_SECONDS = 15
+# Eventos enviados por iteración del stream
+BATCH_SIZE = 500
+
+def _sse(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: change\ndata: {json.dumps(event)}\n\n"
+
+def _sse_reset(latest_seq: int) -> str:
+    # El cliente pidió eventos que ya salieron del buffer: debe recargar las colecciones
+    return f"id: {latest_seq}\nevent: reset\ndata: {json.dumps({'seq': latest_seq})}\n\n"
+
+@router.get("/latest", response_model=ChangeFeedPosition)
+async def get_latest_change():
+    """Secuencia actual del feed: el punto desde el que reanudar tras una carga completa."""
+    return {"seq": change_feed.latest_seq, "oldest_seq": change_feed.oldest_seq}
+
+@router.get("/")
+async def stream_changes(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0),
+    follow: bool = True,
+    last_event_id: Optional[int] = Header(None)
+):
+    """
+    Stream SSE de cambios con secuencia > since (o > Last-Event-ID al reconectar).
+    Con follow=false se envían los eventos pendientes y se cierra la conexión.
+    Sin since se empieza desde el evento actual (solo cambios nuevos).
+    """
+    if since is None:
+        since = last_event_id if last_event_id is not None else change_feed.latest_seq
+
+    async def event_stream():
+        position = since
+        while True:
+            events, truncated = change_feed.since(position, limit=BATCH_SIZE)
+            if truncated:
+                position = change_feed.latest_seq
+                yield _sse_reset(position)
+                continue
+            if events:
+                position = events[-1]["seq"]
+                yield "".join(_sse(event) for event in events)
+                continue
+            if not follow or await request.is_disconnected():
+                return
+            if not await change_feed.wait(position, KEEPALIVE_SECONDS):
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import List
+from . import graph
+from .schemas import ZoneDegree, ZoneNeighbor, ZonePath, ZoneReachability, ReachableZone
+from .storage import zones_db
+
+# Consultas sobre el grafo origen/destino, resueltas con los índices de adyacencia
+router = APIRouter(prefix="/graph", tags=["Graph"])
+
+def _validate_zone(zone_id: int):
+    if zone_id not in zones_db:
+        raise HTTPException(status_code=404, detail=f"Zone {zone_id} not found")
+
+def _validate_direction(direction: str):
+    if direction not in graph.DIRECTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"direction must be one of: {', '.join(graph.DIRECTIONS)}"
+        )
+
+@router.get("/zones/{id}/neighbors", response_model=List[ZoneNeighbor])
+def get_neighbors(id: int, direction: str = "out", active_only: bool = False):
+    _validate_zone(id)
+    _validate_direction(direction)
+    found = graph.neighbors(id, direction, active_only)
+    return [
+        {"zone_id": zone_id, "route_ids": sorted(route_ids)}
+        for zone_id, route_ids in sorted(found.items())
+    ]
+
+@router.get("/zones/{id}/degree", response_model=ZoneDegree)
+def get_degree(id: int):
+    _validate_zone(id)
+    return {"zone_id": id, **graph.degree(id)}
+
+@router.get("/zones/{id}/reachable", response_model=ZoneReachability)
+def get_reachable(
+    id: int,
+    k: int = Query(2, ge=1, le=50),
+    direction: str = "out",
+    active_only: bool = False
+):
+    _validate_zone(id)
+    _validate_direction(direction)
+    hops = graph.reachable(id, k, direction, active_only)
+    ordered = sorted(hops.items(), key=lambda item: (item[1], item[0]))
+    zones = [ReachableZone(zone_id=zone_id, hops=h) for zone_id, h in ordered]
+    return {"zone_id": id, "k": k, "direction": direction, "zones": zones}
+
+@router.get("/path", response_model=ZonePath)
+def get_shortest_path(source: int, target: int, active_only: bool = False):
+    _validate_zone(source)
+    _validate_zone(target)
+    path = graph.shortest_path(source, target, active_only)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"No path from zone {source} to zone {target}")
+    return {"source": source, "target": target, "hops": len(path) - 1, "path": path}
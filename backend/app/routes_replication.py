@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Query
+from .changes import change_feed
+from .replication import replication_status
+from .schemas import ReplicationLog, ReplicationSnapshot, ReplicationStatus
+from .storage import snapshot
+
+# Registro de mutaciones para las réplicas de solo lectura (ver app.replication)
+router = APIRouter(prefix="/replication", tags=["Replication"])
+
+# Espera máxima de un long poll a /replication/log
+MAX_WAIT_SECONDS = 60
+
+@router.get("/snapshot", response_model=ReplicationSnapshot)
+def get_snapshot():
+    """Todas las zonas y rutas, con la secuencia del log desde la que seguir."""
+    return snapshot()
+
+@router.get("/log", response_model=ReplicationLog)
+async def get_log(
+    since: int = Query(..., ge=0),
+    limit: int = Query(1000, ge=1, le=10_000),
+    wait: float = Query(0, ge=0, le=MAX_WAIT_SECONDS)
+):
+    """
+    Eventos con secuencia > since, en orden. Con wait > 0 y sin eventos nuevos
+    la respuesta espera hasta que llegue alguno (long polling). truncated=true
+    indica que el log ya no tiene todos los eventos posteriores a since: hay que
+    volver a cargar el snapshot, igual que un epoch distinto del del snapshot
+    (el líder se reinició y su secuencia volvió a empezar).
+    """
+    events, truncated = change_feed.since(since, limit=limit)
+    if not events and not truncated and wait > 0 and await change_feed.wait(since, wait):
+        events, truncated = change_feed.since(since, limit=limit)
+    return {
+        "epoch": change_feed.epoch, "events": events, "truncated": truncated,
+        "latest_seq": change_feed.latest_seq
+    }
+
+@router.get("/status", response_model=ReplicationStatus)
+def get_status():
+    """Rol del proceso y, en una réplica, su retraso respecto del líder."""
+    return replication_status()
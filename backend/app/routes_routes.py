@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Response
 from typing import List, Optional
 from datetime import datetime
+from .export import ROUTE_EXPORT_FIELDS, export_response
+from .pagination import MAX_PAGE_SIZE, paginate
 from .schemas import RouteCreate, RouteUpdate, RouteResponse
-from .storage import routes_db, route_id_counter, zones_db
+from .storage import (
+    routes_db, zones_db, add_route, apply_route_update, find_route_ids, next_route_id, remove_route,
+    route_ids_from, route_ids_to
+)
 
 router = APIRouter(prefix="/routes", tags=["Routes"])
 
@@ -27,34 +32,63 @@ def create_route(route: RouteCreate):
             detail=f"Zone with id {route.dropoff_zone_id} does not exist"
         )
     
-    # Generar ID y crear ruta
-    global route_id_counter
-    route_id = route_id_counter
-    route_id_counter += 1
-    
+    # Generar ID y crear ruta (add_route la registra en los índices de adyacencia)
     new_route = route.model_dump()
-    new_route["id"] = route_id
+    new_route["id"] = next_route_id()
     new_route["created_at"] = datetime.now()
     
-    routes_db[route_id] = new_route
-    return new_route
+    return add_route(new_route)
+
+def _iter_routes(active=None, pickup_zone_id=None, dropoff_zone_id=None):
+    """Recorre las rutas que cumplen los filtros sin construir listas intermedias."""
+    # Con filtro por zona se parte del índice de adyacencia en lugar de recorrer todo
+    if pickup_zone_id is not None and dropoff_zone_id is not None:
+        candidates = sorted(find_route_ids(pickup_zone_id, dropoff_zone_id))
+    elif pickup_zone_id is not None:
+        candidates = sorted(route_ids_from(pickup_zone_id))
+    elif dropoff_zone_id is not None:
+        candidates = sorted(route_ids_to(dropoff_zone_id))
+    else:
+        # Copia de los IDs para tolerar cambios en routes_db mientras se recorre
+        candidates = list(routes_db)
+
+    for route_id in candidates:
+        route = routes_db.get(route_id)
+        if route is None:
+            continue
+        if active is not None and route["active"] != active:
+            continue
+        if pickup_zone_id is not None and route["pickup_zone_id"] != pickup_zone_id:
+            continue
+        if dropoff_zone_id is not None and route["dropoff_zone_id"] != dropoff_zone_id:
+            continue
+        yield route
 
 @router.get("/", response_model=List[RouteResponse])
 def list_routes(
+    response: Response,
+    active: Optional[bool] = None,
+    pickup_zone_id: Optional[int] = None,
+    dropoff_zone_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0)
+):
+    # Sin limit se devuelven todas las rutas; el total filtrado va en X-Total-Count
+    return paginate(_iter_routes(active, pickup_zone_id, dropoff_zone_id), response, limit, offset)
+
+@router.get("/export")
+def export_routes(
+    format: str = "ndjson",
     active: Optional[bool] = None,
     pickup_zone_id: Optional[int] = None,
     dropoff_zone_id: Optional[int] = None
 ):
-    results = list(routes_db.values())
-    
-    if active is not None:
-        results = [r for r in results if r["active"] == active]
-    if pickup_zone_id is not None:
-        results = [r for r in results if r["pickup_zone_id"] == pickup_zone_id]
-    if dropoff_zone_id is not None:
-        results = [r for r in results if r["dropoff_zone_id"] == dropoff_zone_id]
-    
-    return results
+    """
+    Exporta las rutas en streaming: format=ndjson (una ruta por línea),
+    parquet o arrow (Arrow IPC stream). Acepta los mismos filtros que GET /routes.
+    """
+    records = _iter_routes(active, pickup_zone_id, dropoff_zone_id)
+    return export_response(records, ROUTE_EXPORT_FIELDS, format, "routes")
 
 @router.get("/{id}", response_model=RouteResponse)
 def get_route(id: int):
@@ -92,14 +126,11 @@ def update_route(id: int, route_update: RouteUpdate):
             detail=f"Zone with id {new_dropoff} does not exist"
         )
     
-    # Aplicar actualizaciones
-    for key, value in update_data.items():
-        current_route[key] = value
-    
-    return current_route
+    # Aplicar actualizaciones (reindexa la ruta si cambian sus zonas)
+    return apply_route_update(id, update_data)
 
 @router.delete("/{id}", status_code=204)
 def delete_route(id: int):
     if id not in routes_db:
         raise HTTPException(status_code=404, detail="Route not found")
-    del routes_db[id]
+    remove_route(id)
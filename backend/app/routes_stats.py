@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Query
+from .schemas import RouteStats, StatsSummary, TopZones, ZoneStats
+from .storage import route_stats, top_zones, zone_stats
+
+# Estadísticas precalculadas: se leen de contadores que storage mantiene en
+# cada mutación, sin recorrer zonas ni rutas
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+@router.get("/", response_model=StatsSummary)
+def get_stats(k: int = Query(10, ge=1, le=100)):
+    return {"zones": zone_stats(), "routes": route_stats(), "top_zones": top_zones(k)}
+
+@router.get("/zones", response_model=ZoneStats)
+def get_zone_stats():
+    return zone_stats()
+
+@router.get("/routes", response_model=RouteStats)
+def get_route_stats():
+    return route_stats()
+
+@router.get("/top-zones", response_model=TopZones)
+def get_top_zones(k: int = Query(10, ge=1, le=100)):
+    return top_zones(k)
@@ -1,211 +1,814 @@
 # backend/app/routes_uploads.py
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from typing import Optional, List
-import pandas as pd
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional, List, Union
+import hashlib
 import io
+import secrets
+from dataclasses import dataclass
 from datetime import datetime
 
-from .schemas import TripsParquetUploadResult
-from .storage import zones_db, routes_db, route_id_counter
+from . import storage
+from .admission import AdmissionRejected, admission_controller
+from .cache import LRUCache
+from .config import settings
+# pandas/pyarrow (app.ingest) se importan dentro de cada aggregate(): el arranque
+# de la API no paga ese costo (main.py los precarga en segundo plano)
+from .ingest_types import (
+    SAMPLE_MODES, SAMPLE_RANDOM_ROW_GROUPS, IngestError, TripAggregation, TripFilters, parse_zone_ids
+)
+from .jobs import get_job, list_jobs, start_job
+from .schemas import (
+    AdmissionStatus, IngestJobStatus, ParquetInspection, TripsParquetUploadResult, UploadPlan,
+    UploadSessionCreate, UploadSessionStatus, ZoneGeometryStatus
+)
+from .sessions import (
+    append_stream, claim_session, create_session, discard_session, get_session, release_session,
+    remove_session_file
+)
+from .storage import (
+    out_edges, routes_db, store_lock, zones_db,
+    add_route, add_zone, apply_route_update, apply_zone_update, find_route_ids, next_route_id
+)
 
 router = APIRouter(prefix="/uploads", tags=["Uploads"])
 
-@router.post("/trips-parquet", response_model=TripsParquetUploadResult)
+# Tamaño de bloque al leer el archivo subido (se hashea mientras se lee)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Extensiones aceptadas por /uploads/trips-arrow
+ARROW_EXTENSIONS = ('.arrow', '.arrows', '.feather', '.ipc')
+
+# Caché de agregaciones: (hash del contenido, parámetros) -> TripAggregation
+# Evita decodificar y agregar otra vez un archivo que ya se procesó
+aggregation_cache = LRUCache(max_entries=32)
+
+# Modos que aplican al store; mode=plan calcula lo que haría uno de ellos (plan_mode)
+APPLY_MODES = ("create", "update")
+PLAN_MODE = "plan"
+
+# Planes de ingesta: token -> _StoredPlan (la agregación ya hecha y con qué modo aplicarla)
+upload_plans = LRUCache(max_entries=settings.upload_plan_max_entries, ttl_seconds=settings.upload_plan_ttl_seconds)
+
+
+@dataclass
+class _StoredPlan:
+    aggregation: TripAggregation
+    mode: str
+    file_name: str
+    content_hash: Optional[str]
+    filters: TripFilters
+    # storage.stats_version al planificar: cambia con cualquier mutación del store
+    store_version: int
+
+
+async def _read_upload_hashing(file: UploadFile):
+    """Lee el archivo por bloques calculando su SHA-256 al mismo tiempo."""
+    digest = hashlib.sha256()
+    buffer = io.BytesIO()
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        buffer.write(chunk)
+    return digest.hexdigest(), buffer
+
+
+def _aggregation_cache_key(content_hash, limit_rows, top_n_routes, mode, filters: TripFilters):
+    zone_ids = tuple(sorted(filters.zone_ids)) if filters.zone_ids else None
+    return (
+        content_hash, limit_rows, top_n_routes, mode,
+        filters.start, filters.end, zone_ids, filters.sample, filters.seed
+    )
+
+
+def _apply_aggregation(aggregation: TripAggregation, mode: str) -> dict:
+    """
+    Crea/actualiza Zones y Routes a partir de una agregación.
+    Usa la misma lógica CRUD que los endpoints de zones y routes.
+    """
+    zones_created = 0
+    zones_updated = 0
+    routes_created = 0
+    routes_updated = 0
+    errors: List[str] = []
+
+    # Tabla de referencia TLC (POST /zones/reference o TAXI_ZONE_LOOKUP): si está
+    # cargada, las zonas nuevas se crean con su nombre real en lugar del placeholder
+    from .zone_reference import get_zone_reference, new_zone_fields
+
+    reference = get_zone_reference()
+
+    # PROCESAR ZONAS (Zones CRUD logic)
+    for zone_id in aggregation.zone_ids:
+        try:
+            # Verificar si la zona existe en zones_db
+            if zone_id in zones_db:
+                # ZONA EXISTE: Actualizar (marcar como activa)
+                # Simula PUT /zones/{id} con active=True
+                apply_zone_update(zone_id, {"active": True})
+                zones_updated += 1
+
+            else:
+                # ZONA NO EXISTE: Crear con los datos de la referencia o como placeholder
+                # Simula POST /zones con campos mínimos default
+                new_zone = {
+                    "id": zone_id,
+                    **new_zone_fields(zone_id, reference),
+                    "active": True,
+                    "created_at": datetime.now()
+                }
+                add_zone(new_zone)
+                zones_created += 1
+
+        except Exception as e:
+            errors.append(f"Error processing zone {zone_id}: {str(e)}")
+
+    # PROCESAR RUTAS (Routes CRUD logic)
+    for pickup_id, dropoff_id, _count in aggregation.top_routes:
+        try:
+            # Validar que ambas zonas existen (deberían, después de procesar zonas)
+            if pickup_id not in zones_db:
+                errors.append(f"Pickup zone {pickup_id} does not exist in zones_db")
+                continue
+            if dropoff_id not in zones_db:
+                errors.append(f"Dropoff zone {dropoff_id} does not exist in zones_db")
+                continue
+
+            # Buscar existencia de ruta (GET /routes?pickup_zone_id=...&dropoff_zone_id=...)
+            # Consulta O(1) al índice de adyacencia
+            existing_route_ids = find_route_ids(pickup_id, dropoff_id)
+            existing_route_id = min(existing_route_ids) if existing_route_ids else None
+
+            if existing_route_id is not None:
+                # RUTA EXISTE
+                if mode == "update":
+                    # Actualizar ruta existente (PUT /routes/{id})
+                    # Marcar como activa y/o actualizar nombre
+                    apply_route_update(existing_route_id, {"active": True})
+                    routes_updated += 1
+
+            else:
+                # RUTA NO EXISTE
+                if mode in ["create", "update"]:
+                    # Validar pickup != dropoff (por seguridad)
+                    if pickup_id == dropoff_id:
+                        errors.append(f"Pickup and dropoff are the same: {pickup_id}")
+                        continue
+
+                    # Crear nueva ruta (POST /routes)
+                    # Usar el MISMO formato y contador de IDs que routes_routes.py
+                    new_route = {
+                        "id": next_route_id(),  # ID numérico autoincremental
+                        "pickup_zone_id": pickup_id,
+                        "dropoff_zone_id": dropoff_id,
+                        "name": f"Route {pickup_id} to {dropoff_id}",
+                        "active": True,
+                        "created_at": datetime.now()
+                    }
+
+                    # Guardar en routes_db e indexar
+                    add_route(new_route)
+                    routes_created += 1
+
+        except Exception as e:
+            errors.append(f"Error processing route {pickup_id}->{dropoff_id}: {str(e)}")
+
+    return {
+        "zones_created": zones_created,
+        "zones_updated": zones_updated,
+        "routes_created": routes_created,
+        "routes_updated": routes_updated,
+        "errors": errors,
+    }
+
+
+def _plan_aggregation(aggregation: TripAggregation, mode: str) -> dict:
+    """
+    Lo que _apply_aggregation haría con el store actual, sin modificarlo.
+    Zonas: diferencias de conjuntos contra zones_db. Rutas: una consulta al
+    índice de adyacencia por par (origen, destino), sin recorrer routes_db.
+    update = lo que la aplicación actualiza (PUT con active=True) y cuenta en
+    zones_updated/routes_updated; reactivate = las que hoy están inactivas.
+    """
+    with store_lock:
+        zone_ids = set(aggregation.zone_ids)
+        existing = zone_ids & zones_db.keys()
+        zones = {
+            "create": sorted(zone_ids - existing),
+            "update": sorted(existing),
+            "reactivate": sorted(zone_id for zone_id in existing if not zones_db[zone_id]["active"]),
+        }
+
+        routes = {"create": [], "update": [], "unchanged": [], "skipped": []}
+        for pickup_id, dropoff_id, trips in aggregation.top_routes:
+            planned = {"pickup_zone_id": pickup_id, "dropoff_zone_id": dropoff_id, "trips": int(trips)}
+            route_ids = out_edges.get(pickup_id, {}).get(dropoff_id)
+            if route_ids:
+                route_id = min(route_ids)
+                # En modo create las rutas existentes no se tocan
+                if mode == "update":
+                    reactivate = not routes_db[route_id]["active"]
+                    routes["update"].append(dict(planned, route_id=route_id, reactivate=reactivate))
+                else:
+                    routes["unchanged"].append(dict(planned, route_id=route_id))
+            elif pickup_id == dropoff_id:
+                routes["skipped"].append(dict(planned, reason="Pickup and dropoff are the same"))
+            else:
+                routes["create"].append(planned)
+
+    counts = {
+        "zones_to_create": len(zones["create"]),
+        "zones_to_update": len(zones["update"]),
+        "zones_to_reactivate": len(zones["reactivate"]),
+        "routes_to_create": len(routes["create"]),
+        "routes_to_update": len(routes["update"]),
+        "routes_to_reactivate": sum(route["reactivate"] for route in routes["update"]),
+        "routes_unchanged": len(routes["unchanged"]),
+        "routes_skipped": len(routes["skipped"]),
+    }
+    return {"counts": counts, "zones": zones, "routes": routes}
+
+
+def _aggregation_stats(aggregation: TripAggregation, file_name, content_hash, cache_hit, filters: TripFilters) -> dict:
+    return {
+        "file_name": file_name,
+        "rows_read": aggregation.rows_read,
+        "routes_detected": aggregation.routes_detected,
+        "row_groups_total": aggregation.row_groups_total,
+        "row_groups_read": aggregation.row_groups_read,
+        "row_groups_skipped": aggregation.row_groups_skipped,
+        "bytes_skipped": aggregation.bytes_skipped,
+        "content_hash": content_hash,
+        "cache_hit": cache_hit,
+        "sample": filters.sample,
+        "sample_seed": filters.seed,
+    }
+
+
+def _validate_ingest_params(mode, start, end, zone_ids, sample="head", seed=None, plan_mode="update") -> TripFilters:
+    """Validaciones comunes a todas las formas de subir un archivo de viajes."""
+    if mode not in APPLY_MODES + (PLAN_MODE,):
+        raise HTTPException(
+            status_code=400,
+            detail="mode must be 'create', 'update' or 'plan'"
+        )
+    if mode == PLAN_MODE and plan_mode not in APPLY_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail="plan_mode must be 'create' or 'update'"
+        )
+    return _parse_filters(start, end, zone_ids, sample, seed)
+
+
+def _parse_filters(start, end, zone_ids, sample="head", seed=None) -> TripFilters:
+    if sample not in SAMPLE_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"sample must be one of: {', '.join(SAMPLE_MODES)}"
+        )
+    if sample == SAMPLE_RANDOM_ROW_GROUPS and seed is None:
+        # Sin semilla se sortea una y se devuelve en el resultado (muestra reproducible)
+        seed = secrets.randbelow(2 ** 32)
+
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(
+            status_code=400,
+            detail="start must be earlier than end"
+        )
+
+    try:
+        return TripFilters(start=start, end=end, zone_ids=parse_zone_ids(zone_ids), sample=sample, seed=seed)
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _check_parquet_footer(source, filters: TripFilters) -> None:
+    """Valida el archivo y sus columnas con el footer, sin decodificar páginas de datos."""
+    from .ingest import validate_parquet_footer
+
+    try:
+        validate_parquet_footer(source, filters)
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _run_ingest(aggregate, file_name, content_hash, mode, limit_rows, top_n_routes, filters, job=None,
+                plan_mode="update"):
+    """
+    Agrega el archivo (o reutiliza la agregación en caché) y la aplica al store.
+    `aggregate` lee y agrega el archivo; solo se llama si no hay agregación en caché.
+    Si se pasa `job` (trabajo en segundo plano) se actualiza su etapa.
+    Con mode=plan no se modifica nada: se devuelve el plan de plan_mode y se
+    guarda la agregación para aplicarla después con su token.
+    """
+    try:
+        # Un plan y la subida real del mismo archivo comparten la agregación en caché
+        effective_mode = plan_mode if mode == PLAN_MODE else mode
+        cache_key = _aggregation_cache_key(content_hash, limit_rows, top_n_routes, effective_mode, filters)
+        aggregation = aggregation_cache.get(cache_key)
+        cache_hit = aggregation is not None
+
+        if not cache_hit:
+            aggregation = aggregate()
+            aggregation_cache.set(cache_key, aggregation)
+        stats = _aggregation_stats(aggregation, file_name, content_hash, cache_hit, filters)
+
+        if mode == PLAN_MODE:
+            if job is not None:
+                job.stage = "planning"
+            with store_lock:
+                plan = _plan_aggregation(aggregation, plan_mode)
+                store_version = storage.stats_version
+            token = secrets.token_urlsafe(16)
+            upload_plans.set(token, _StoredPlan(aggregation, plan_mode, file_name, content_hash, filters, store_version))
+            return UploadPlan(
+                plan_token=token,
+                expires_in_seconds=settings.upload_plan_ttl_seconds,
+                mode=plan_mode,
+                **stats,
+                **plan
+            )
+
+        # APLICAR ZONAS Y RUTAS AL STORE
+        if job is not None:
+            job.stage = "applying"
+        applied = _apply_aggregation(aggregation, mode)
+
+        return TripsParquetUploadResult(**stats, **applied)
+
+    except HTTPException:
+        raise
+    except IngestError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    except Exception as e:
+        # pandas ya está cargado: aggregate() importó app.ingest
+        import pandas as pd
+
+        if isinstance(e, pd.errors.ParserError):
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid parquet file format"
+            )
+        # Capturar cualquier otro error
+        raise HTTPException(
+            status_code=400,
+            detail=f"Error processing file: {str(e)}"
+        )
+
+
+@router.post("/trips-parquet", response_model=Union[TripsParquetUploadResult, UploadPlan])
 async def upload_trips_parquet(
     file: UploadFile = File(...),
     mode: str = Form(...),
     limit_rows: Optional[int] = Form(50_000),
-    top_n_routes: Optional[int] = Form(50)
+    top_n_routes: Optional[int] = Form(50),
+    start: Optional[datetime] = Form(None),
+    end: Optional[datetime] = Form(None),
+    zone_ids: Optional[str] = Form(None),
+    sample: str = Form("head"),
+    seed: Optional[int] = Form(None),
+    plan_mode: str = Form("update")
 ):
     """
     Procesa archivo parquet de viajes NYC TLC.
     Crea/actualiza Zones y Routes usando la misma lógica CRUD que los endpoints.
+
+    Filtros opcionales (se aplican en el lector parquet, antes de decodificar):
+    - start/end: rango [start, end) sobre la fecha de recogida del viaje.
+    - zone_ids: lista separada por comas; se conservan los viajes cuyo origen
+      o destino esté en la lista.
+
+    Muestreo cuando limit_rows es menor que el archivo:
+    - sample=head (por defecto): los primeros row groups, en orden.
+    - sample=random_row_groups: row groups elegidos al azar con `seed` (si no
+      se pasa, se sortea y se devuelve en sample_seed); solo se decodifican esos.
+
+    Si el mismo contenido ya se procesó con los mismos parámetros, se reutiliza
+    la agregación en caché y no se vuelve a decodificar el archivo.
+
+    mode=plan: agrega el archivo igual pero no modifica el store; devuelve las
+    zonas y rutas que se crearían, actualizarían o quedarían igual con
+    plan_mode (create o update) y un plan_token para aplicarlo después con
+    POST /uploads/plans/{plan_token}/apply sin volver a leer el archivo.
     """
-    
-   
+
     # 1. VALIDACIONES INICIALES
-   
-    if mode not in ["create", "update"]:
+    filters = _validate_ingest_params(mode, start, end, zone_ids, sample, seed, plan_mode)
+
+    if not file.filename.endswith('.parquet'):
         raise HTTPException(
             status_code=400,
-            detail="mode must be 'create' or 'update'"
+            detail="File must be a .parquet file"
         )
-    
+
+    # 2. VALIDAR CON EL FOOTER: un archivo inválido se rechaza antes de leerlo entero
+    await run_in_threadpool(_check_parquet_footer, file.file, filters)
+    await file.seek(0)
+
+    # 3. LEER EL ARCHIVO CALCULANDO SU HASH
+    content_hash, buffer = await _read_upload_hashing(file)
+
+    # 4. LEER SOLO LOS ROW GROUPS NECESARIOS Y AGREGAR PARES (origen, destino)
+    # Se descartan row groups con las estadísticas min/max y la lectura
+    # se detiene al alcanzar limit_rows (evita OOM).
+    def aggregate():
+        import pyarrow as pa
+        from .ingest import aggregate_trips, read_trips
+
+        read_result = read_trips(pa.BufferReader(buffer.getbuffer()), filters=filters, limit_rows=limit_rows)
+        return aggregate_trips(read_result, top_n_routes)
+
+    # 5. APLICAR AL STORE (fuera del event loop: el CRUD sigue respondiendo)
+    return await run_in_threadpool(
+        _run_ingest, aggregate, file.filename, content_hash, mode, limit_rows, top_n_routes, filters,
+        plan_mode=plan_mode
+    )
+
+
+@router.post("/inspect", response_model=ParquetInspection)
+async def inspect_trips_parquet(
+    file: UploadFile = File(...),
+    limit_rows: Optional[int] = Form(50_000),
+    start: Optional[datetime] = Form(None),
+    end: Optional[datetime] = Form(None),
+    zone_ids: Optional[str] = Form(None),
+    sample: str = Form("head"),
+    seed: Optional[int] = Form(None)
+):
+    """
+    Lee solo el footer del parquet: schema, filas, row groups, estadísticas por
+    columna y el costo estimado de ingerirlo con estos filtros y limit_rows
+    (row groups y bytes a decodificar). No lee páginas de datos ni toca el store.
+    Un archivo sin las columnas requeridas responde 200 con valid=false.
+    """
+    filters = _parse_filters(start, end, zone_ids, sample, seed)
     if not file.filename.endswith('.parquet'):
         raise HTTPException(
             status_code=400,
             detail="File must be a .parquet file"
         )
-    
-    try:
-        # 2. LEER Y PREPROCESAR DATAFRAME
-        contents = await file.read()
-        df = pd.read_parquet(io.BytesIO(contents))
-        
-        # Aplicar límite de filas para evitar OOM
-        if limit_rows and len(df) > limit_rows:
-            df = df.head(limit_rows)
-        
-        rows_read = len(df)
-        
-        
-        # 3. VALIDAR COLUMNAS REQUERIDAS
-        required_columns = ['PULocationID', 'DOLocationID']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
+
+    def inspect():
+        from .ingest import inspect_parquet
+
+        try:
+            return inspect_parquet(file.file, filters=filters, limit_rows=limit_rows)
+        except IngestError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    inspection = await run_in_threadpool(inspect)
+    return ParquetInspection(
+        file_name=file.filename, file_size=file.size or 0, sample_seed=filters.seed, **inspection
+    )
+
+
+@router.post("/trips-arrow", response_model=Union[TripsParquetUploadResult, UploadPlan])
+async def upload_trips_arrow(
+    file: UploadFile = File(...),
+    mode: str = Form(...),
+    limit_rows: Optional[int] = Form(50_000),
+    top_n_routes: Optional[int] = Form(50),
+    start: Optional[datetime] = Form(None),
+    end: Optional[datetime] = Form(None),
+    zone_ids: Optional[str] = Form(None),
+    plan_mode: str = Form("update")
+):
+    """
+    Procesa un archivo de viajes en formato Arrow IPC (stream) o Feather v2.
+    Los datos no se convierten a pandas: los pares origen/destino se cuentan
+    con pyarrow.compute directamente sobre los buffers recibidos.
+    Mismos parámetros y resultado que /uploads/trips-parquet.
+    """
+
+    # 1. VALIDACIONES INICIALES
+    filters = _validate_ingest_params(mode, start, end, zone_ids, plan_mode=plan_mode)
+
+    if not file.filename.endswith(ARROW_EXTENSIONS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"File must be an Arrow IPC or Feather file ({', '.join(ARROW_EXTENSIONS)})"
+        )
+
+    # 2. LEER EL ARCHIVO CALCULANDO SU HASH
+    content_hash, buffer = await _read_upload_hashing(file)
+
+    # 3. LEER RECORD BATCHES (zero-copy) Y AGREGAR CON PYARROW
+    def aggregate():
+        import pyarrow as pa
+        from .ingest import aggregate_trips_arrow, read_trips_arrow
+
+        read_result = read_trips_arrow(pa.BufferReader(buffer.getbuffer()), filters=filters, limit_rows=limit_rows)
+        return aggregate_trips_arrow(read_result, top_n_routes)
+
+    # 4. APLICAR AL STORE (fuera del event loop: el CRUD sigue respondiendo)
+    return await run_in_threadpool(
+        _run_ingest, aggregate, file.filename, content_hash, mode, limit_rows, top_n_routes, filters,
+        plan_mode=plan_mode
+    )
+
+
+# SUBIDA POR PARTES (RESUMABLE)
+# 1. POST /uploads/sessions                   -> crea la sesión
+# 2. PUT  /uploads/sessions/{id}?offset=N     -> agrega un bloque en el offset N
+# 3. GET  /uploads/sessions/{id}              -> consulta cuántos bytes llegaron (para reanudar)
+# 4. POST /uploads/sessions/{id}/complete     -> procesa el archivo desde disco
+
+def _session_status(session) -> UploadSessionStatus:
+    return UploadSessionStatus(
+        upload_id=session.upload_id,
+        file_name=session.file_name,
+        total_size=session.total_size,
+        received_bytes=session.received_bytes,
+        complete=session.complete,
+        created_at=session.created_at
+    )
+
+
+def _get_session_or_404(upload_id: str):
+    session = get_session(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+
+@router.post("/sessions", response_model=UploadSessionStatus, status_code=201)
+async def create_upload_session(payload: UploadSessionCreate):
+    if not payload.file_name.endswith('.parquet'):
+        raise HTTPException(
+            status_code=400,
+            detail="File must be a .parquet file"
+        )
+    session = create_session(payload.file_name, payload.total_size)
+    return _session_status(session)
+
+
+@router.get("/sessions/{upload_id}", response_model=UploadSessionStatus)
+async def get_upload_session(upload_id: str):
+    return _session_status(_get_session_or_404(upload_id))
+
+
+@router.put("/sessions/{upload_id}", response_model=UploadSessionStatus)
+async def upload_chunk(upload_id: str, request: Request, offset: int = Query(..., ge=0)):
+    """
+    Agrega un bloque al archivo de la sesión. El cuerpo de la petición son los
+    bytes del bloque y se escribe a disco a medida que llega.
+    El offset debe coincidir con los bytes ya recibidos; si no, se responde 409
+    con el offset esperado en la cabecera Upload-Offset.
+    """
+    session = _get_session_or_404(upload_id)
+
+    async with session.lock:
+        if offset != session.received_bytes:
             raise HTTPException(
-                status_code=400,
-                detail=f"Missing required columns: {', '.join(missing_columns)}"
+                status_code=409,
+                detail=f"Expected offset {session.received_bytes}",
+                headers={"Upload-Offset": str(session.received_bytes)}
             )
-        
-        # 4. LIMPIAR Y CONVERTIR DATOS
-        # Convertir a numérico y manejar valores nulos
-        df['PULocationID'] = pd.to_numeric(df['PULocationID'], errors='coerce').fillna(0).astype(int)
-        df['DOLocationID'] = pd.to_numeric(df['DOLocationID'], errors='coerce').fillna(0).astype(int)
-        
-        # Filtrar IDs inválidos (<= 0)
-        df = df[(df['PULocationID'] > 0) & (df['DOLocationID'] > 0)]
-        
-        if len(df) == 0:
+
+        content_length = request.headers.get("content-length")
+        if (session.total_size is not None and content_length is not None
+                and offset + int(content_length) > session.total_size):
             raise HTTPException(
                 status_code=400,
-                detail="No valid rows found after cleaning data"
+                detail="Chunk exceeds the declared total_size"
             )
-        
-        # 5. INICIALIZAR CONTADORES Y ERRORES
-        zones_created = 0
-        zones_updated = 0
-        routes_created = 0
-        routes_updated = 0
-        errors: List[str] = []
-        
-        # Usar contador global compartido con routes_routes.py
-        global route_id_counter
-        
-        
-        # 6. PROCESAR ZONAS (Zones CRUD logic)
-        
-        # Obtener todas las zonas únicas del dataset
-        pickup_zones = set(df['PULocationID'].unique())
-        dropoff_zones = set(df['DOLocationID'].unique())
-        all_zone_ids = pickup_zones.union(dropoff_zones)
-        
-        for zone_id in all_zone_ids:
-            try:
-                # Verificar si la zona existe en zones_db
-                if zone_id in zones_db:
-                    # ZONA EXISTE: Actualizar (marcar como activa)
-                    # Simula PUT /zones/{id} con active=True
-                    zones_db[zone_id]["active"] = True
-                    zones_updated += 1
-                    
-                else:
-                    # ZONA NO EXISTE: Crear placeholder
-                    # Simula POST /zones con campos mínimos default
-                    new_zone = {
-                        "id": zone_id,
-                        "borough": "Unknown",
-                        "zone_name": f"Zone {zone_id}",
-                        "service_zone": "Unknown",
-                        "active": True,
-                        "created_at": datetime.now()
-                    }
-                    zones_db[zone_id] = new_zone
-                    zones_created += 1
-                    
-            except Exception as e:
-                errors.append(f"Error processing zone {zone_id}: {str(e)}")
-        
-        # 7. PROCESAR RUTAS (Routes CRUD logic)
-        
-        # 7.1 Obtener pares (PULocationID, DOLocationID) y su conteo
-        route_counts = df.groupby(['PULocationID', 'DOLocationID']).size().reset_index(name='count')
-        
-        # 7.2 Filtrar rutas inválidas (pickup == dropoff)
-        route_counts = route_counts[route_counts['PULocationID'] != route_counts['DOLocationID']]
-        
-        # 7.3 Ordenar por frecuencia y tomar top N
-        route_counts = route_counts.sort_values('count', ascending=False)
-        routes_detected = len(route_counts)
-        top_routes = route_counts.head(top_n_routes)
-        
-        # 7.4 Procesar cada ruta top
-        for _, row in top_routes.iterrows():
-            pickup_id = int(row['PULocationID'])
-            dropoff_id = int(row['DOLocationID'])
-            
-            try:
-                # Validar que ambas zonas existen (deberían, después del paso 6)
-                if pickup_id not in zones_db:
-                    errors.append(f"Pickup zone {pickup_id} does not exist in zones_db")
-                    continue
-                if dropoff_id not in zones_db:
-                    errors.append(f"Dropoff zone {dropoff_id} does not exist in zones_db")
-                    continue
-                
-                # 7.5 Buscar existencia de ruta (GET /routes?pickup_zone_id=...&dropoff_zone_id=...)
-                existing_route_id = None
-                for route_id, route in routes_db.items():
-                    if (route['pickup_zone_id'] == pickup_id and 
-                        route['dropoff_zone_id'] == dropoff_id):
-                        existing_route_id = route_id
-                        break
-                
-                if existing_route_id is not None:
-                    # RUTA EXISTE
-                    if mode == "update":
-                        # Actualizar ruta existente (PUT /routes/{id})
-                        # Marcar como activa y/o actualizar nombre
-                        routes_db[existing_route_id]["active"] = True
-                        routes_updated += 1
-                
-                else:
-                    # RUTA NO EXISTE
-                    if mode in ["create", "update"]:
-                        # Validar pickup != dropoff (por seguridad)
-                        if pickup_id == dropoff_id:
-                            errors.append(f"Pickup and dropoff are the same: {pickup_id}")
-                            continue
-                        
-                        # Crear nueva ruta (POST /routes)
-                        # Usar el MISMO formato que routes_routes.py
-                        new_route = {
-                            "id": route_id_counter,  # ID numérico autoincremental
-                            "pickup_zone_id": pickup_id,
-                            "dropoff_zone_id": dropoff_id,
-                            "name": f"Route {pickup_id} to {dropoff_id}",
-                            "active": True,
-                            "created_at": datetime.now()
-                        }
-                        
-                        # Guardar en routes_db con ID numérico
-                        routes_db[route_id_counter] = new_route
-                        route_id_counter += 1  # Incrementar para próxima ruta
-                        routes_created += 1
-                        
-            except Exception as e:
-                errors.append(f"Error processing route {pickup_id}->{dropoff_id}: {str(e)}")
-        
-        # 8. RETORNAR RESULTADO
-        return TripsParquetUploadResult(
-            file_name=file.filename,
-            rows_read=rows_read,
-            zones_created=zones_created,
-            zones_updated=zones_updated,
-            routes_detected=routes_detected,
-            routes_created=routes_created,
-            routes_updated=routes_updated,
-            errors=errors
-        )
-        
-    except pd.errors.ParserError:
+
+        try:
+            await append_stream(session, request.stream())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    return _session_status(session)
+
+
+@router.post("/sessions/{upload_id}/complete", response_model=Union[TripsParquetUploadResult, UploadPlan])
+async def complete_upload_session(
+    upload_id: str,
+    mode: str = Form(...),
+    limit_rows: Optional[int] = Form(50_000),
+    top_n_routes: Optional[int] = Form(50),
+    start: Optional[datetime] = Form(None),
+    end: Optional[datetime] = Form(None),
+    zone_ids: Optional[str] = Form(None),
+    sample: str = Form("head"),
+    seed: Optional[int] = Form(None),
+    plan_mode: str = Form("update")
+):
+    """
+    Procesa el archivo ensamblado en disco con los mismos parámetros que
+    /uploads/trips-parquet. El archivo se lee con memory-map, sin cargarlo en RAM.
+    """
+    session = _get_session_or_404(upload_id)
+    filters = _validate_ingest_params(mode, start, end, zone_ids, sample, seed, plan_mode)
+
+    if session.total_size is not None and not session.complete:
         raise HTTPException(
             status_code=400,
-            detail="Invalid parquet file format"
+            detail=f"Upload incomplete: received {session.received_bytes} of {session.total_size} bytes"
         )
-    except Exception as e:
-        # Capturar cualquier otro error
+
+    # Un archivo inválido se rechaza antes de esperar turno en la admisión
+    await run_in_threadpool(_check_parquet_footer, session.path, filters)
+
+    def aggregate():
+        import pyarrow as pa
+        from .ingest import aggregate_trips, read_trips
+
+        read_result = read_trips(pa.memory_map(session.path, 'r'), filters=filters, limit_rows=limit_rows)
+        return aggregate_trips(read_result, top_n_routes)
+
+    try:
+        async with session.lock, admission_controller.slot(session.received_bytes):
+            result = await run_in_threadpool(
+                _run_ingest, aggregate, session.file_name, session.digest.hexdigest(),
+                mode, limit_rows, top_n_routes, filters, plan_mode=plan_mode
+            )
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+
+    # El archivo ya se procesó: liberar el espacio en disco
+    discard_session(upload_id)
+    return result
+
+
+@router.post("/sessions/{upload_id}/jobs", response_model=IngestJobStatus, status_code=202)
+async def start_upload_job(
+    upload_id: str,
+    mode: str = Form(...),
+    limit_rows: Optional[int] = Form(50_000),
+    top_n_routes: Optional[int] = Form(50),
+    start: Optional[datetime] = Form(None),
+    end: Optional[datetime] = Form(None),
+    zone_ids: Optional[str] = Form(None),
+    sample: str = Form("head"),
+    seed: Optional[int] = Form(None),
+    plan_mode: str = Form("update")
+):
+    """
+    Igual que /complete, pero el archivo se procesa en segundo plano: responde
+    202 de inmediato y el progreso se consulta en GET /uploads/jobs/{job_id}.
+    """
+    session = _get_session_or_404(upload_id)
+    filters = _validate_ingest_params(mode, start, end, zone_ids, sample, seed, plan_mode)
+
+    if session.total_size is not None and not session.complete:
         raise HTTPException(
             status_code=400,
-            detail=f"Error processing file: {str(e)}"
-        )
\ No newline at end of file
+            detail=f"Upload incomplete: received {session.received_bytes} of {session.total_size} bytes"
+        )
+    if session.lock.locked():
+        raise HTTPException(status_code=409, detail="Upload session is busy")
+
+    # El trabajo se queda con el archivo: la sesión ya no acepta bloques
+    claim_session(upload_id)
+    content_hash = session.digest.hexdigest()
+
+    def work(job):
+        def aggregate():
+            import pyarrow as pa
+            from .ingest import aggregate_trips, read_trips
+
+            job.stage = "reading"
+            read_result = read_trips(
+                pa.memory_map(session.path, 'r'), filters=filters, limit_rows=limit_rows, progress=job.report
+            )
+            job.stage = "aggregating"
+            return aggregate_trips(read_result, top_n_routes)
+
+        try:
+            # El trabajo queda en "queued" hasta que el control de admisión le da turno
+            with admission_controller.slot_blocking(session.received_bytes):
+                try:
+                    return _run_ingest(
+                        aggregate, session.file_name, content_hash,
+                        mode, limit_rows, top_n_routes, filters, job=job, plan_mode=plan_mode
+                    )
+                finally:
+                    # El archivo solo se borra si la ingesta llegó a correr
+                    remove_session_file(session)
+        except AdmissionRejected:
+            # Rechazo transitorio (cola llena o espera vencida): la sesión vuelve con
+            # su archivo y el trabajo se puede volver a lanzar con el mismo upload_id
+            release_session(session)
+            raise
+
+    return _job_status(start_job(session.file_name, work))
+
+
+# TRABAJOS DE INGESTA EN SEGUNDO PLANO
+
+def _job_status(job) -> IngestJobStatus:
+    return IngestJobStatus(
+        job_id=job.job_id,
+        file_name=job.file_name,
+        stage=job.stage,
+        rows_processed=job.rows_processed,
+        rows_total=job.rows_total,
+        rows_per_second=job.rows_per_second,
+        eta_seconds=job.eta_seconds,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        result=job.result,
+        error=job.error
+    )
+
+
+# PLANES DE INGESTA (mode=plan)
+
+@router.post("/plans/{plan_token}/apply", response_model=TripsParquetUploadResult)
+async def apply_upload_plan(plan_token: str, require_unchanged: bool = False):
+    """
+    Aplica la agregación guardada por una subida con mode=plan, con el modo
+    del plan. Cada plan se aplica una sola vez. Con require_unchanged=true se
+    responde 409 si el store cambió desde que se hizo el plan (el plan sigue
+    disponible); si no, se aplica sobre el store actual, como una subida normal.
+    """
+    plan = upload_plans.pop(plan_token)
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Upload plan not found or expired")
+
+    def apply():
+        # Verificar y aplicar con el lock tomado: ninguna otra mutación entra en medio
+        with store_lock:
+            if require_unchanged and plan.store_version != storage.stats_version:
+                upload_plans.set(plan_token, plan)
+                raise HTTPException(status_code=409, detail="Store changed since the plan was made")
+            applied = _apply_aggregation(plan.aggregation, plan.mode)
+        stats = _aggregation_stats(plan.aggregation, plan.file_name, plan.content_hash, True, plan.filters)
+        return TripsParquetUploadResult(**stats, **applied)
+
+    return await run_in_threadpool(apply)
+
+
+@router.post("/zone-geometry", response_model=ZoneGeometryStatus)
+async def upload_zone_geometry(
+    file: UploadFile = File(...),
+    id_property: Optional[str] = Form(None)
+):
+    """
+    Carga los polígonos de las zonas TLC (GeoJSON FeatureCollection en lon/lat)
+    para ingerir archivos con coordenadas en lugar de PULocationID/DOLocationID.
+    `id_property` es la propiedad con el ID de zona (por defecto LocationID o location_id).
+    Reemplaza la geometría anterior y descarta las agregaciones en caché.
+    """
+    raw = await file.read()
+
+    def build():
+        from .geo import load_zone_geojson
+
+        try:
+            return load_zone_geojson(raw, id_property=id_property)
+        except IngestError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    locator = await run_in_threadpool(build)
+    from .geo import set_zone_locator
+
+    set_zone_locator(locator)
+    # Un mismo archivo con otra geometría puede dar otras zonas
+    aggregation_cache.clear()
+    return locator.summary()
+
+
+@router.get("/zone-geometry", response_model=ZoneGeometryStatus)
+async def get_zone_geometry():
+    from .geo import get_zone_locator, zone_locator_error
+
+    locator = await run_in_threadpool(get_zone_locator)
+    if locator is None:
+        # Si TAXI_ZONES_GEOJSON no se pudo leer, el detalle lo dice
+        error = zone_locator_error()
+        detail = f"Zone geometry not loaded: {error}" if error else "Zone geometry not loaded"
+        raise HTTPException(status_code=404, detail=detail)
+    return locator.summary()
+
+
+@router.get("/admission", response_model=AdmissionStatus)
+async def get_admission_status():
+    """Ocupación del control de admisión: ingestas activas, cola y rechazos."""
+    return admission_controller.snapshot()
+
+
+@router.get("/jobs", response_model=List[IngestJobStatus])
+async def list_upload_jobs():
+    return [_job_status(job) for job in list_jobs()]
+
+
+@router.get("/jobs/{job_id}", response_model=IngestJobStatus)
+async def get_upload_job(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+    return _job_status(job)
+
+
+@router.delete("/sessions/{upload_id}", status_code=204)
+async def abort_upload_session(upload_id: str):
+    _get_session_or_404(upload_id)
+    discard_session(upload_id)
+    return None
@@ -1,7 +1,17 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, File, Form, HTTPException, Query, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional
-from .schemas import ZoneCreate, ZoneUpdate, ZoneResponse
-from .storage import zones_db
+from .export import ZONE_EXPORT_FIELDS, export_response
+from .ingest_types import IngestError, parse_zone_ids
+from .pagination import MAX_PAGE_SIZE, paginate
+from .schemas import (
+    NearbyZone, ZoneBulkDelete, ZoneBulkDeleteResult, ZoneCreate, ZoneReferenceResult, ZoneReferenceStatus,
+    ZoneUpdate, ZoneResponse
+)
+from .storage import (
+    routes_db, zones_db, add_zone, apply_route_update, apply_zone_update, nearest_zones, remove_route,
+    remove_zone, route_ids_for_zone, store_lock, zones_within
+)
 
 # Configuración del router con prefijo y etiquetas 
 router = APIRouter(prefix="/zones", tags=["Zones"])
@@ -16,19 +26,131 @@ async def create_zone(zone: ZoneCreate):
     # Asignar la marca de tiempo de creación en el servidor
     new_zone["created_at"] = datetime.now()
     # Guardar
-    zones_db[zone.id] = new_zone
-    return new_zone
+    return add_zone(new_zone)
+
+def _iter_zones(active=None, borough=None, ids=None):
+    """Recorre las zonas que cumplen los filtros sin construir listas intermedias."""
+    borough_text = borough.lower() if borough else None
+    # Con ids solo se buscan esas zonas (O(len(ids)), sin recorrer zones_db);
+    # si no, copia de los IDs para tolerar cambios en zones_db mientras se recorre
+    for zone_id in sorted(ids) if ids is not None else list(zones_db):
+        zone = zones_db.get(zone_id)
+        if zone is None:
+            continue
+        # Filtrado lógico por estado activo/inactivo
+        if active is not None and zone["active"] != active:
+            continue
+        # Filtrado por coincidencia parcial de texto en el municipio
+        if borough_text and borough_text not in zone["borough"].lower():
+            continue
+        yield zone
 
 @router.get("/", response_model=List[ZoneResponse])
-async def list_zones(active: Optional[bool] = None, borough: Optional[str] = None):
-    results = list(zones_db.values())
-    # Filtrado lógico por estado activo/inactivo
-    if active is not None:
-        results = [z for z in results if z["active"] == active]
-    # Filtrado por coincidencia parcial de texto en el municipio
-    if borough:
-        results = [z for z in results if borough.lower() in z["borough"].lower()]
-    return results
+async def list_zones(
+    response: Response,
+    active: Optional[bool] = None,
+    borough: Optional[str] = None,
+    ids: Optional[str] = Query(None, description="IDs separados por coma, p. ej. 132,138"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0)
+):
+    # Sin limit se devuelven todas las zonas; el total filtrado va en X-Total-Count
+    try:
+        zone_ids = parse_zone_ids(ids)
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=str(e).replace("zone_ids", "ids"))
+    return paginate(_iter_zones(active, borough, zone_ids), response, limit, offset)
+
+@router.get("/export")
+async def export_zones(format: str = "ndjson", active: Optional[bool] = None, borough: Optional[str] = None):
+    """
+    Exporta las zonas en streaming: format=ndjson (una zona por línea),
+    parquet o arrow (Arrow IPC stream). Acepta los mismos filtros que GET /zones.
+    """
+    records = _iter_zones(active, borough)
+    return export_response(records, ZONE_EXPORT_FIELDS, format, "zones")
+
+# Declaradas antes de /{id} para que "nearest" y "within" no se lean como un ID
+@router.get("/nearest", response_model=List[NearbyZone])
+async def get_nearest_zones(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(5, ge=1, le=1000),
+    active: Optional[bool] = None
+):
+    """
+    Las k zonas cuyo centroide (lat/lon) está más cerca del punto, con la
+    distancia en km. Se resuelve con el índice de grilla de storage.zone_locations.
+    """
+    return nearest_zones(lat, lon, k, active)
+
+@router.get("/within", response_model=List[NearbyZone])
+async def get_zones_within(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(..., gt=0, le=500),
+    active: Optional[bool] = None
+):
+    """Zonas con centroide a radius_km o menos del punto, de la más cercana a la más lejana."""
+    return zones_within(lat, lon, radius_km, active)
+
+@router.post("/reference", response_model=ZoneReferenceResult)
+async def load_zone_reference(
+    file: UploadFile = File(...),
+    overwrite: bool = Form(False),
+    create_missing: bool = Form(False),
+    remember: bool = Form(True)
+):
+    """
+    Carga la tabla de zonas TLC (taxi_zone_lookup.csv o .parquet: LocationID,
+    Borough, Zone, service_zone) y la cruza con el store en una sola pasada:
+    los placeholders que creó la ingesta ("Unknown" / "Zone {id}") toman el
+    municipio, nombre y zona de servicio reales. overwrite=true también
+    reemplaza zonas con datos propios; create_missing=true crea las zonas de la
+    referencia que no existen. Con remember=true la ingesta usa esta tabla
+    para nombrar las zonas nuevas.
+    """
+    raw = await file.read()
+    file_name = file.filename or ""
+
+    def merge():
+        from datetime import datetime
+        from .zone_reference import (
+            ZoneReference, plan_reference_merge, read_zone_reference, set_zone_reference
+        )
+
+        try:
+            reference = read_zone_reference(raw, file_name)
+        except IngestError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        with store_lock:
+            changes, missing_ids, counts = plan_reference_merge(reference, zones_db, overwrite=overwrite)
+            # apply_zone_update mantiene los contadores por municipio/zona de servicio y el change feed
+            for zone_id, fields in changes:
+                apply_zone_update(zone_id, fields)
+            created = 0
+            if create_missing:
+                records = reference.set_index("id").loc[missing_ids].reset_index().to_dict("records")
+                for record in records:
+                    add_zone({**record, "active": True, "created_at": datetime.now()})
+                created = len(records)
+
+        if remember:
+            set_zone_reference(ZoneReference(reference, file_name))
+        return {
+            "file_name": file_name, "zones_created": created, "zones_missing": len(missing_ids) - created,
+            "remembered": remember, **counts
+        }
+
+    return await run_in_threadpool(merge)
+
+@router.get("/reference", response_model=ZoneReferenceStatus)
+async def get_zone_reference_status():
+    """Tabla de referencia que usa la ingesta para nombrar zonas nuevas (o por qué no se pudo cargar)."""
+    from .zone_reference import zone_reference_status
+
+    return await run_in_threadpool(zone_reference_status)
 
 @router.get("/{id}", response_model=ZoneResponse)
 async def get_zone(id: int):
@@ -36,23 +158,91 @@ async def get_zone(id: int):
         raise HTTPException(status_code=404, detail="Zone not found") 
     return zones_db[id]
 
+# Semántica de cascada sobre las rutas que referencian una zona
+# - restrict:   falla con 409 si hay rutas afectadas
+# - delete:     elimina las rutas afectadas
+# - deactivate: marca como inactivas las rutas afectadas
+DELETE_CASCADES = ("restrict", "delete", "deactivate")
+DEACTIVATE_CASCADES = ("restrict", "deactivate")
+
+def _validate_cascade(cascade: Optional[str], allowed):
+    if cascade is not None and cascade not in allowed:
+        raise HTTPException(
+            status_code=400,
+            detail=f"cascade must be one of: {', '.join(allowed)}"
+        )
+
+def _apply_cascade(route_ids: set, cascade: str) -> dict:
+    """
+    Aplica la cascada solo a las rutas afectadas (obtenidas del índice inverso
+    zona -> rutas), sin recorrer routes_db completo.
+    """
+    routes_deleted = 0
+    routes_deactivated = 0
+    if cascade == "restrict" and route_ids:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Zone is referenced by {len(route_ids)} route(s); use cascade=delete or cascade=deactivate"
+        )
+    for route_id in sorted(route_ids):
+        if cascade == "delete":
+            remove_route(route_id)
+            routes_deleted += 1
+        elif cascade == "deactivate" and routes_db[route_id]["active"]:
+            apply_route_update(route_id, {"active": False})
+            routes_deactivated += 1
+    return {"routes_deleted": routes_deleted, "routes_deactivated": routes_deactivated}
+
 @router.put("/{id}", response_model=ZoneResponse)
-async def update_zone(id: int, zone_update: ZoneUpdate):
+async def update_zone(id: int, zone_update: ZoneUpdate, cascade: Optional[str] = None):
+    """
+    Actualiza la zona. Si se desactiva (active=false), `cascade` decide qué pasa
+    con sus rutas activas: restrict (409 si hay) o deactivate. Sin cascade no se tocan.
+    """
+    _validate_cascade(cascade, DEACTIVATE_CASCADES)
     if id not in zones_db:
         raise HTTPException(status_code=404, detail="Zone not found")
     
-    stored_zone = zones_db[id]
     update_data = zone_update.model_dump(exclude_unset=True)
     
-    for key, value in update_data.items():
-        stored_zone[key] = value
-        
-    zones_db[id] = stored_zone
-    return stored_zone
+    with store_lock:
+        if update_data.get("active") is False and cascade is not None:
+            active_route_ids = {r for r in route_ids_for_zone(id) if routes_db[r]["active"]}
+            _apply_cascade(active_route_ids, cascade)
+        return apply_zone_update(id, update_data)
+
+@router.post("/bulk-delete", response_model=ZoneBulkDeleteResult)
+async def bulk_delete_zones(payload: ZoneBulkDelete):
+    """
+    Elimina varias zonas en una sola operación con la misma semántica de cascada.
+    Con restrict no se elimina ninguna si alguna zona tiene rutas.
+    """
+    _validate_cascade(payload.cascade, DELETE_CASCADES)
+    with store_lock:
+        requested = list(dict.fromkeys(payload.ids))
+        found = [zone_id for zone_id in requested if zone_id in zones_db]
+        not_found = [zone_id for zone_id in requested if zone_id not in zones_db]
+
+        affected = set()
+        for zone_id in found:
+            affected |= route_ids_for_zone(zone_id)
+        counts = _apply_cascade(affected, payload.cascade)
+
+        for zone_id in found:
+            remove_zone(zone_id)
+
+    return {"deleted": found, "not_found": not_found, **counts}
 
 @router.delete("/{id}", status_code=204)
-async def delete_zone(id: int):
+async def delete_zone(id: int, cascade: str = "restrict"):
+    """
+    Elimina la zona. `cascade` decide qué pasa con las rutas que la referencian:
+    restrict (default, 409 si hay), delete o deactivate.
+    """
+    _validate_cascade(cascade, DELETE_CASCADES)
     if id not in zones_db:
         raise HTTPException(status_code=404, detail="Zone not found")
-    del zones_db[id]
+    with store_lock:
+        _apply_cascade(route_ids_for_zone(id), cascade)
+        remove_zone(id)
     return None
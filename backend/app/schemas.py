@@ -1,12 +1,15 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Union
 
 class ZoneBase(BaseModel):
     borough: str = Field(..., min_length=1)
     zone_name: str = Field(..., min_length=1)
     service_zone: str = "Unknown"
     active: bool = True
+    # Centroide opcional (WGS84); las zonas sin lat y lon no aparecen en /zones/nearest
+    lat: Optional[float] = Field(None, ge=-90, le=90)
+    lon: Optional[float] = Field(None, ge=-180, le=180)
 
 class ZoneCreate(ZoneBase):
     id: int = Field(..., gt=0)
@@ -16,11 +19,48 @@ class ZoneUpdate(BaseModel):
     zone_name: Optional[str] = None
     service_zone: Optional[str] = None
     active: Optional[bool] = None
+    lat: Optional[float] = Field(None, ge=-90, le=90)
+    lon: Optional[float] = Field(None, ge=-180, le=180)
 
 class ZoneResponse(ZoneBase):
     id: int
     created_at: datetime
 
+class NearbyZone(ZoneResponse):
+    distance_km: float
+
+class ZoneReferenceResult(BaseModel):
+    file_name: str
+    rows: int
+    # Placeholders de la ingesta ("Unknown" / "Zone {id}") reemplazados por los datos reales
+    zones_upgraded: int
+    # Zonas con datos propios sobrescritas (solo con overwrite=true)
+    zones_updated: int
+    zones_unchanged: int
+    zones_created: int = 0
+    # IDs de la referencia que no están en el store (se crean con create_missing=true)
+    zones_missing: int = 0
+    placeholders_remaining: int
+    # Si la tabla quedó cargada para que la ingesta nombre las zonas nuevas
+    remembered: bool
+
+class ZoneReferenceStatus(BaseModel):
+    loaded: bool
+    source: Optional[str] = None
+    rows: int = 0
+    # Por qué no se pudo leer TAXI_ZONE_LOOKUP (la ingesta usa placeholders)
+    error: Optional[str] = None
+
+class ZoneBulkDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+    cascade: str = "restrict"
+
+class ZoneBulkDeleteResult(BaseModel):
+    deleted: List[int]
+    not_found: List[int]
+    routes_deleted: int
+    routes_deactivated: int
+
 class RouteBase(BaseModel):
     pickup_zone_id: int = Field(..., gt=0)
     dropoff_zone_id: int = Field(..., gt=0)
@@ -48,4 +88,264 @@ class TripsParquetUploadResult(BaseModel):
     routes_detected: int
     routes_created: int
     routes_updated: int
-    errors: List[str] = []
\ No newline at end of file
+    # Pushdown de filtros: row groups descartados por estadísticas min/max
+    row_groups_total: int = 0
+    row_groups_read: int = 0
+    row_groups_skipped: int = 0
+    bytes_skipped: int = 0
+    # Deduplicación por contenido: SHA-256 del archivo y si se reutilizó la agregación
+    content_hash: Optional[str] = None
+    cache_hit: bool = False
+    # Row groups leídos hasta limit_rows: "head" o "random_row_groups" (con su semilla)
+    sample: str = "head"
+    sample_seed: Optional[int] = None
+    errors: List[str] = []
+
+class PlannedRoute(BaseModel):
+    pickup_zone_id: int
+    dropoff_zone_id: int
+    trips: int
+    # Ruta existente que se actualizaría o que queda igual
+    route_id: Optional[int] = None
+    # La ruta existe inactiva y la actualización la reactiva
+    reactivate: bool = False
+    reason: Optional[str] = None
+
+class UploadPlanCounts(BaseModel):
+    zones_to_create: int
+    zones_to_update: int
+    zones_to_reactivate: int
+    routes_to_create: int
+    routes_to_update: int
+    routes_to_reactivate: int
+    routes_unchanged: int
+    routes_skipped: int
+
+class UploadPlanZones(BaseModel):
+    create: List[int]
+    # Zonas existentes: se actualizan con active=True (reactivate: las que hoy están inactivas)
+    update: List[int]
+    reactivate: List[int]
+
+class UploadPlanRoutes(BaseModel):
+    create: List[PlannedRoute]
+    update: List[PlannedRoute]
+    unchanged: List[PlannedRoute]
+    skipped: List[PlannedRoute]
+
+class UploadPlan(BaseModel):
+    # Se aplica con POST /uploads/plans/{plan_token}/apply sin volver a leer el archivo
+    plan_token: str
+    expires_in_seconds: int
+    file_name: str
+    # Modo con el que se aplicaría el plan: create o update
+    mode: str
+    rows_read: int
+    routes_detected: int
+    row_groups_total: int = 0
+    row_groups_read: int = 0
+    row_groups_skipped: int = 0
+    bytes_skipped: int = 0
+    content_hash: Optional[str] = None
+    cache_hit: bool = False
+    sample: str = "head"
+    sample_seed: Optional[int] = None
+    counts: UploadPlanCounts
+    zones: UploadPlanZones
+    routes: UploadPlanRoutes
+
+class UploadSessionCreate(BaseModel):
+    file_name: str = Field(..., min_length=1)
+    total_size: Optional[int] = Field(None, ge=0)
+
+class UploadSessionStatus(BaseModel):
+    upload_id: str
+    file_name: str
+    total_size: Optional[int] = None
+    received_bytes: int
+    complete: bool
+    created_at: datetime
+
+class IngestJobStatus(BaseModel):
+    job_id: str
+    file_name: str
+    stage: str
+    rows_processed: int
+    rows_total: Optional[int] = None
+    rows_per_second: float
+    eta_seconds: Optional[float] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    result: Optional[Union[TripsParquetUploadResult, UploadPlan]] = None
+    error: Optional[str] = None
+
+class AdmissionStatus(BaseModel):
+    active: int
+    inflight_bytes: int
+    queued: int
+    max_concurrent: int
+    max_inflight_bytes: int
+    max_queue: int
+    admitted_total: int
+    rejected_queue_full_total: int
+    rejected_timeout_total: int
+
+class ParquetColumnInfo(BaseModel):
+    name: str
+    type: str
+    compressed_bytes: int
+    uncompressed_bytes: int
+    # None si algún row group no tiene estadísticas
+    null_count: Optional[int] = None
+    min: Optional[Any] = None
+    max: Optional[Any] = None
+
+class IngestEstimate(BaseModel):
+    # Cota superior con filtros: se asume que todas las filas leídas cumplen
+    row_groups_to_read: int
+    row_groups_skipped: int
+    rows_to_scan: int
+    compressed_bytes_to_read: int
+    decoded_bytes: int
+
+class ParquetInspection(BaseModel):
+    file_name: str
+    file_size: int
+    num_rows: int
+    num_row_groups: int
+    created_by: Optional[str] = None
+    serialized_footer_bytes: int
+    pickup_datetime_column: Optional[str] = None
+    # Sin PULocationID/DOLocationID: zonas asignadas por coordenadas (app.geo)
+    uses_coordinates: bool = False
+    columns: List[ParquetColumnInfo]
+    valid: bool
+    errors: List[str] = []
+    # Con sample=random_row_groups la estimación sigue el orden de esta semilla
+    sample_seed: Optional[int] = None
+    estimate: Optional[IngestEstimate] = None
+
+class ZoneGeometryStatus(BaseModel):
+    zones: int
+    edges: int
+    grid_size: int
+    boundary_cells: int
+    # [min_lon, min_lat, max_lon, max_lat]
+    bounds: List[float]
+
+class ZoneNeighbor(BaseModel):
+    zone_id: int
+    route_ids: List[int]
+
+class ZoneDegree(BaseModel):
+    zone_id: int
+    out_degree: int
+    in_degree: int
+    out_routes: int
+    in_routes: int
+
+class ReachableZone(BaseModel):
+    zone_id: int
+    hops: int
+
+class ZoneReachability(BaseModel):
+    zone_id: int
+    k: int
+    direction: str
+    zones: List[ReachableZone]
+
+class ZonePath(BaseModel):
+    source: int
+    target: int
+    hops: int
+    path: List[int]
+
+class ZoneStats(BaseModel):
+    total: int
+    active: int
+    inactive: int
+    by_borough: Dict[str, int]
+    by_service_zone: Dict[str, int]
+
+class RouteStats(BaseModel):
+    total: int
+    active: int
+    inactive: int
+    by_pickup_borough: Dict[str, int]
+
+class ZoneRouteCount(BaseModel):
+    zone_id: int
+    routes: int
+
+class TopZones(BaseModel):
+    origins: List[ZoneRouteCount]
+    destinations: List[ZoneRouteCount]
+
+class StatsSummary(BaseModel):
+    zones: ZoneStats
+    routes: RouteStats
+    top_zones: TopZones
+
+class ChangeFeedPosition(BaseModel):
+    seq: int
+    oldest_seq: int
+
+class ReplicationSnapshot(BaseModel):
+    # Instancia del change feed del líder (cambia al reiniciarlo)
+    epoch: str
+    seq: int
+    next_route_id: int
+    zones: List[ZoneResponse]
+    routes: List[RouteResponse]
+
+class ReplicationLog(BaseModel):
+    epoch: str
+    events: List[Dict[str, Any]]
+    truncated: bool
+    latest_seq: int
+
+class ReplicationStatus(BaseModel):
+    role: str
+    seq: int
+    leader_url: Optional[str] = None
+    leader_epoch: Optional[str] = None
+    leader_seq: Optional[int] = None
+    lag_events: int = 0
+    lag_seconds: float = 0.0
+    in_sync: bool = True
+    snapshots_loaded: int = 0
+    events_applied: int = 0
+    last_error: Optional[str] = None
+
+class EventLoopStats(BaseModel):
+    interval_ms: float
+    block_threshold_ms: float
+    samples: int
+    lag_ms_last: float
+    lag_ms_p50: float
+    lag_ms_p99: float
+    lag_ms_max: float
+    blocked_total: int
+
+class ThreadpoolStats(BaseModel):
+    active: int
+    capacity: int
+    queued: int
+    max_queued: int
+    saturated_samples: int
+
+class LoopBlock(BaseModel):
+    at: float
+    lag_ms: float
+    handler: Optional[str] = None
+    path: Optional[str] = None
+    location: Optional[str] = None
+
+class HealthDiagnostics(BaseModel):
+    status: str
+    running: bool
+    uptime_seconds: float
+    event_loop: EventLoopStats
+    threadpool: ThreadpoolStats
+    in_flight_requests: int
+    blocking: List[LoopBlock]
@@ -0,0 +1,110 @@
+# backend/app/sessions.py
+"""
+Sesiones de subida por partes (resumables).
+Cada sesión escribe sus bloques en un archivo temporal en disco y calcula el
+SHA-256 del contenido a medida que llegan los bloques, en orden.
+"""
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional
+
+from .config import settings
+
+
+@dataclass
+class UploadSession:
+    upload_id: str
+    file_name: str
+    total_size: Optional[int]
+    path: str
+    received_bytes: int = 0
+    created_at: datetime = field(default_factory=datetime.now)
+    last_activity: float = field(default_factory=time.monotonic)
+    digest: "hashlib._Hash" = field(default_factory=hashlib.sha256)
+    # Evita que dos PUT concurrentes escriban en la misma sesión
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    @property
+    def complete(self) -> bool:
+        return self.total_size is not None and self.received_bytes == self.total_size
+
+
+# Formato: {upload_id (str): UploadSession}
+upload_sessions: Dict[str, UploadSession] = {}
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def purge_expired_sessions() -> None:
+    """Descarta las sesiones sin actividad durante más del TTL configurado."""
+    deadline = time.monotonic() - settings.upload_session_ttl_seconds
+    for upload_id, session in list(upload_sessions.items()):
+        if session.last_activity < deadline:
+            discard_session(upload_id)
+
+
+def create_session(file_name: str, total_size: Optional[int]) -> UploadSession:
+    purge_expired_sessions()
+    os.makedirs(settings.upload_spool_dir, exist_ok=True)
+
+    upload_id = uuid.uuid4().hex
+    path = os.path.join(settings.upload_spool_dir, f"{upload_id}.part")
+    # Crear el archivo vacío para que los bloques se agreguen al final
+    open(path, "wb").close()
+
+    session = UploadSession(upload_id=upload_id, file_name=file_name, total_size=total_size, path=path)
+    upload_sessions[upload_id] = session
+    return session
+
+
+def get_session(upload_id: str) -> Optional[UploadSession]:
+    return upload_sessions.get(upload_id)
+
+
+def claim_session(upload_id: str) -> Optional[UploadSession]:
+    """Saca la sesión del registro (ya no acepta bloques) sin borrar su archivo."""
+    return upload_sessions.pop(upload_id, None)
+
+
+def release_session(session: UploadSession) -> None:
+    """Devuelve al registro una sesión reclamada (con su archivo) para volver a procesarla."""
+    session.last_activity = time.monotonic()
+    upload_sessions[session.upload_id] = session
+
+
+def remove_session_file(session: UploadSession) -> None:
+    _remove_file(session.path)
+
+
+def discard_session(upload_id: str) -> None:
+    session = upload_sessions.pop(upload_id, None)
+    if session is not None:
+        _remove_file(session.path)
+
+
+async def append_stream(session: UploadSession, stream) -> None:
+    """
+    Escribe en disco los bloques del cuerpo de la petición a medida que llegan.
+    Si el cliente se desconecta a mitad, `received_bytes` refleja lo que sí se
+    guardó y la subida puede continuar desde ese offset.
+    """
+    with open(session.path, "ab") as spool:
+        async for chunk in stream:
+            if not chunk:
+                continue
+            if session.total_size is not None and session.received_bytes + len(chunk) > session.total_size:
+                raise ValueError("Chunk exceeds the declared total_size")
+            spool.write(chunk)
+            session.digest.update(chunk)
+            session.received_bytes += len(chunk)
+            session.last_activity = time.monotonic()
@@ -0,0 +1,178 @@
+# backend/app/spatial.py
+"""
+Índice espacial de los centroides de zona para consultas de vecinos cercanos.
+Grilla uniforme en grados: {celda: {zone_id, ...}}. Insertar, mover o quitar
+una zona es O(1); el tamaño de celda se recalcula (reconstruyendo la grilla)
+solo cuando la cantidad de zonas se duplica o se reduce a la mitad, así cada
+celda tiene pocas zonas y una consulta k-NN recorre unas pocas celdas.
+Distancia: equirectangular con el coseno de la latitud de la consulta, precisa
+a escala urbana (error < 0.1% en distancias de decenas de km).
+"""
+import heapq
+import math
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Zonas por celda que se buscan al reconstruir la grilla
+TARGET_PER_CELL = 2
+MIN_CELL_DEGREES = 1e-4
+MAX_CELL_DEGREES = 1.0
+
+
+class ZoneGrid:
+    def __init__(self):
+        self.points: Dict[int, Tuple[float, float]] = {}
+        self.cell_degrees = MAX_CELL_DEGREES
+        self._cells: Dict[Tuple[int, int], Set[int]] = {}
+        self._sized_for = 0
+        # Celdas extremas ocupadas (tope de la búsqueda por anillos); al quitar
+        # zonas pueden quedar más amplias de lo necesario, lo que solo es más lento
+        self._bounds: Optional[List[int]] = None
+
+    def _add_to_cell(self, zone_id: int, lat: float, lon: float) -> None:
+        cell = self._cell(lat, lon)
+        self._cells.setdefault(cell, set()).add(zone_id)
+        if self._bounds is None:
+            self._bounds = [cell[0], cell[0], cell[1], cell[1]]
+        else:
+            bounds = self._bounds
+            bounds[0], bounds[1] = min(bounds[0], cell[0]), max(bounds[1], cell[0])
+            bounds[2], bounds[3] = min(bounds[2], cell[1]), max(bounds[3], cell[1])
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def _resize(self) -> None:
+        """Elige el tamaño de celda para ~TARGET_PER_CELL zonas por celda y reindexa."""
+        count = len(self.points)
+        self._sized_for = count
+        if count > 1:
+            lats = [lat for lat, _ in self.points.values()]
+            lons = [lon for _, lon in self.points.values()]
+            area = max(max(lats) - min(lats), MIN_CELL_DEGREES) * max(max(lons) - min(lons), MIN_CELL_DEGREES)
+            size = math.sqrt(area * TARGET_PER_CELL / count)
+            self.cell_degrees = min(max(size, MIN_CELL_DEGREES), MAX_CELL_DEGREES)
+        self._cells = {}
+        self._bounds = None
+        for zone_id, (lat, lon) in self.points.items():
+            self._add_to_cell(zone_id, lat, lon)
+
+    def _maybe_resize(self) -> None:
+        count = len(self.points)
+        if count > 2 * max(self._sized_for, 8) or (self._sized_for > 16 and count < self._sized_for // 2):
+            self._resize()
+
+    def set(self, zone_id: int, lat: Optional[float], lon: Optional[float]) -> None:
+        """Inserta o mueve la zona; sin coordenadas la quita del índice."""
+        self.remove(zone_id)
+        if lat is None or lon is None:
+            return
+        self.points[zone_id] = (lat, lon)
+        self._add_to_cell(zone_id, lat, lon)
+        self._maybe_resize()
+
+    def remove(self, zone_id: int) -> None:
+        point = self.points.pop(zone_id, None)
+        if point is None:
+            return
+        cell = self._cell(*point)
+        members = self._cells[cell]
+        members.discard(zone_id)
+        if not members:
+            del self._cells[cell]
+        self._maybe_resize()
+
+    def clear(self) -> None:
+        self.points.clear()
+        self.cell_degrees = MAX_CELL_DEGREES
+        self._cells = {}
+        self._sized_for = 0
+        self._bounds = None
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _ring(self, center: Tuple[int, int], radius: int) -> Iterator[int]:
+        """Zonas de las celdas a distancia de Chebyshev exactamente `radius` del centro."""
+        row, col = center
+        min_row, max_row, min_col, max_col = self._bounds
+        # Solo las celdas del anillo que caen dentro de la zona ocupada
+        first_col, last_col = max(col - radius, min_col), min(col + radius, max_col)
+        for edge_row in {row - radius, row + radius}:
+            if min_row <= edge_row <= max_row:
+                for c in range(first_col, last_col + 1):
+                    yield from self._cells.get((edge_row, c), ())
+        first_row, last_row = max(row - radius + 1, min_row), min(row + radius - 1, max_row)
+        for edge_col in {col - radius, col + radius}:
+            if radius and min_col <= edge_col <= max_col:
+                for r in range(first_row, last_row + 1):
+                    yield from self._cells.get((r, edge_col), ())
+
+    def _distance(self, lat: float, lon: float, cos_lat: float, zone_id: int) -> float:
+        other_lat, other_lon = self.points[zone_id]
+        d_lat = math.radians(other_lat - lat)
+        d_lon = math.radians(other_lon - lon) * cos_lat
+        return EARTH_RADIUS_KM * math.hypot(d_lat, d_lon)
+
+    def _searched_km(self, lat: float, lon: float, cos_lat: float, center: Tuple[int, int], radius: int) -> float:
+        """Distancia mínima a cualquier punto fuera del cuadrado de celdas ya recorrido."""
+        size = self.cell_degrees
+        row, col = center
+        d_lat = min(lat - (row - radius) * size, (row + radius + 1) * size - lat)
+        d_lon = min(lon - (col - radius) * size, (col + radius + 1) * size - lon)
+        return EARTH_RADIUS_KM * math.radians(min(d_lat, d_lon * cos_lat))
+
+    def nearest(self, lat: float, lon: float, k: int, accept=None) -> List[Tuple[float, int]]:
+        """Las k zonas más cercanas como [(distancia_km, zone_id)], de la más cercana a la más lejana."""
+        if not self.points or k <= 0:
+            return []
+        cos_lat = math.cos(math.radians(lat))
+        center = self._cell(lat, lon)
+        # Heap de máximo (distancias negadas) con los k mejores vistos
+        best: List[Tuple[float, int]] = []
+        # Tope de anillos: cubrir todas las celdas ocupadas
+        min_row, max_row, min_col, max_col = self._bounds
+        max_radius = max(abs(center[0] - min_row), abs(center[0] - max_row),
+                         abs(center[1] - min_col), abs(center[1] - max_col))
+        # Los anillos anteriores a la zona ocupada están vacíos (consulta lejos de todas las zonas)
+        first_radius = max(min_row - center[0], center[0] - max_row, min_col - center[1], center[1] - max_col, 0)
+        for radius in range(first_radius, max_radius + 1):
+            for zone_id in self._ring(center, radius):
+                if accept is not None and not accept(zone_id):
+                    continue
+                distance = self._distance(lat, lon, cos_lat, zone_id)
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, -zone_id))
+                elif (-distance, -zone_id) > best[0]:
+                    heapq.heapreplace(best, (-distance, -zone_id))
+            if len(best) == k and -best[0][0] <= self._searched_km(lat, lon, cos_lat, center, radius):
+                break
+        return sorted((-distance, -zone_id) for distance, zone_id in best)
+
+    def within(self, lat: float, lon: float, radius_km: float, accept=None) -> List[Tuple[float, int]]:
+        """Zonas a radius_km o menos, como [(distancia_km, zone_id)] ordenadas por distancia."""
+        if not self.points:
+            return []
+        cos_lat = math.cos(math.radians(lat))
+        d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        d_lon = d_lat / max(cos_lat, 1e-12)
+        low_row, low_col = self._cell(lat - d_lat, lon - d_lon)
+        high_row, high_col = self._cell(lat + d_lat, lon + d_lon)
+        found = []
+        if (high_row - low_row + 1) * (high_col - low_col + 1) > len(self._cells):
+            # Radio más grande que la grilla ocupada: recorrer las celdas existentes
+            candidates = (z for cell, members in self._cells.items()
+                          if low_row <= cell[0] <= high_row and low_col <= cell[1] <= high_col
+                          for z in members)
+        else:
+            candidates = (z for row in range(low_row, high_row + 1) for col in range(low_col, high_col + 1)
+                          for z in self._cells.get((row, col), ()))
+        for zone_id in candidates:
+            if accept is not None and not accept(zone_id):
+                continue
+            distance = self._distance(lat, lon, cos_lat, zone_id)
+            if distance <= radius_km:
+                found.append((distance, zone_id))
+        found.sort()
+        return found
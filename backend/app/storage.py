@@ -1,3 +1,10 @@
+import threading
+from collections import Counter
+from datetime import datetime
+
+from .changes import change_feed
+from .spatial import ZoneGrid
+
 # Diccionario para almacenar las zonas
 # Formato: {id_zona (int): objeto_zone (dict)}
 zones_db = {}
@@ -7,4 +14,336 @@ zones_db = {}
 routes_db = {}
 
 # Contador opcional para generar IDs de rutas
-route_id_counter = 1
\ No newline at end of file
+route_id_counter = 1
+
+# Índices de adyacencia del grafo de rutas (se mantienen en cada mutación)
+# out_edges: {pickup_zone_id: {dropoff_zone_id: {id_ruta, ...}}}
+# in_edges:  {dropoff_zone_id: {pickup_zone_id: {id_ruta, ...}}}
+out_edges = {}
+in_edges = {}
+
+# Estadísticas agregadas, mantenidas como contadores en cada mutación
+# (GET /stats las lee sin recorrer zones_db ni routes_db)
+zones_by_borough = Counter()
+zones_by_service_zone = Counter()
+zones_by_status = Counter()             # {"active": n, "inactive": n}
+routes_by_status = Counter()
+routes_by_pickup_borough = Counter()    # solo rutas cuya zona de origen existe
+routes_by_pickup_zone = Counter()
+routes_by_dropoff_zone = Counter()
+# Se incrementa en cada mutación; sirve para cachear consultas derivadas (top-k)
+stats_version = 0
+
+# Índice espacial de los centroides (solo zonas con lat y lon), para /zones/nearest
+zone_locations = ZoneGrid()
+
+# Protege routes_db, los índices y el contador: los handlers sync corren en el
+# threadpool, en paralelo con los async
+store_lock = threading.RLock()
+
+
+def next_route_id() -> int:
+    """Genera el siguiente ID de ruta (compartido por /routes y /uploads)."""
+    global route_id_counter
+    with store_lock:
+        route_id = route_id_counter
+        route_id_counter += 1
+        return route_id
+
+
+def _count(counter: Counter, key, delta: int) -> None:
+    counter[key] += delta
+    if counter[key] <= 0:
+        del counter[key]
+
+
+def _status(record: dict) -> str:
+    return "active" if record["active"] else "inactive"
+
+
+def _count_zone(zone: dict, sign: int) -> None:
+    """Suma (sign=1) o resta (sign=-1) la zona de los contadores."""
+    global stats_version
+    _count(zones_by_borough, zone["borough"], sign)
+    _count(zones_by_service_zone, zone["service_zone"], sign)
+    _count(zones_by_status, _status(zone), sign)
+    # Las rutas que salen de la zona se cuentan en el municipio de la zona
+    outgoing_routes = sum(len(route_ids) for route_ids in out_edges.get(zone["id"], {}).values())
+    if outgoing_routes:
+        _count(routes_by_pickup_borough, zone["borough"], sign * outgoing_routes)
+    stats_version += 1
+
+
+def _count_route(route: dict, sign: int) -> None:
+    global stats_version
+    _count(routes_by_status, _status(route), sign)
+    _count(routes_by_pickup_zone, route["pickup_zone_id"], sign)
+    _count(routes_by_dropoff_zone, route["dropoff_zone_id"], sign)
+    pickup_zone = zones_db.get(route["pickup_zone_id"])
+    if pickup_zone is not None:
+        _count(routes_by_pickup_borough, pickup_zone["borough"], sign)
+    stats_version += 1
+
+
+def add_zone(zone: dict) -> dict:
+    with store_lock:
+        replaced = zone["id"] in zones_db
+        if replaced:
+            _count_zone(zones_db[zone["id"]], -1)
+        zones_db[zone["id"]] = zone
+        _count_zone(zone, 1)
+        zone_locations.set(zone["id"], zone.get("lat"), zone.get("lon"))
+        change_feed.publish("zone", "update" if replaced else "create", zone["id"], zone)
+    return zone
+
+
+def apply_zone_update(zone_id: int, changes: dict) -> dict:
+    with store_lock:
+        zone = zones_db[zone_id]
+        _count_zone(zone, -1)
+        for key, value in changes.items():
+            zone[key] = value
+        _count_zone(zone, 1)
+        if "lat" in changes or "lon" in changes:
+            zone_locations.set(zone_id, zone.get("lat"), zone.get("lon"))
+        change_feed.publish("zone", "update", zone_id, zone)
+        return zone
+
+
+def remove_zone(zone_id: int) -> dict:
+    """Elimina solo la zona; las rutas que la referencian se resuelven con cascade en routes_zones."""
+    with store_lock:
+        zone = zones_db.pop(zone_id)
+        # Las rutas que salen de la zona dejan de contar en su municipio
+        _count_zone(zone, -1)
+        zone_locations.remove(zone_id)
+        change_feed.publish("zone", "delete", zone_id)
+        return zone
+
+
+def _link_route(route: dict) -> None:
+    pickup_id = route["pickup_zone_id"]
+    dropoff_id = route["dropoff_zone_id"]
+    out_edges.setdefault(pickup_id, {}).setdefault(dropoff_id, set()).add(route["id"])
+    in_edges.setdefault(dropoff_id, {}).setdefault(pickup_id, set()).add(route["id"])
+
+
+def _unlink_edge(index: dict, zone_id: int, other_id: int, route_id: int) -> None:
+    neighbors = index.get(zone_id)
+    if neighbors is None:
+        return
+    route_ids = neighbors.get(other_id)
+    if route_ids is None:
+        return
+    route_ids.discard(route_id)
+    # Limpiar entradas vacías para que el grado refleje solo aristas reales
+    if not route_ids:
+        del neighbors[other_id]
+        if not neighbors:
+            del index[zone_id]
+
+
+def _unlink_route(route: dict) -> None:
+    _unlink_edge(out_edges, route["pickup_zone_id"], route["dropoff_zone_id"], route["id"])
+    _unlink_edge(in_edges, route["dropoff_zone_id"], route["pickup_zone_id"], route["id"])
+
+
+def add_route(route: dict) -> dict:
+    """Guarda una ruta nueva (con su "id" ya asignado) y la indexa."""
+    with store_lock:
+        routes_db[route["id"]] = route
+        _link_route(route)
+        _count_route(route, 1)
+        change_feed.publish("route", "create", route["id"], route)
+    return route
+
+
+def apply_route_update(route_id: int, changes: dict) -> dict:
+    """Aplica cambios a una ruta existente, reindexándola si cambian sus zonas."""
+    with store_lock:
+        route = routes_db[route_id]
+        _count_route(route, -1)
+        moves = (
+            changes.get("pickup_zone_id", route["pickup_zone_id"]) != route["pickup_zone_id"]
+            or changes.get("dropoff_zone_id", route["dropoff_zone_id"]) != route["dropoff_zone_id"]
+        )
+        if moves:
+            _unlink_route(route)
+        for key, value in changes.items():
+            route[key] = value
+        if moves:
+            _link_route(route)
+        _count_route(route, 1)
+        change_feed.publish("route", "update", route_id, route)
+        return route
+
+
+def remove_route(route_id: int) -> dict:
+    with store_lock:
+        route = routes_db.pop(route_id)
+        _unlink_route(route)
+        _count_route(route, -1)
+        change_feed.publish("route", "delete", route_id)
+        return route
+
+
+def find_route_ids(pickup_zone_id: int, dropoff_zone_id: int) -> set:
+    """IDs de las rutas pickup -> dropoff, en O(1) gracias al índice."""
+    with store_lock:
+        return set(out_edges.get(pickup_zone_id, {}).get(dropoff_zone_id, ()))
+
+
+def route_ids_from(zone_id: int) -> set:
+    """IDs de las rutas que salen de la zona."""
+    with store_lock:
+        return {route_id for route_ids in out_edges.get(zone_id, {}).values() for route_id in route_ids}
+
+
+def route_ids_to(zone_id: int) -> set:
+    """IDs de las rutas que llegan a la zona."""
+    with store_lock:
+        return {route_id for route_ids in in_edges.get(zone_id, {}).values() for route_id in route_ids}
+
+
+def route_ids_for_zone(zone_id: int) -> set:
+    """Índice inverso zona -> rutas: las que salen o llegan a la zona."""
+    with store_lock:
+        return route_ids_from(zone_id) | route_ids_to(zone_id)
+
+
+# REPLICACIÓN
+
+def snapshot() -> dict:
+    """Copia consistente del store y la secuencia del change feed en la que fue tomada."""
+    with store_lock:
+        # Las mutaciones publican con store_lock tomado: ningún evento queda a medias
+        return {
+            "epoch": change_feed.epoch,
+            "seq": change_feed.latest_seq,
+            "next_route_id": route_id_counter,
+            "zones": [dict(zone) for zone in zones_db.values()],
+            "routes": [dict(route) for route in routes_db.values()],
+        }
+
+
+def _restore(record: dict) -> dict:
+    """Deshace la serialización JSON del registro (fechas en ISO 8601)."""
+    record = dict(record)
+    if isinstance(record.get("created_at"), str):
+        record["created_at"] = datetime.fromisoformat(record["created_at"])
+    return record
+
+
+def load_snapshot(zones: list, routes: list, next_id: int) -> None:
+    """Reemplaza todo el store (réplica que arranca o que quedó demasiado atrás) y reconstruye los índices."""
+    global route_id_counter, stats_version
+    with store_lock:
+        zones_db.clear()
+        routes_db.clear()
+        out_edges.clear()
+        in_edges.clear()
+        for counter in (zones_by_borough, zones_by_service_zone, zones_by_status, routes_by_status,
+                        routes_by_pickup_borough, routes_by_pickup_zone, routes_by_dropoff_zone):
+            counter.clear()
+        zone_locations.clear()
+        # Zonas primero: así cada ruta cuenta en el municipio de su zona de origen
+        for zone in map(_restore, zones):
+            zones_db[zone["id"]] = zone
+            _count_zone(zone, 1)
+            zone_locations.set(zone["id"], zone.get("lat"), zone.get("lon"))
+        for route in map(_restore, routes):
+            routes_db[route["id"]] = route
+            _link_route(route)
+            _count_route(route, 1)
+        route_id_counter = max([next_id] + [route_id + 1 for route_id in routes_db])
+        stats_version += 1
+        # Los clientes del change feed local deben recargar
+        change_feed.reset()
+
+
+def apply_change(event: dict) -> None:
+    """Aplica un evento del change feed de otro proceso (ver app.replication)."""
+    global route_id_counter
+    record_id = event["id"]
+    with store_lock:
+        if event["entity"] == "zone":
+            if event["op"] == "delete":
+                if record_id in zones_db:
+                    remove_zone(record_id)
+            else:
+                add_zone(_restore(event["data"]))
+        elif event["entity"] == "route":
+            if event["op"] == "delete":
+                if record_id in routes_db:
+                    remove_route(record_id)
+            elif record_id in routes_db:
+                apply_route_update(record_id, _restore(event["data"]))
+            else:
+                add_route(_restore(event["data"]))
+                route_id_counter = max(route_id_counter, record_id + 1)
+
+
+# CONSULTAS ESPACIALES
+
+def _zone_filter(active):
+    if active is None:
+        return None
+    return lambda zone_id: zones_db[zone_id]["active"] == active
+
+
+def _with_distance(matches) -> list:
+    return [dict(zones_db[zone_id], distance_km=distance) for distance, zone_id in matches]
+
+
+def nearest_zones(lat: float, lon: float, k: int, active=None) -> list:
+    """Las k zonas con centroide más cercano al punto, con su distancia en km."""
+    with store_lock:
+        return _with_distance(zone_locations.nearest(lat, lon, k, accept=_zone_filter(active)))
+
+
+def zones_within(lat: float, lon: float, radius_km: float, active=None) -> list:
+    """Zonas con centroide a radius_km o menos del punto, de la más cercana a la más lejana."""
+    with store_lock:
+        return _with_distance(zone_locations.within(lat, lon, radius_km, accept=_zone_filter(active)))
+
+
+# CONSULTAS DE ESTADÍSTICAS
+
+_top_zones_cache = {}
+
+
+def zone_stats() -> dict:
+    with store_lock:
+        return {
+            "total": len(zones_db),
+            "active": zones_by_status["active"],
+            "inactive": zones_by_status["inactive"],
+            "by_borough": dict(zones_by_borough),
+            "by_service_zone": dict(zones_by_service_zone),
+        }
+
+
+def route_stats() -> dict:
+    with store_lock:
+        return {
+            "total": len(routes_db),
+            "active": routes_by_status["active"],
+            "inactive": routes_by_status["inactive"],
+            "by_pickup_borough": dict(routes_by_pickup_borough),
+        }
+
+
+def top_zones(k: int) -> dict:
+    """Zonas con más rutas de salida y de llegada; se recalcula solo si el store cambió."""
+    with store_lock:
+        cached = _top_zones_cache.get(k)
+        if cached is not None and cached[0] == stats_version:
+            return cached[1]
+        result = {
+            "origins": [{"zone_id": z, "routes": n} for z, n in routes_by_pickup_zone.most_common(k)],
+            "destinations": [{"zone_id": z, "routes": n} for z, n in routes_by_dropoff_zone.most_common(k)],
+        }
+        if len(_top_zones_cache) > 16:
+            _top_zones_cache.clear()
+        _top_zones_cache[k] = (stats_version, result)
+        return result
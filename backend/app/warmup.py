@@ -0,0 +1,41 @@
+# backend/app/warmup.py
+"""
+Precarga en segundo plano de los módulos pesados de la ingesta.
+La API arranca sin importar pandas/pyarrow (ver routes_uploads.py); este hilo
+los importa apenas el servidor empieza a atender, así la primera subida no
+paga ese costo y /health responde sin esperar.
+"""
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# app.ingest arrastra numpy, pandas y pyarrow; el resto lo usa la exportación
+HEAVY_MODULES = ("app.ingest", "pyarrow.parquet")
+
+
+def _prewarm() -> None:
+    started = time.perf_counter()
+    for name in HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            # Si falla, la misma importación se reintenta (y reporta) en la primera subida
+            logger.exception("Could not prewarm %s", name)
+            return
+    # Con TAXI_ZONE_LOOKUP configurado, la tabla de referencia queda cargada antes de la primera subida
+    try:
+        from .zone_reference import get_zone_reference
+
+        get_zone_reference()
+    except Exception:
+        logger.exception("Could not load the zone reference table")
+    logger.info("Ingest modules prewarmed in %.2fs", time.perf_counter() - started)
+
+
+def start_prewarm() -> threading.Thread:
+    thread = threading.Thread(target=_prewarm, name="ingest-prewarm", daemon=True)
+    thread.start()
+    return thread
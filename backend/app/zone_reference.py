@@ -0,0 +1,191 @@
+# backend/app/zone_reference.py
+"""
+Tabla de referencia de zonas TLC (taxi_zone_lookup.csv o su versión parquet:
+LocationID, Borough, Zone, service_zone).
+Sirve para dos cosas: reemplazar de una vez los placeholders que crea la
+ingesta ("Unknown" / "Zone {id}") con un merge vectorizado contra zones_db, y
+que la ingesta cree las zonas nuevas directamente con su nombre real.
+pandas se importa dentro de las funciones (el arranque de la API no lo carga).
+"""
+import io
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .config import settings
+from .ingest_types import IngestError
+
+logger = logging.getLogger(__name__)
+
+# Valores con los que la ingesta crea una zona que no conoce
+PLACEHOLDER_BOROUGH = "Unknown"
+PLACEHOLDER_SERVICE_ZONE = "Unknown"
+
+# Nombres de columna aceptados (en minúsculas) -> campo de la zona
+REFERENCE_COLUMNS = {
+    "locationid": "id",
+    "location_id": "id",
+    "borough": "borough",
+    "zone": "zone_name",
+    "zone_name": "zone_name",
+    "service_zone": "service_zone",
+}
+TEXT_FIELDS = ("borough", "zone_name", "service_zone")
+
+
+def placeholder_name(zone_id: int) -> str:
+    return f"Zone {zone_id}"
+
+
+def placeholder_fields(zone_id: int) -> dict:
+    return {
+        "borough": PLACEHOLDER_BOROUGH,
+        "zone_name": placeholder_name(zone_id),
+        "service_zone": PLACEHOLDER_SERVICE_ZONE,
+    }
+
+
+def read_zone_reference(raw: bytes, file_name: str):
+    """DataFrame normalizado (id, borough, zone_name, service_zone), un registro por ID."""
+    import pandas as pd
+
+    try:
+        if file_name.endswith(".parquet"):
+            frame = pd.read_parquet(io.BytesIO(raw))
+        elif file_name.endswith(".csv"):
+            frame = pd.read_csv(io.BytesIO(raw), dtype=str, keep_default_na=False)
+        else:
+            raise IngestError("Zone reference must be a .csv or .parquet file")
+    except (ValueError, OSError) as e:
+        if isinstance(e, IngestError):
+            raise
+        raise IngestError(f"Invalid zone reference file: {e}")
+
+    frame = frame.rename(columns=lambda name: REFERENCE_COLUMNS.get(str(name).strip().lower(), name))
+    missing = [name for name in ("id", "borough", "zone_name") if name not in frame.columns]
+    if missing:
+        raise IngestError(f"Zone reference is missing columns: {', '.join(missing)} "
+                          f"(expected LocationID, Borough, Zone, service_zone)")
+    if "service_zone" not in frame.columns:
+        frame["service_zone"] = PLACEHOLDER_SERVICE_ZONE
+
+    frame = frame.assign(id=pd.to_numeric(frame["id"], errors="coerce"))
+    frame = frame[frame["id"].notna() & (frame["id"] > 0)]
+    frame = frame.assign(id=frame["id"].astype("int64"))
+    for field in TEXT_FIELDS:
+        frame[field] = frame[field].fillna("").astype(str).str.strip()
+    # Vacíos (p. ej. service_zone de la zona 264 en el archivo TLC) -> valores por defecto
+    frame.loc[frame["borough"] == "", "borough"] = PLACEHOLDER_BOROUGH
+    frame.loc[frame["service_zone"] == "", "service_zone"] = PLACEHOLDER_SERVICE_ZONE
+    unnamed = frame["zone_name"] == ""
+    frame.loc[unnamed, "zone_name"] = "Zone " + frame.loc[unnamed, "id"].astype(str)
+    return frame[["id", *TEXT_FIELDS]].drop_duplicates("id", keep="last").reset_index(drop=True)
+
+
+def plan_reference_merge(reference, zones: Dict[int, dict], overwrite: bool = False) -> Tuple[List, List, dict]:
+    """
+    Compara la referencia con las zonas del store con un merge por ID.
+    Devuelve (cambios [(zone_id, {campo: valor})], IDs de la referencia que no
+    están en el store, conteos). Sin overwrite solo se tocan los placeholders.
+    """
+    import pandas as pd
+
+    ids = list(zones)
+    current = pd.DataFrame({
+        "id": pd.Series(ids, dtype="int64"),
+        **{field: [zones[zone_id][field] for zone_id in ids] for field in TEXT_FIELDS},
+    })
+    merged = reference.merge(current, on="id", how="left", suffixes=("", "_store"), indicator=True)
+    in_store = (merged["_merge"] == "both").to_numpy()
+    matched = merged[in_store]
+
+    placeholder = ((matched["borough_store"] == PLACEHOLDER_BOROUGH)
+                   & (matched["zone_name_store"] == "Zone " + matched["id"].astype(str)))
+    differs = {field: matched[field] != matched[f"{field}_store"] for field in TEXT_FIELDS}
+    changed = differs["borough"] | differs["zone_name"] | differs["service_zone"]
+    selected = changed & (placeholder | overwrite)
+
+    # Solo los campos que cambian, para que los contadores por municipio y
+    # zona de servicio se ajusten únicamente donde hace falta
+    rows = matched[selected]
+    values = {field: rows[field].tolist() for field in TEXT_FIELDS}
+    masks = {field: differs[field][selected].tolist() for field in TEXT_FIELDS}
+    changes = [
+        (zone_id, {field: values[field][position] for field in TEXT_FIELDS if masks[field][position]})
+        for position, zone_id in enumerate(rows["id"].tolist())
+    ]
+
+    missing_ids = merged.loc[~in_store, "id"].tolist()
+    # Placeholders que siguen sin nombre: su ID no está en la referencia
+    unresolved = ((current["borough"] == PLACEHOLDER_BOROUGH)
+                  & (current["zone_name"] == "Zone " + current["id"].astype(str))
+                  & ~current["id"].isin(reference["id"]))
+    counts = {
+        "rows": len(reference),
+        "zones_upgraded": int((selected & placeholder).sum()),
+        "zones_updated": int((selected & ~placeholder).sum()),
+        "zones_unchanged": int((~selected).sum()),
+        "placeholders_remaining": int(unresolved.sum()),
+    }
+    return changes, missing_ids, counts
+
+
+class ZoneReference:
+    def __init__(self, frame, source: str):
+        self.frame = frame
+        self.source = source
+        # Búsqueda O(1) por ID para la ingesta
+        self.records: Dict[int, dict] = frame.set_index("id")[list(TEXT_FIELDS)].to_dict("index")
+
+    def fields_for(self, zone_id: int) -> dict:
+        """Campos de una zona nueva: los de la referencia o, si no está, los del placeholder."""
+        record = self.records.get(zone_id)
+        return dict(record) if record is not None else placeholder_fields(zone_id)
+
+    def summary(self) -> dict:
+        return {"loaded": True, "source": self.source, "rows": len(self.records)}
+
+
+# Referencia cargada: se sube por POST /zones/reference o se lee de
+# settings.taxi_zone_lookup la primera vez que se necesita (o en la precarga).
+# La lectura del archivo se intenta una sola vez: si falla, la ingesta sigue
+# con placeholders y el error queda para GET /zones/reference
+_reference: Optional[ZoneReference] = None
+_reference_error: Optional[str] = None
+_lookup_attempted = False
+_reference_lock = threading.Lock()
+
+
+def set_zone_reference(reference: Optional[ZoneReference]) -> None:
+    """Reemplaza la referencia; con None se vuelve a intentar settings.taxi_zone_lookup."""
+    global _reference, _reference_error, _lookup_attempted
+    with _reference_lock:
+        _reference = reference
+        _reference_error = None
+        _lookup_attempted = reference is not None
+
+
+def get_zone_reference() -> Optional[ZoneReference]:
+    global _reference, _reference_error, _lookup_attempted
+    with _reference_lock:
+        if _reference is None and settings.taxi_zone_lookup and not _lookup_attempted:
+            _lookup_attempted = True
+            try:
+                with open(settings.taxi_zone_lookup, "rb") as lookup:
+                    frame = read_zone_reference(lookup.read(), settings.taxi_zone_lookup)
+                _reference = ZoneReference(frame, settings.taxi_zone_lookup)
+            except (OSError, IngestError) as e:
+                _reference_error = f"Could not load {settings.taxi_zone_lookup}: {e}"
+                logger.error("%s; new zones keep placeholder names", _reference_error)
+        return _reference
+
+
+def zone_reference_status() -> dict:
+    reference = get_zone_reference()
+    if reference is not None:
+        return reference.summary()
+    return {"loaded": False, "source": settings.taxi_zone_lookup or None, "error": _reference_error}
+
+
+def new_zone_fields(zone_id: int, reference: Optional[ZoneReference]) -> dict:
+    return reference.fields_for(zone_id) if reference is not None else placeholder_fields(zone_id)
@@ -0,0 +1,74 @@
+# backend/benchmarks/bench_arrow_vs_parquet.py
+"""
+Compara la ingesta Parquet (decodificar + pandas) con la ingesta Arrow IPC
+(zero-copy + pyarrow.compute) sobre los mismos viajes sintéticos.
+Solo mide lectura + agregación; no aplica cambios al store.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_arrow_vs_parquet --rows 1000000 5000000
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.ingest import aggregate_trips, aggregate_trips_arrow, read_trips, read_trips_arrow
+
+
+def synthetic_trips(rows: int, zones: int = 265, seed: int = 0) -> pa.Table:
+    rng = np.random.default_rng(seed)
+    # Distribución sesgada, como en los archivos TLC reales
+    weights = rng.zipf(1.5, zones).astype(float)
+    weights /= weights.sum()
+    return pa.table({
+        "PULocationID": rng.choice(np.arange(1, zones + 1), size=rows, p=weights).astype(np.int32),
+        "DOLocationID": rng.choice(np.arange(1, zones + 1), size=rows, p=weights).astype(np.int32),
+        "trip_distance": rng.random(rows) * 10,
+    })
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--top-n", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'parquet (s)':>12} {'arrow (s)':>12} {'speedup':>8}")
+    for rows in args.rows:
+        table = synthetic_trips(rows)
+
+        parquet_buffer = io.BytesIO()
+        pq.write_table(table, parquet_buffer)
+        parquet_bytes = parquet_buffer.getvalue()
+
+        arrow_sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(arrow_sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=128 * 1024)
+        arrow_bytes = arrow_sink.getvalue()
+
+        parquet_time = best_of(
+            lambda: aggregate_trips(read_trips(pa.BufferReader(parquet_bytes), limit_rows=rows), args.top_n),
+            args.repeat,
+        )
+        arrow_time = best_of(
+            lambda: aggregate_trips_arrow(read_trips_arrow(pa.BufferReader(arrow_bytes), limit_rows=rows), args.top_n),
+            args.repeat,
+        )
+        print(f"{rows:>12,} {parquet_time:>12.3f} {arrow_time:>12.3f} {parquet_time / arrow_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
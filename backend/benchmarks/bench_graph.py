@@ -0,0 +1,89 @@
+# backend/benchmarks/bench_graph.py
+"""
+Mide las consultas del grafo (vecinos, grado, alcanzables a k saltos y camino
+más corto) sobre grafos sintéticos cargados con storage.add_route.
+También verifica el BFS bidireccional contra un BFS simple.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_graph --zones 265 --routes 30000
+    python -m benchmarks.bench_graph --zones 100000 --routes 500000
+"""
+import argparse
+import random
+import time
+from collections import deque
+
+from app import graph, storage
+
+
+def build_graph(zones: int, routes: int, seed: int) -> None:
+    rng = random.Random(seed)
+    for zone_id in range(1, zones + 1):
+        storage.zones_db[zone_id] = {"id": zone_id}
+    pairs = set()
+    while len(pairs) < routes:
+        pickup, dropoff = rng.randint(1, zones), rng.randint(1, zones)
+        if pickup != dropoff:
+            pairs.add((pickup, dropoff))
+    for pickup, dropoff in pairs:
+        storage.add_route({
+            "id": storage.next_route_id(),
+            "pickup_zone_id": pickup,
+            "dropoff_zone_id": dropoff,
+            "active": True,
+        })
+
+
+def plain_bfs_hops(source: int, target: int):
+    seen = {source: 0}
+    queue = deque([source])
+    while queue:
+        current = queue.popleft()
+        if current == target:
+            return seen[current]
+        for other_id in storage.out_edges.get(current, {}):
+            if other_id not in seen:
+                seen[other_id] = seen[current] + 1
+                queue.append(other_id)
+    return None
+
+
+def timed(label: str, fn, samples) -> None:
+    started = time.perf_counter()
+    for sample in samples:
+        fn(*sample)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<22} {elapsed / len(samples) * 1e6:>10.1f} µs/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--zones", type=int, default=265)
+    parser.add_argument("--routes", type=int, default=30_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    build_graph(args.zones, args.routes, args.seed)
+    print(f"{args.zones:,} zonas, {args.routes:,} rutas indexadas en {time.perf_counter() - started:.2f} s")
+
+    rng = random.Random(args.seed + 1)
+    zones = [(rng.randint(1, args.zones),) for _ in range(args.queries)]
+    pairs = [(rng.randint(1, args.zones), rng.randint(1, args.zones)) for _ in range(args.queries)]
+
+    timed("neighbors (out)", graph.neighbors, zones)
+    timed("degree", graph.degree, zones)
+    timed(f"reachable (k={args.k})", lambda zone_id: graph.reachable(zone_id, args.k), zones)
+    timed("shortest_path", graph.shortest_path, pairs)
+
+    for source, target in pairs[:50]:
+        path = graph.shortest_path(source, target)
+        expected = plain_bfs_hops(source, target)
+        assert (path is None and expected is None) or len(path) - 1 == expected, (source, target)
+    print("  shortest_path coincide con BFS simple en 50 pares")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+# backend/benchmarks/bench_load.py
+"""
+Prueba de carga con tráfico mixto sobre /zones, /routes y /uploads/trips-parquet.
+Levanta la API en un proceso local (o usa --url), carga zonas iniciales y lanza
+--concurrency clientes asíncronos (httpx) que eligen cada operación según la
+mezcla de --mix durante --duration segundos. También reproduce un registro de
+peticiones (--replay, JSON Lines) y puede grabar el tráfico generado (--record)
+para reproducirlo igual en otra versión.
+
+Reporta por endpoint: peticiones, errores (excepciones y respuestas >= 400),
+throughput y latencia p50/p95/p99/máx. --out guarda el resultado en JSON y
+--compare lo contrasta con uno guardado antes (otra versión o configuración).
+
+Formato de --replay / --record (una petición por línea; `t` = segundos desde el
+inicio, se respeta con --replay-speed > 0; `upload` = filas del parquet a subir):
+    {"t": 0.01, "method": "GET", "path": "/zones/", "params": {"limit": 100}}
+    {"t": 0.02, "method": "POST", "path": "/zones/", "json": {"id": 9001, ...}}
+    {"t": 0.05, "method": "POST", "path": "/uploads/trips-parquet", "upload": 50000}
+
+Uso (desde backend/):
+    python -m benchmarks.bench_load --concurrency 32 --duration 20 --out base.json
+    python -m benchmarks.bench_load --mix zones_read=8,routes_read=8,zones_write=1,upload=1 --compare base.json
+    python -m benchmarks.bench_load --record traffic.jsonl
+    python -m benchmarks.bench_load --replay traffic.jsonl --replay-speed 1 --out replay.json
+"""
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import random
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.bench_replication import free_port, serve, wait_until
+
+# Operaciones de la mezcla: nombre -> peso por defecto
+DEFAULT_MIX = {
+    "zones_read": 40,
+    "zone_get": 20,
+    "zones_write": 8,
+    "routes_read": 20,
+    "routes_write": 10,
+    "upload": 2,
+}
+BOROUGHS = ("Manhattan", "Brooklyn", "Queens", "Bronx", "Staten Island")
+UPLOAD_PATH = "/uploads/trips-parquet"
+
+
+def parse_mix(raw: str) -> dict:
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise SystemExit(f"operación desconocida en --mix: {name} (opciones: {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def trips_parquet(rows: int, zones: int, seed: int) -> bytes:
+    # pandas solo se importa si la mezcla incluye subidas
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    buffer = io.BytesIO()
+    pd.DataFrame({
+        "PULocationID": rng.integers(1, zones + 1, rows),
+        "DOLocationID": rng.integers(1, zones + 1, rows),
+    }).to_parquet(buffer, engine="pyarrow")
+    return buffer.getvalue()
+
+
+class TrafficGenerator:
+    """Arma peticiones al azar según la mezcla; las altas usan IDs nuevos."""
+
+    def __init__(self, mix: dict, zones: int, upload_rows: int, seed: int):
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.zones = zones
+        self.upload_rows = upload_rows
+        self.rng = random.Random(seed)
+        self._zone_ids = itertools.count(zones + 1)
+
+    def next_request(self) -> dict:
+        op = self.rng.choices(self.names, self.weights)[0]
+        zone_id = self.rng.randint(1, self.zones)
+        if op == "zones_read":
+            return {"method": "GET", "path": "/zones/",
+                    "params": {"limit": 100, "offset": self.rng.randrange(0, self.zones, 100)}}
+        if op == "zone_get":
+            return {"method": "GET", "path": f"/zones/{zone_id}"}
+        if op == "zones_write":
+            if self.rng.random() < 0.5:
+                new_id = next(self._zone_ids)
+                return {"method": "POST", "path": "/zones/", "json": {
+                    "id": new_id, "borough": self.rng.choice(BOROUGHS), "zone_name": f"Load {new_id}"}}
+            return {"method": "PUT", "path": f"/zones/{zone_id}", "json": {"active": self.rng.random() < 0.9}}
+        if op == "routes_read":
+            return {"method": "GET", "path": "/routes/", "params": {"limit": 100}}
+        if op == "routes_write":
+            dropoff = self.rng.randint(1, self.zones)
+            return {"method": "POST", "path": "/routes/", "json": {
+                "pickup_zone_id": zone_id, "dropoff_zone_id": dropoff, "name": f"Load {zone_id}-{dropoff}"}}
+        return {"method": "POST", "path": UPLOAD_PATH, "upload": self.upload_rows}
+
+
+def endpoint_label(request: dict) -> str:
+    """Agrupa por plantilla de ruta: /zones/17 -> /zones/{id}."""
+    parts = ["{id}" if part.isdigit() else part for part in request["path"].split("/")]
+    return f"{request['method']} {'/'.join(parts)}"
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def add(self, label: str, seconds: float, status) -> None:
+        self.latencies[label].append(seconds * 1000)
+        self.statuses[label][str(status)] += 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors[label] += 1
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    endpoints = {}
+    for label, latencies in sorted(recorder.latencies.items()):
+        endpoints[label] = {
+            "requests": len(latencies),
+            "errors": recorder.errors[label],
+            "error_rate": recorder.errors[label] / len(latencies),
+            "throughput_rps": len(latencies) / elapsed,
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "max_ms": max(latencies),
+            "statuses": dict(recorder.statuses[label]),
+        }
+    every = [latency for latencies in recorder.latencies.values() for latency in latencies]
+    total_errors = sum(recorder.errors.values())
+    return {
+        "elapsed_seconds": elapsed,
+        "requests": len(every),
+        "errors": total_errors,
+        "error_rate": total_errors / len(every) if every else 0.0,
+        "throughput_rps": len(every) / elapsed,
+        "p50_ms": percentile(every, 0.50),
+        "p95_ms": percentile(every, 0.95),
+        "p99_ms": percentile(every, 0.99),
+        "endpoints": endpoints,
+    }
+
+
+async def send(client: httpx.AsyncClient, request: dict, uploads, recorder: Recorder) -> None:
+    kwargs = {"params": request.get("params"), "json": request.get("json")}
+    if "upload" in request:
+        raw = next(uploads)
+        kwargs = {"files": {"file": ("load.parquet", raw, "application/octet-stream")},
+                  "data": {"mode": "update"}}
+    started = time.perf_counter()
+    try:
+        response = await client.request(request["method"], request["path"], **kwargs)
+        status = response.status_code
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    recorder.add(endpoint_label(request), time.perf_counter() - started, status)
+
+
+async def run_mix(client, generator, uploads, args, recorder, record) -> float:
+    started = time.perf_counter()
+    deadline = started + args.duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            request = generator.next_request()
+            if record is not None:
+                record.append({"t": round(time.perf_counter() - started, 6), **request})
+            await send(client, request, uploads, recorder)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return time.perf_counter() - started
+
+
+async def run_replay(client, requests, uploads, args, recorder) -> float:
+    """Reproduce el registro: con --replay-speed > 0 respeta los tiempos `t`, si no va lo más rápido posible."""
+    started = time.perf_counter()
+    limit = asyncio.Semaphore(args.concurrency)
+
+    async def replay(request):
+        if args.replay_speed > 0:
+            await asyncio.sleep(max(0.0, started + request.get("t", 0) / args.replay_speed - time.perf_counter()))
+        async with limit:
+            await send(client, request, uploads, recorder)
+
+    await asyncio.gather(*(replay(request) for request in requests))
+    return time.perf_counter() - started
+
+
+async def seed_zones(client: httpx.AsyncClient, zones: int, concurrency: int) -> None:
+    ids = iter(range(1, zones + 1))
+
+    async def worker():
+        for zone_id in ids:
+            await client.post("/zones/", json={
+                "id": zone_id, "borough": BOROUGHS[zone_id % len(BOROUGHS)], "zone_name": f"Seed {zone_id}"})
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+def print_report(result: dict, baseline: dict = None) -> None:
+    header = f"{'endpoint':<34} {'req':>7} {'err%':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    print(header + ("   Δp50     Δp99   Δreq/s" if baseline else "") + "   (ms)")
+    rows = list(result["endpoints"].items()) + [("TOTAL", result)]
+    for label, stats in rows:
+        line = (f"{label:<34} {stats['requests']:>7} {stats['error_rate']:>6.1%} {stats['throughput_rps']:>8.1f} "
+                f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}")
+        base = baseline["endpoints"].get(label) if baseline and label != "TOTAL" else baseline
+        if base:
+            line += (f" {(stats['p50_ms'] / base['p50_ms'] - 1) if base['p50_ms'] else 0:>+7.0%}"
+                     f" {(stats['p99_ms'] / base['p99_ms'] - 1) if base['p99_ms'] else 0:>+8.0%}"
+                     f" {(stats['throughput_rps'] / base['throughput_rps'] - 1) if base['throughput_rps'] else 0:>+8.0%}")
+        print(line)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+async def main_async(args) -> dict:
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    replay = None
+    if args.replay:
+        with open(args.replay) as log:
+            replay = [json.loads(line) for line in log if line.strip()]
+    needs_uploads = any("upload" in r for r in replay) if replay else mix.get("upload", 0) > 0
+    # Al reproducir, las filas de los archivos salen del registro
+    upload_rows = next((r["upload"] for r in replay if "upload" in r), args.upload_rows) if replay else args.upload_rows
+    # Archivos distintos para que la caché por contenido de /uploads no responda todo
+    uploads = itertools.cycle([trips_parquet(upload_rows, args.zones, seed) for seed in range(args.upload_files)]
+                              if needs_uploads else [])
+
+    process = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        process = serve(port)
+        url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+            await asyncio.to_thread(wait_until, lambda: httpx.get(f"{url}/health").status_code == 200)
+            if args.zones and not args.no_seed:
+                await seed_zones(client, args.zones, args.concurrency)
+            recorder = Recorder()
+            record = [] if args.record else None
+            if replay is not None:
+                elapsed = await run_replay(client, replay, uploads, args, recorder)
+            else:
+                generator = TrafficGenerator(mix, args.zones, args.upload_rows, args.seed)
+                elapsed = await run_mix(client, generator, uploads, args, recorder, record)
+            diagnostics = (await client.get("/health/diagnostics")).json()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    if record is not None:
+        with open(args.record, "w") as log:
+            log.writelines(json.dumps(request) + "\n" for request in record)
+    result = summarize(recorder, elapsed)
+    result["meta"] = {
+        "at": datetime.now(timezone.utc).isoformat(),
+        "git": git_revision(),
+        "url": args.url or "local",
+        "concurrency": args.concurrency,
+        "mix": None if replay is not None else mix,
+        "replay": args.replay,
+        "zones": args.zones,
+    }
+    # El lag del loop y el threadpool del servidor al terminar (ver /health/diagnostics)
+    result["server"] = {key: diagnostics.get(key) for key in ("event_loop", "threadpool")}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="API ya levantada; por defecto se arranca una local")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--mix", help="pesos por operación, p. ej. zones_read=8,routes_write=1,upload=1 "
+                                      f"(opciones: {', '.join(DEFAULT_MIX)})")
+    parser.add_argument("--zones", type=int, default=265, help="zonas que se crean antes de medir")
+    parser.add_argument("--no-seed", action="store_true", help="no crear las zonas iniciales (--url con datos)")
+    parser.add_argument("--upload-rows", type=int, default=50_000)
+    parser.add_argument("--upload-files", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replay", help="registro JSON Lines a reproducir en lugar de la mezcla")
+    parser.add_argument("--replay-speed", type=float, default=0.0, help="1 = tiempos originales, 0 = sin esperas")
+    parser.add_argument("--record", help="guardar las peticiones generadas (para --replay)")
+    parser.add_argument("--out", help="guardar el resultado en JSON")
+    parser.add_argument("--compare", help="resultado JSON anterior contra el que comparar")
+    args = parser.parse_args()
+
+    result = asyncio.run(main_async(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as saved:
+            baseline = json.load(saved)
+    print_report(result, baseline)
+    if args.out:
+        with open(args.out, "w") as out:
+            json.dump(result, out, indent=2)
+
+
+if __name__ == "__main__":
+    main()
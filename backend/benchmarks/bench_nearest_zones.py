@@ -0,0 +1,82 @@
+# backend/benchmarks/bench_nearest_zones.py
+"""
+Consultas de cercanía sobre centroides de zona: índice de grilla de
+app.spatial.ZoneGrid contra recorrer todas las zonas (lo que haría
+/zones/nearest sin índice). Mide k-NN, búsqueda por radio y el costo de
+mantener el índice en cada mutación (mover una zona), y verifica que la
+grilla devuelva lo mismo que el recorrido completo.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_nearest_zones
+    python -m benchmarks.bench_nearest_zones --zones 265 100000 1000000 --queries 5000
+"""
+import argparse
+import heapq
+import math
+import random
+import time
+
+from app.spatial import EARTH_RADIUS_KM, ZoneGrid
+
+# Bounding box aproximado de NYC
+MIN_LAT, MAX_LAT = 40.49, 40.92
+MIN_LON, MAX_LON = -74.26, -73.70
+
+
+def random_point(rng):
+    return rng.uniform(MIN_LAT, MAX_LAT), rng.uniform(MIN_LON, MAX_LON)
+
+
+def linear_nearest(points, lat, lon, k):
+    cos_lat = math.cos(math.radians(lat))
+    distances = (
+        (EARTH_RADIUS_KM * math.hypot(math.radians(p_lat - lat), math.radians(p_lon - lon) * cos_lat), zone_id)
+        for zone_id, (p_lat, p_lon) in points.items()
+    )
+    return heapq.nsmallest(k, distances)
+
+
+def per_query_us(fn, queries):
+    started = time.perf_counter()
+    for lat, lon in queries:
+        fn(lat, lon)
+    return (time.perf_counter() - started) / len(queries) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--zones", type=int, nargs="+", default=[265, 100_000])
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--radius-km", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(f"{'zonas':>9} {'k-NN grilla':>12} {'k-NN lineal':>12} {'speedup':>8} "
+          f"{'radio grilla':>13} {'mutación':>9}   (µs por operación)")
+    for count in args.zones:
+        rng = random.Random(count)
+        grid = ZoneGrid()
+        for zone_id in range(1, count + 1):
+            grid.set(zone_id, *random_point(rng))
+        queries = [random_point(rng) for _ in range(args.queries)]
+
+        for lat, lon in queries[:20]:
+            assert grid.nearest(lat, lon, args.k) == linear_nearest(grid.points, lat, lon, args.k)
+
+        grid_us = per_query_us(lambda lat, lon: grid.nearest(lat, lon, args.k), queries)
+        linear_queries = queries[:max(1, min(len(queries), 2_000_000 // count))]
+        linear_us = per_query_us(lambda lat, lon: linear_nearest(grid.points, lat, lon, args.k), linear_queries)
+        radius_us = per_query_us(lambda lat, lon: grid.within(lat, lon, args.radius_km), queries)
+
+        moves = [(rng.randint(1, count), *random_point(rng)) for _ in range(args.queries)]
+        started = time.perf_counter()
+        for zone_id, lat, lon in moves:
+            grid.set(zone_id, lat, lon)
+        mutation_us = (time.perf_counter() - started) / len(moves) * 1e6
+
+        print(f"{count:>9,} {grid_us:>12.1f} {linear_us:>12.1f} {linear_us / grid_us:>7.0f}x "
+              f"{radius_us:>13.1f} {mutation_us:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# backend/benchmarks/bench_parallel_read.py
+"""
+Throughput de read_trips decodificando row groups en un solo hilo (el camino
+anterior) contra la decodificación en paralelo, sobre un parquet sintético
+en memoria con el layout de los archivos TLC (varias columnas, row groups de
+--row-group-size filas). También mide limit_rows con sample=head contra
+sample=random_row_groups (solo se decodifican los row groups sorteados).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_parallel_read
+    python -m benchmarks.bench_parallel_read --rows 20000000 --workers 2 4 8
+"""
+import argparse
+import io
+import os
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.ingest import TripFilters, read_trips
+from app.ingest_types import SAMPLE_HEAD, SAMPLE_RANDOM_ROW_GROUPS
+
+
+def synthetic_parquet(rows: int, row_group_size: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    pickup_times = np.datetime64("2024-01-01") + rng.integers(0, 31 * 86400, rows).astype("timedelta64[s]")
+    table = pa.table({
+        "VendorID": rng.integers(1, 3, rows),
+        "tpep_pickup_datetime": pa.array(np.sort(pickup_times).astype("datetime64[us]")),
+        "PULocationID": rng.integers(1, 266, rows),
+        "DOLocationID": rng.integers(1, 266, rows),
+        "trip_distance": rng.exponential(3.0, rows),
+        "fare_amount": rng.exponential(15.0, rows),
+        "payment_type": pa.array(rng.choice(["card", "cash"], rows)),
+    })
+    sink = io.BytesIO()
+    pq.write_table(table, sink, row_group_size=row_group_size)
+    return sink.getvalue()
+
+
+def best_of(fn, repeat: int):
+    times = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--row-group-size", type=int, default=128 * 1024)
+    parser.add_argument("--workers", type=int, nargs="+", default=[os.cpu_count() or 1])
+    parser.add_argument("--limit-rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    raw = synthetic_parquet(args.rows, args.row_group_size)
+    print(f"{args.rows:,} filas, {len(raw) / 1e6:.1f} MB, row groups de {args.row_group_size:,} filas, "
+          f"{os.cpu_count()} CPUs\n")
+
+    def read(workers, filters=None, limit_rows=None):
+        return lambda: read_trips(pa.BufferReader(raw), filters=filters, limit_rows=limit_rows, max_workers=workers)
+
+    print(f"{'lectura':<40} {'tiempo (s)':>10} {'Mfilas/s':>9} {'vs 1 hilo':>10}")
+    baseline, expected = best_of(read(1), args.repeat)
+    print(f"{'archivo completo, 1 hilo (anterior)':<40} {baseline:>10.3f} {args.rows / baseline / 1e6:>9.1f} {'1.0x':>10}")
+    for workers in args.workers:
+        elapsed, result = best_of(read(workers), args.repeat)
+        assert result.table.equals(expected.table), "la lectura en paralelo no coincide"
+        label = f"archivo completo, {workers} hilos"
+        print(f"{label:<40} {elapsed:>10.3f} {args.rows / elapsed / 1e6:>9.1f} {baseline / elapsed:>9.1f}x")
+
+    print(f"\nlimit_rows={args.limit_rows:,}")
+    workers = max(args.workers)
+    for sample in (SAMPLE_HEAD, SAMPLE_RANDOM_ROW_GROUPS):
+        filters = TripFilters(sample=sample, seed=0)
+        elapsed, result = best_of(read(workers, filters, args.limit_rows), args.repeat)
+        label = f"sample={sample}, {workers} hilos"
+        print(f"{label:<40} {elapsed:>10.3f} {result.table.num_rows / elapsed / 1e6:>9.1f} "
+              f"{'':>10} ({result.row_groups_read} row groups)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# backend/benchmarks/bench_replication.py
+"""
+Replicación líder/réplica con procesos locales: levanta un líder y N réplicas
+(uvicorn, puertos libres de 127.0.0.1), escribe zonas en el líder y mide cuánto
+tarda cada escritura en verse en todas las réplicas, y cuánto tarda una réplica
+nueva en cargar el snapshot de un store ya grande y alcanzar al líder.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_replication
+    python -m benchmarks.bench_replication --followers 3 --writes 500 --preload 100000
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(port: int, leader_url: str = "") -> subprocess.Popen:
+    env = dict(os.environ, PREWARM_INGEST="false", REPLICATION_LEADER_URL=leader_url)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning",
+         # Los long polls de las réplicas no retrasan el apagado
+         "--timeout-graceful-shutdown", "1"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def wait_until(check, timeout: float = 60.0, interval: float = 0.0005) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            if check():
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(interval)
+    raise TimeoutError("la réplica no alcanzó al líder")
+
+
+def zone(zone_id: int) -> dict:
+    return {"id": zone_id, "borough": "Queens", "zone_name": f"Bench {zone_id}"}
+
+
+def percentile(values, q: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--followers", type=int, default=2)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--preload", type=int, default=20_000, help="zonas en el líder antes de la réplica tardía")
+    args = parser.parse_args()
+
+    leader_url = f"http://127.0.0.1:{free_port()}"
+    processes = [serve(int(leader_url.rsplit(":", 1)[1]))]
+    client = httpx.Client(timeout=60)
+    try:
+        wait_until(lambda: client.get(f"{leader_url}/health").status_code == 200)
+        follower_urls = []
+        for _ in range(args.followers):
+            port = free_port()
+            processes.append(serve(port, leader_url))
+            follower_urls.append(f"http://127.0.0.1:{port}")
+        for url in follower_urls:
+            wait_until(lambda: client.get(f"{url}/replication/status").json()["snapshots_loaded"] > 0)
+
+        # Retraso de cada escritura hasta que todas las réplicas la sirven
+        lags = []
+        for zone_id in range(1, args.writes + 1):
+            client.post(f"{leader_url}/zones/", json=zone(zone_id)).raise_for_status()
+            started = time.perf_counter()
+            for url in follower_urls:
+                wait_until(lambda: client.get(f"{url}/zones/{zone_id}").status_code == 200)
+            lags.append((time.perf_counter() - started) * 1000)
+        print(f"{args.followers} réplicas, {args.writes} escrituras: retraso hasta verse en todas (ms) "
+              f"p50 {statistics.median(lags):.2f}  p99 {percentile(lags, 0.99):.2f}  máx {max(lags):.2f}")
+
+        # Réplica tardía: snapshot de un store grande y luego el log
+        for zone_id in range(args.writes + 1, args.writes + args.preload + 1):
+            client.post(f"{leader_url}/zones/", json=zone(zone_id))
+        leader_seq = client.get(f"{leader_url}/changes/latest").json()["seq"]
+        port = free_port()
+        started = time.perf_counter()
+        processes.append(serve(port, leader_url))
+        late_url = f"http://127.0.0.1:{port}"
+        wait_until(lambda: client.get(f"{late_url}/replication/status").json()["seq"] >= leader_seq,
+                   timeout=300, interval=0.01)
+        total = client.get(f"{late_url}/stats/zones").json()["total"]
+        print(f"réplica tardía: {total:,} zonas al día en {time.perf_counter() - started:.2f} s "
+              f"(incluye arrancar el proceso)")
+    finally:
+        client.close()
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# backend/benchmarks/bench_route_counts.py
+"""
+Compara el conteo de pares (origen, destino) con pandas (groupby + sort_values
++ head, la implementación anterior de aggregate_trips) contra el kernel de
+claves codificadas de app.route_counts (bincount + argpartition).
+Verifica además que ambos den el mismo resultado.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_route_counts --rows 1000000 10000000
+    python -m benchmarks.bench_route_counts --rows 100000000 --repeat 1   # ~4 GB de RAM
+    python -m benchmarks.bench_route_counts --rows 10000000 --max-zone 5000000   # IDs dispersos
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.route_counts import count_route_pairs
+
+
+def synthetic_pairs(rows: int, zones: int, max_zone: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    zone_ids = np.sort(rng.choice(np.arange(1, max_zone + 1), size=zones, replace=False))
+    # Distribución sesgada, como en los archivos TLC reales
+    weights = rng.zipf(1.5, zones).astype(float)
+    weights /= weights.sum()
+    pickup = zone_ids[rng.choice(zones, size=rows, p=weights)]
+    dropoff = zone_ids[rng.choice(zones, size=rows, p=weights)]
+    return pickup, dropoff
+
+
+def pandas_counts(pickup, dropoff, top_n):
+    df = pd.DataFrame({'PULocationID': pickup, 'DOLocationID': dropoff})
+    route_counts = df.groupby(['PULocationID', 'DOLocationID']).size().reset_index(name='count')
+    route_counts = route_counts[route_counts['PULocationID'] != route_counts['DOLocationID']]
+    route_counts = route_counts.sort_values('count', ascending=False, kind='stable')
+    top = route_counts.head(top_n)
+    zone_ids = sorted(set(np.unique(pickup)) | set(np.unique(dropoff)))
+    return (
+        [int(z) for z in zone_ids],
+        len(route_counts),
+        [(int(p), int(d), int(c)) for p, d, c in top.itertuples(index=False)],
+    )
+
+
+def best_of(fn, repeat: int):
+    times = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--zones", type=int, default=265)
+    parser.add_argument("--max-zone", type=int, default=265)
+    parser.add_argument("--top-n", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'pandas (s)':>11} {'kernel (s)':>11} {'speedup':>8}")
+    for rows in args.rows:
+        pickup, dropoff = synthetic_pairs(rows, args.zones, max(args.max_zone, args.zones))
+        pandas_time, expected = best_of(lambda: pandas_counts(pickup, dropoff, args.top_n), args.repeat)
+        kernel_time, result = best_of(lambda: count_route_pairs(pickup, dropoff, args.top_n), args.repeat)
+        assert result == expected, "el kernel no coincide con pandas"
+        print(f"{rows:>12,} {pandas_time:>11.3f} {kernel_time:>11.3f} {pandas_time / kernel_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
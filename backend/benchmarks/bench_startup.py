@@ -0,0 +1,82 @@
+# backend/benchmarks/bench_startup.py
+"""
+Mide el arranque en frío de la API: cada medición corre en un proceso nuevo
+(como un worker de uvicorn o un ciclo de --reload).
+- lazy:  import app.main tal como está (pandas/pyarrow no se importan)
+- eager: import app.main + app.ingest (el costo que se pagaba antes)
+Para cada modo informa el tiempo hasta la primera respuesta de GET /health y,
+con -X importtime, los módulos que más tardan en importarse (tiempo acumulado).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --repeat 10 --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPTS = {
+    "lazy": "import app.main",
+    "eager": "import app.main, app.ingest",
+}
+
+# Tiempo hasta la primera respuesta, medido dentro del proceso hijo
+FIRST_RESPONSE = """
+import time
+started = time.perf_counter()
+{imports}
+from fastapi.testclient import TestClient
+assert TestClient(app.main.app).get("/health").status_code == 200
+print(time.perf_counter() - started)
+"""
+
+
+def _run(args) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PREWARM_INGEST="false")
+    return subprocess.run(
+        [sys.executable, *args], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def first_response_seconds(imports: str, repeat: int) -> float:
+    return min(float(_run(["-c", FIRST_RESPONSE.format(imports=imports)]).stdout) for _ in range(repeat))
+
+
+def import_times(imports: str, max_depth: int = 1):
+    """[(módulo, acumulado en s)] según -X importtime, hasta max_depth niveles de anidamiento."""
+    stderr = _run(["-X", "importtime", "-c", imports]).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Cada nivel de anidamiento agrega dos espacios antes del nombre
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= max_depth:
+            rows.append(("  " * depth + name.strip(), int(cumulative) / 1e6))
+    return sorted(rows, key=lambda row: row[1], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    results = {}
+    for mode, imports in SCRIPTS.items():
+        results[mode] = first_response_seconds(imports, args.repeat)
+        print(f"\n[{mode}] {imports}")
+        print(f"  primera respuesta de /health: {results[mode]:.3f} s (mejor de {args.repeat})")
+        print(f"  {'módulo':<40} {'acumulado (s)':>14}")
+        for name, seconds in import_times(imports)[:args.top]:
+            print(f"  {name:<40} {seconds:>14.3f}")
+
+    print(f"\nlazy vs eager: {results['eager'] / results['lazy']:.1f}x más rápido hasta la primera respuesta")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# backend/benchmarks/bench_zone_locator.py
+"""
+Asignación de zonas a coordenadas: app.geo.ZoneLocator (grilla + ray casting
+solo en celdas de borde) contra el ray casting de cada punto contra todas las
+zonas. Usa zonas sintéticas irregulares (~260 zonas, como las TLC) o un GeoJSON
+real con --geojson, y verifica que ambos métodos coincidan en una muestra.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_zone_locator --points 1000000 5000000
+    python -m benchmarks.bench_zone_locator --geojson taxi_zones.geojson
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.geo import ZoneLocator, _Zone, load_zone_geojson
+
+
+def synthetic_zones(side: int, vertices: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    zones = {}
+    for i in range(side):
+        for j in range(side):
+            cx, cy = -74.2 + i * 0.03, 40.5 + j * 0.03
+            angles = np.sort(rng.random(vertices)) * 2 * np.pi
+            radius = 0.008 + 0.006 * rng.random(vertices)
+            zones[i * side + j + 1] = [np.c_[cx + radius * np.cos(angles), cy + radius * np.sin(angles)]]
+    return zones
+
+
+def brute_force(zones, x, y):
+    result = np.zeros(len(x), dtype=np.int64)
+    for zone_id, rings in sorted(zones.items()):
+        inside = _Zone(zone_id, rings).contains(x, y)
+        result[(result == 0) & inside] = zone_id
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    parser.add_argument("--geojson")
+    parser.add_argument("--vertices", type=int, default=200)
+    parser.add_argument("--check", type=int, default=20_000, help="puntos comparados contra la fuerza bruta")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.geojson:
+        with open(args.geojson, "rb") as geojson:
+            locator = load_zone_geojson(geojson.read())
+        zones = None
+    else:
+        zones = synthetic_zones(16, args.vertices)
+        locator = ZoneLocator(zones)
+    print(f"índice: {time.perf_counter() - started:.3f} s {locator.summary()}\n")
+
+    rng = np.random.default_rng(1)
+    min_x, min_y, max_x, max_y = locator.summary()["bounds"]
+    print(f"{'puntos':>12} {'grilla (s)':>11} {'Mpuntos/s':>10} {'en zona':>8}")
+    for points in args.points:
+        x = rng.uniform(min_x, max_x, points)
+        y = rng.uniform(min_y, max_y, points)
+        started = time.perf_counter()
+        result = locator.locate(x, y)
+        elapsed = time.perf_counter() - started
+        print(f"{points:>12,} {elapsed:>11.3f} {points / elapsed / 1e6:>10.2f} {np.mean(result > 0):>8.1%}")
+
+    if not args.geojson:
+        sample = slice(0, args.check)
+        started = time.perf_counter()
+        expected = brute_force(zones, x[sample], y[sample])
+        brute_rate = args.check / (time.perf_counter() - started)
+        assert (expected == result[sample]).all(), "la grilla no coincide con la fuerza bruta"
+        print(f"\nfuerza bruta: {brute_rate / 1e6:.3f} Mpuntos/s (coincide en {args.check:,} puntos)")
+
+
+if __name__ == "__main__":
+    main()
@@ -200,3 +200,1344 @@ def test_upload_parquet_zones_full_logic():
 
     print(f"\nResumen de creación: {response_new.json()}")
     print(f"\nResumen de actualización: {response_update.json()}")
+
+
+#TESTS PUSHDOWN DE FILTROS
+
+def _trips_parquet(df, row_group_size):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, engine='pyarrow', row_group_size=row_group_size)
+    buffer.seek(0)
+    return buffer
+
+def test_upload_parquet_date_range_skips_row_groups():
+    # 4 row groups, uno por semana
+    df = pd.DataFrame({
+        "tpep_pickup_datetime": pd.to_datetime(
+            ["2024-01-01 10:00", "2024-01-02 10:00",
+             "2024-01-08 10:00", "2024-01-09 10:00",
+             "2024-01-15 10:00", "2024-01-16 10:00",
+             "2024-01-22 10:00", "2024-01-23 10:00"]
+        ),
+        "PULocationID": [700, 700, 701, 701, 702, 702, 703, 703],
+        "DOLocationID": [710, 710, 711, 711, 712, 712, 713, 713],
+    })
+    files = {"file": ("week.parquet", _trips_parquet(df, 2), "application/octet-stream")}
+    data = {"mode": "create", "start": "2024-01-08T00:00:00", "end": "2024-01-15T00:00:00"}
+
+    response = client.post("/uploads/trips-parquet", files=files, data=data)
+
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary["rows_read"] == 2
+    assert summary["row_groups_total"] == 4
+    assert summary["row_groups_read"] == 1
+    assert summary["row_groups_skipped"] == 3
+    assert summary["bytes_skipped"] > 0
+    assert client.get("/zones/701").status_code == 200
+    assert client.get("/zones/702").status_code == 404
+
+def test_upload_parquet_zone_filter():
+    df = pd.DataFrame({
+        "PULocationID": [720, 721, 730, 731],
+        "DOLocationID": [722, 720, 732, 733],
+    })
+    files = {"file": ("zones.parquet", _trips_parquet(df, 2), "application/octet-stream")}
+    data = {"mode": "create", "zone_ids": "720"}
+
+    response = client.post("/uploads/trips-parquet", files=files, data=data)
+
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary["rows_read"] == 2
+    assert summary["row_groups_skipped"] == 1
+    assert summary["routes_created"] == 2
+
+def test_upload_parquet_date_filter_requires_datetime_column():
+    df = pd.DataFrame({"PULocationID": [1], "DOLocationID": [2]})
+    files = {"file": ("nodate.parquet", _trips_parquet(df, 1), "application/octet-stream")}
+    data = {"mode": "create", "start": "2024-01-01T00:00:00"}
+
+    response = client.post("/uploads/trips-parquet", files=files, data=data)
+
+    assert response.status_code == 400
+    assert "datetime" in response.json()["detail"]
+
+def test_upload_parquet_missing_columns():
+    df = pd.DataFrame({"PULocationID": [1]})
+    files = {"file": ("bad.parquet", _trips_parquet(df, 1), "application/octet-stream")}
+
+    response = client.post("/uploads/trips-parquet", files=files, data={"mode": "create"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Missing required columns: DOLocationID"
+
+
+#TESTS CACHE POR CONTENIDO
+
+def test_upload_parquet_repeated_content_hits_cache():
+    df = pd.DataFrame({"PULocationID": [740, 740, 741], "DOLocationID": [741, 741, 742]})
+    raw = _trips_parquet(df, 10).getvalue()
+    data = {"mode": "update", "top_n_routes": 5}
+
+    first = client.post("/uploads/trips-parquet", files={"file": ("a.parquet", raw)}, data=data)
+    second = client.post("/uploads/trips-parquet", files={"file": ("b.parquet", raw)}, data=data)
+
+    assert first.status_code == 200 and second.status_code == 200
+    assert first.json()["cache_hit"] is False
+    assert second.json()["cache_hit"] is True
+    assert second.json()["content_hash"] == first.json()["content_hash"]
+    assert second.json()["rows_read"] == 3
+    assert second.json()["routes_detected"] == first.json()["routes_detected"]
+    # La agregación en caché se vuelve a aplicar: las rutas ya existen
+    assert second.json()["routes_created"] == 0
+    assert second.json()["routes_updated"] == 2
+
+def test_upload_parquet_cache_key_includes_parameters():
+    df = pd.DataFrame({"PULocationID": [745, 746], "DOLocationID": [746, 747]})
+    raw = _trips_parquet(df, 10).getvalue()
+
+    first = client.post("/uploads/trips-parquet", files={"file": ("a.parquet", raw)},
+                        data={"mode": "create", "top_n_routes": 5})
+    second = client.post("/uploads/trips-parquet", files={"file": ("a.parquet", raw)},
+                         data={"mode": "create", "top_n_routes": 1})
+
+    assert second.json()["cache_hit"] is False
+    assert first.json()["content_hash"] == second.json()["content_hash"]
+
+
+#TESTS SUBIDA POR PARTES
+
+def test_chunked_upload_resume_and_complete():
+    df = pd.DataFrame({"PULocationID": [750, 750, 751], "DOLocationID": [751, 751, 752]})
+    raw = _trips_parquet(df, 10).getvalue()
+    half = len(raw) // 2
+
+    created = client.post("/uploads/sessions", json={"file_name": "big.parquet", "total_size": len(raw)})
+    assert created.status_code == 201
+    upload_id = created.json()["upload_id"]
+
+    first = client.put(f"/uploads/sessions/{upload_id}", params={"offset": 0}, content=raw[:half])
+    assert first.status_code == 200
+    assert first.json()["received_bytes"] == half
+
+    # Reenviar un bloque ya recibido: 409 con el offset esperado
+    repeated = client.put(f"/uploads/sessions/{upload_id}", params={"offset": 0}, content=raw[:half])
+    assert repeated.status_code == 409
+    assert repeated.headers["Upload-Offset"] == str(half)
+
+    # Reanudar desde el estado de la sesión
+    status = client.get(f"/uploads/sessions/{upload_id}").json()
+    second = client.put(f"/uploads/sessions/{upload_id}",
+                        params={"offset": status["received_bytes"]}, content=raw[half:])
+    assert second.json()["complete"] is True
+
+    result = client.post(f"/uploads/sessions/{upload_id}/complete", data={"mode": "create"})
+    assert result.status_code == 200
+    assert result.json()["rows_read"] == 3
+    assert result.json()["file_name"] == "big.parquet"
+    assert client.get(f"/uploads/sessions/{upload_id}").status_code == 404
+
+def test_chunked_upload_incomplete_is_rejected():
+    created = client.post("/uploads/sessions", json={"file_name": "partial.parquet", "total_size": 100})
+    upload_id = created.json()["upload_id"]
+    client.put(f"/uploads/sessions/{upload_id}", params={"offset": 0}, content=b"x" * 10)
+
+    response = client.post(f"/uploads/sessions/{upload_id}/complete", data={"mode": "create"})
+
+    assert response.status_code == 400
+    assert "incomplete" in response.json()["detail"].lower()
+    assert client.delete(f"/uploads/sessions/{upload_id}").status_code == 204
+
+
+#TESTS ARROW IPC / FEATHER
+
+def test_upload_arrow_matches_parquet_aggregation():
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    df = pd.DataFrame({
+        "PULocationID": [760, 760, 760, 761, 761, 762, 0],
+        "DOLocationID": [761, 761, 762, 762, 761, 760, 760],
+    })
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    stream = pa.BufferOutputStream()
+    with pa.ipc.new_stream(stream, table.schema) as writer:
+        writer.write_table(table, max_chunksize=3)
+    feather_buffer = io.BytesIO()
+    feather.write_feather(table, feather_buffer)
+
+    data = {"mode": "create", "top_n_routes": 2}
+    from_stream = client.post("/uploads/trips-arrow",
+                              files={"file": ("trips.arrows", stream.getvalue().to_pybytes())}, data=data)
+    from_feather = client.post("/uploads/trips-arrow",
+                               files={"file": ("trips.feather", feather_buffer.getvalue())}, data=data)
+    from_parquet = client.post("/uploads/trips-parquet",
+                               files={"file": ("trips.parquet", _trips_parquet(df, 10))}, data=data)
+
+    for response in (from_stream, from_feather, from_parquet):
+        assert response.status_code == 200
+        assert response.json()["rows_read"] == 7
+        assert response.json()["routes_detected"] == 4
+    assert from_stream.json()["routes_created"] == 2
+
+def test_upload_arrow_rejects_invalid_file():
+    response = client.post("/uploads/trips-arrow",
+                           files={"file": ("trips.arrow", b"not arrow data")}, data={"mode": "create"})
+    assert response.status_code == 400
+
+def test_upload_arrow_rejects_text_zone_ids_and_accepts_top_zero():
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    def feather_file(table):
+        buffer = io.BytesIO()
+        feather.write_feather(table, buffer)
+        return {"file": ("trips.feather", buffer.getvalue())}
+
+    text_ids = pa.table({"PULocationID": ["763", "764"], "DOLocationID": ["764", "763"]})
+    response = client.post("/uploads/trips-arrow", files=feather_file(text_ids), data={"mode": "create"})
+    assert response.status_code == 400
+    assert "PULocationID" in response.json()["detail"]
+
+    numeric_ids = pa.table({"PULocationID": [763, 764], "DOLocationID": [764, 763]})
+    response = client.post("/uploads/trips-arrow", files=feather_file(numeric_ids),
+                           data={"mode": "create", "top_n_routes": 0})
+    assert response.status_code == 200
+    assert response.json()["routes_detected"] == 2 and response.json()["routes_created"] == 0
+
+
+#TESTS EXPORTACIÓN EN STREAMING
+
+def test_export_routes_ndjson_applies_filters():
+    import json
+
+    client.post("/zones/", json={"id": 780, "borough": "Queens", "zone_name": "Export A"})
+    client.post("/zones/", json={"id": 781, "borough": "Queens", "zone_name": "Export B"})
+    client.post("/routes/", json={"pickup_zone_id": 780, "dropoff_zone_id": 781, "name": "Export route"})
+
+    response = client.get("/routes/export", params={"format": "ndjson", "pickup_zone_id": 780})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["name"] for r in lines] == ["Export route"]
+    assert lines[0]["created_at"] == client.get(f"/routes/{lines[0]['id']}").json()["created_at"]
+
+def test_export_zones_parquet_and_arrow():
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    expected = len(client.get("/zones/", params={"borough": "queens"}).json())
+
+    as_parquet = client.get("/zones/export", params={"format": "parquet", "borough": "queens"})
+    as_arrow = client.get("/zones/export", params={"format": "arrow", "borough": "queens"})
+
+    assert as_parquet.status_code == 200 and as_arrow.status_code == 200
+    table = pq.read_table(io.BytesIO(as_parquet.content))
+    assert table.num_rows == expected
+    assert table.column_names == ["id", "borough", "zone_name", "service_zone", "active", "lat", "lon", "created_at"]
+    assert pa.ipc.open_stream(as_arrow.content).read_all().num_rows == expected
+
+def test_export_invalid_format():
+    assert client.get("/zones/export", params={"format": "csv"}).status_code == 400
+
+
+#TESTS GRAFO DE RUTAS
+
+def _create_route(pickup, dropoff):
+    response = client.post("/routes/", json={
+        "pickup_zone_id": pickup, "dropoff_zone_id": dropoff, "name": f"Graph {pickup}-{dropoff}"
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+def test_graph_neighbors_degree_reachable_and_path():
+    for zone_id in range(800, 806):
+        client.post("/zones/", json={"id": zone_id, "borough": "Bronx", "zone_name": f"Graph {zone_id}"})
+    # 800 -> 801 -> 802 -> 803 y un atajo 800 -> 804 -> 803
+    for pickup, dropoff in [(800, 801), (801, 802), (802, 803), (800, 804), (804, 803)]:
+        _create_route(pickup, dropoff)
+
+    neighbors = client.get("/graph/zones/800/neighbors").json()
+    assert [n["zone_id"] for n in neighbors] == [801, 804]
+    incoming = client.get("/graph/zones/803/neighbors", params={"direction": "in"}).json()
+    assert [n["zone_id"] for n in incoming] == [802, 804]
+
+    degree = client.get("/graph/zones/803/degree").json()
+    assert degree["in_degree"] == 2 and degree["out_degree"] == 0
+
+    reachable = client.get("/graph/zones/800/reachable", params={"k": 2}).json()
+    assert {z["zone_id"]: z["hops"] for z in reachable["zones"]} == {801: 1, 804: 1, 802: 2, 803: 2}
+
+    path = client.get("/graph/path", params={"source": 800, "target": 803}).json()
+    assert path["path"] == [800, 804, 803]
+    assert path["hops"] == 2
+
+    assert client.get("/graph/path", params={"source": 803, "target": 800}).status_code == 404
+    assert client.get("/graph/zones/99999/degree").status_code == 404
+
+def test_graph_index_follows_route_updates_and_deletes():
+    route_id = _create_route(805, 801)
+    client.put(f"/routes/{route_id}", json={"dropoff_zone_id": 802})
+
+    assert [r["id"] for r in client.get("/routes/", params={"pickup_zone_id": 805}).json()] == [route_id]
+    assert client.get("/routes/", params={"pickup_zone_id": 805, "dropoff_zone_id": 801}).json() == []
+    assert [n["zone_id"] for n in client.get("/graph/zones/805/neighbors").json()] == [802]
+
+    client.delete(f"/routes/{route_id}")
+    assert client.get("/graph/zones/805/neighbors").json() == []
+
+def test_upload_and_crud_share_route_ids():
+    df = pd.DataFrame({"PULocationID": [790], "DOLocationID": [791]})
+    client.post("/uploads/trips-parquet", files={"file": ("ids.parquet", _trips_parquet(df, 1))},
+                data={"mode": "create"})
+    manual_id = _create_route(790, 791)
+
+    routes = client.get("/routes/", params={"pickup_zone_id": 790}).json()
+    assert len(routes) == 2
+    assert len({r["id"] for r in client.get("/routes/").json()}) == len(client.get("/routes/").json())
+    assert manual_id in [r["id"] for r in routes]
+
+
+#TESTS CASCADA AL ELIMINAR/DESACTIVAR ZONAS
+
+def _create_zones(*zone_ids):
+    for zone_id in zone_ids:
+        client.post("/zones/", json={"id": zone_id, "borough": "Staten Island", "zone_name": f"Cascade {zone_id}"})
+
+def test_delete_zone_restrict_by_default():
+    _create_zones(820, 821)
+    route_id = _create_route(820, 821)
+
+    response = client.delete("/zones/820")
+
+    assert response.status_code == 409
+    assert client.get("/zones/820").status_code == 200
+    assert client.get(f"/routes/{route_id}").status_code == 200
+
+def test_delete_zone_cascade_delete_and_deactivate():
+    _create_zones(822)
+    deleted_route = _create_route(820, 822)
+    kept_route = _create_route(821, 822)
+
+    assert client.delete("/zones/820", params={"cascade": "delete"}).status_code == 204
+    assert client.get(f"/routes/{deleted_route}").status_code == 404
+    # La ruta 820 -> 821 del test anterior también se eliminó
+    assert client.get("/routes/", params={"pickup_zone_id": 820}).json() == []
+
+    assert client.delete("/zones/822", params={"cascade": "deactivate"}).status_code == 204
+    assert client.get(f"/routes/{kept_route}").json()["active"] is False
+
+def test_deactivate_zone_cascade():
+    _create_zones(823, 824)
+    route_id = _create_route(823, 824)
+
+    restricted = client.put("/zones/823", params={"cascade": "restrict"}, json={"active": False})
+    assert restricted.status_code == 409
+
+    response = client.put("/zones/823", params={"cascade": "deactivate"}, json={"active": False})
+    assert response.status_code == 200
+    assert response.json()["active"] is False
+    assert client.get(f"/routes/{route_id}").json()["active"] is False
+
+def test_bulk_delete_zones():
+    _create_zones(825, 826, 827)
+    _create_route(825, 826)
+
+    restricted = client.post("/zones/bulk-delete", json={"ids": [825, 826, 827]})
+    assert restricted.status_code == 409
+    assert client.get("/zones/827").status_code == 200
+
+    response = client.post("/zones/bulk-delete", json={"ids": [825, 826, 827, 99999], "cascade": "delete"})
+    assert response.status_code == 200
+    assert response.json() == {
+        "deleted": [825, 826, 827], "not_found": [99999], "routes_deleted": 1, "routes_deactivated": 0
+    }
+    assert client.get("/zones/826").status_code == 404
+
+
+#TESTS ESTADÍSTICAS
+
+def test_stats_match_full_recount():
+    from collections import Counter
+
+    _create_zones(840, 841)
+    route_id = _create_route(840, 841)
+    client.put("/zones/840", json={"borough": "Manhattan"})
+    client.put(f"/routes/{route_id}", json={"active": False})
+
+    zones = client.get("/zones/").json()
+    routes = client.get("/routes/").json()
+    zones_by_id = {z["id"]: z for z in zones}
+    stats = client.get("/stats/").json()
+
+    assert stats["zones"]["total"] == len(zones)
+    assert stats["zones"]["active"] == sum(z["active"] for z in zones)
+    assert stats["zones"]["by_borough"] == dict(Counter(z["borough"] for z in zones))
+    assert stats["zones"]["by_service_zone"] == dict(Counter(z["service_zone"] for z in zones))
+    assert stats["routes"]["total"] == len(routes)
+    assert stats["routes"]["inactive"] == sum(not r["active"] for r in routes)
+    assert stats["routes"]["by_pickup_borough"] == dict(Counter(
+        zones_by_id[r["pickup_zone_id"]]["borough"] for r in routes if r["pickup_zone_id"] in zones_by_id
+    ))
+
+def test_stats_top_zones():
+    from collections import Counter
+
+    _create_zones(842, 843, 844)
+    for dropoff in (843, 844, 841):
+        _create_route(842, dropoff)
+
+    top = client.get("/stats/top-zones", params={"k": 1}).json()
+    by_pickup = Counter(r["pickup_zone_id"] for r in client.get("/routes/").json())
+    assert top["origins"][0]["routes"] == max(by_pickup.values())
+    assert len(top["destinations"]) == 1
+
+
+#TESTS CHANGE FEED (SSE)
+
+def _parse_sse(text):
+    import json
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+def test_changes_feed_replays_mutations_since_sequence():
+    start = client.get("/changes/latest").json()["seq"]
+
+    client.post("/zones/", json={"id": 860, "borough": "Queens", "zone_name": "Feed A"})
+    client.put("/zones/860", json={"zone_name": "Feed A2"})
+    client.post("/zones/", json={"id": 861, "borough": "Queens", "zone_name": "Feed B"})
+    route_id = _create_route(860, 861)
+    client.delete(f"/routes/{route_id}")
+
+    response = client.get("/changes/", params={"since": start, "follow": False})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [data for kind, data in _parse_sse(response.text)]
+    assert [(e["entity"], e["op"], e["id"]) for e in events] == [
+        ("zone", "create", 860), ("zone", "update", 860), ("zone", "create", 861),
+        ("route", "create", route_id), ("route", "delete", route_id),
+    ]
+    assert events[1]["data"]["zone_name"] == "Feed A2"
+    assert [e["seq"] for e in events] == list(range(start + 1, start + 6))
+
+    # Reanudar con Last-Event-ID: solo los eventos posteriores
+    resumed = client.get("/changes/", params={"follow": False}, headers={"Last-Event-ID": str(start + 4)})
+    assert [data["op"] for _, data in _parse_sse(resumed.text)] == ["delete"]
+
+def test_change_feed_reports_truncation():
+    from app.changes import ChangeFeed
+
+    feed = ChangeFeed(capacity=3)
+    for zone_id in range(5):
+        feed.publish("zone", "create", zone_id, {"id": zone_id})
+
+    events, truncated = feed.since(0)
+    assert truncated is True
+    events, truncated = feed.since(2)
+    assert truncated is False
+    assert [e["seq"] for e in events] == [3, 4, 5]
+    # Cliente adelantado al feed (el backend se reinició): recarga completa
+    assert feed.since(5) == ([], False)
+    assert feed.since(9) == ([], True)
+    stream = client.get("/changes/", params={"since": 10**9, "follow": False})
+    assert [kind for kind, _ in _parse_sse(stream.text)] == ["reset"]
+
+def test_change_feed_wakes_waiters_from_other_threads():
+    import asyncio
+    import threading
+    from app.changes import ChangeFeed
+
+    feed = ChangeFeed(capacity=10)
+
+    async def wait_for_publish():
+        threading.Timer(0.05, feed.publish, args=("route", "delete", 1)).start()
+        return await feed.wait(0, timeout=5)
+
+    assert asyncio.run(wait_for_publish()) is True
+    assert asyncio.run(feed.wait(1, timeout=0.01)) is False
+
+
+#TESTS PAGINACIÓN
+
+def test_list_zones_paginated_with_total_count():
+    for zone_id in range(870, 875):
+        client.post("/zones/", json={"id": zone_id, "borough": "Paged Borough", "zone_name": f"Paged {zone_id}"})
+
+    full = client.get("/zones/", params={"borough": "Paged Borough"})
+    page = client.get("/zones/", params={"borough": "Paged Borough", "limit": 2, "offset": 2})
+
+    assert full.headers["X-Total-Count"] == "5"
+    assert page.headers["X-Total-Count"] == "5"
+    assert [z["id"] for z in page.json()] == [z["id"] for z in full.json()][2:4]
+    assert client.get("/zones/", params={"limit": 0}).status_code == 422
+
+    # Búsqueda por lote de IDs (los que no existen se omiten)
+    by_ids = client.get("/zones/", params={"ids": "873,870,999999"})
+    assert [z["id"] for z in by_ids.json()] == [870, 873]
+    assert by_ids.headers["X-Total-Count"] == "2"
+    assert client.get("/zones/", params={"ids": "870,x"}).status_code == 400
+
+def test_list_routes_paginated_with_total_count():
+    route_ids = [_create_route(870, dropoff) for dropoff in (871, 872, 873)]
+
+    page = client.get("/routes/", params={"pickup_zone_id": 870, "limit": 2, "offset": 1})
+
+    assert page.headers["X-Total-Count"] == "3"
+    assert [r["id"] for r in page.json()] == sorted(route_ids)[1:3]
+
+
+#TESTS TRABAJOS DE INGESTA EN SEGUNDO PLANO
+
+def _upload_session(raw, file_name="job.parquet"):
+    upload_id = client.post("/uploads/sessions", json={"file_name": file_name, "total_size": len(raw)}).json()["upload_id"]
+    client.put(f"/uploads/sessions/{upload_id}", params={"offset": 0}, content=raw)
+    return upload_id
+
+def _wait_for_job(job_id):
+    import time
+    for _ in range(200):
+        job = client.get(f"/uploads/jobs/{job_id}").json()
+        if job["stage"] in ("done", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError("job did not finish")
+
+def test_ingest_job_reports_progress_and_result():
+    df = pd.DataFrame({
+        'PULocationID': [880, 880, 881, 882] * 5,
+        'DOLocationID': [881, 881, 882, 880] * 5,
+    })
+    upload_id = _upload_session(_trips_parquet(df, row_group_size=4).getvalue())
+
+    response = client.post(f"/uploads/sessions/{upload_id}/jobs",
+                           data={"mode": "create", "limit_rows": 12, "top_n_routes": 2})
+    assert response.status_code == 202
+    # El trabajo se queda con el archivo: la sesión ya no existe
+    assert client.get(f"/uploads/sessions/{upload_id}").status_code == 404
+
+    job = _wait_for_job(response.json()["job_id"])
+    assert job["stage"] == "done"
+    assert job["error"] is None
+    assert job["rows_total"] == 12
+    assert job["rows_processed"] == 12
+    assert job["eta_seconds"] == 0
+    assert job["result"]["rows_read"] == 12
+    assert job["result"]["routes_created"] == 2
+    assert job["job_id"] in [j["job_id"] for j in client.get("/uploads/jobs").json()]
+
+def test_ingest_job_failure_is_reported():
+    df = pd.DataFrame({'PULocationID': [1, 2]})
+    upload_id = _upload_session(_trips_parquet(df, row_group_size=2).getvalue())
+
+    response = client.post(f"/uploads/sessions/{upload_id}/jobs", data={"mode": "create"})
+    job = _wait_for_job(response.json()["job_id"])
+
+    assert job["stage"] == "failed"
+    assert "Missing required columns" in job["error"]
+    assert client.get("/uploads/jobs/unknown").status_code == 404
+
+
+def test_ingest_job_rejected_by_admission_can_be_retried(monkeypatch):
+    from app.admission import admission_controller
+
+    df = pd.DataFrame({'PULocationID': [883, 884], 'DOLocationID': [884, 883]})
+    upload_id = _upload_session(_trips_parquet(df, row_group_size=2).getvalue())
+
+    monkeypatch.setattr(admission_controller, "max_concurrent", 0)
+    monkeypatch.setattr(admission_controller, "max_queue", 0)
+    response = client.post(f"/uploads/sessions/{upload_id}/jobs", data={"mode": "create"})
+    rejected = _wait_for_job(response.json()["job_id"])
+    assert rejected["stage"] == "failed"
+    assert "retry later" in rejected["error"]
+    # La sesión y su archivo siguen disponibles
+    assert client.get(f"/uploads/sessions/{upload_id}").status_code == 200
+
+    monkeypatch.undo()
+    response = client.post(f"/uploads/sessions/{upload_id}/jobs", data={"mode": "create"})
+    retried = _wait_for_job(response.json()["job_id"])
+    assert retried["stage"] == "done"
+    assert retried["result"]["rows_read"] == 2
+    assert client.get(f"/uploads/sessions/{upload_id}").status_code == 404
+
+#TESTS IDEMPOTENCY-KEY
+
+def test_idempotent_route_creation_replays_response():
+    _create_zones(890, 891)
+    headers = {"Idempotency-Key": "route-890-891"}
+    payload = {"pickup_zone_id": 890, "dropoff_zone_id": 891, "name": "Idempotent route"}
+
+    first = client.post("/routes/", json=payload, headers=headers)
+    retry = client.post("/routes/", json=payload, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert len(client.get("/routes/", params={"pickup_zone_id": 890}).json()) == 1
+
+    changed = client.post("/routes/", json={**payload, "name": "Other"}, headers=headers)
+    assert changed.status_code == 422
+
+def test_idempotent_concurrent_duplicates_execute_once():
+    from concurrent.futures import ThreadPoolExecutor
+
+    _create_zones(892, 893)
+    payload = {"pickup_zone_id": 892, "dropoff_zone_id": 893, "name": "Concurrent route"}
+
+    def post(_):
+        return client.post("/routes/", json=payload, headers={"Idempotency-Key": "concurrent-892"})
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(post, range(8)))
+
+    assert {r.json()["id"] for r in responses} == {responses[0].json()["id"]}
+    assert len(client.get("/routes/", params={"pickup_zone_id": 892}).json()) == 1
+
+def test_idempotent_upload_ignores_multipart_boundary():
+    df = pd.DataFrame({'PULocationID': [894, 895], 'DOLocationID': [895, 894]})
+    raw = _trips_parquet(df, row_group_size=2).getvalue()
+    headers = {"Idempotency-Key": "upload-894"}
+
+    first = client.post("/uploads/trips-parquet", headers=headers,
+                        files={"file": ("idem.parquet", raw)}, data={"mode": "create"})
+    # httpx genera un boundary distinto en cada envío
+    retry = client.post("/uploads/trips-parquet", headers=headers,
+                        files={"file": ("idem.parquet", raw)}, data={"mode": "create"})
+
+    assert first.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+
+
+#TESTS CONTROL DE ADMISIÓN
+
+def test_admission_queue_grants_in_order_and_rejects_overflow():
+    import asyncio
+    from app.admission import AdmissionController, AdmissionRejected
+
+    controller = AdmissionController(max_concurrent=1, max_inflight_bytes=100, max_queue=1,
+                                     queue_timeout_seconds=0.05, retry_after_seconds=7)
+
+    async def scenario():
+        first = await controller.acquire(60)
+        waiting = asyncio.ensure_future(controller.acquire(60))
+        await asyncio.sleep(0)
+        assert controller.snapshot()["queued"] == 1
+
+        # Cola llena: 429 inmediato
+        with pytest.raises(AdmissionRejected) as overflow:
+            await controller.acquire(10)
+        assert overflow.value.status_code == 429
+        assert overflow.value.headers == {"Retry-After": "7"}
+
+        # Al liberar, el primero de la cola recibe el turno
+        controller.release(first)
+        second = await waiting
+        assert controller.snapshot()["active"] == 1
+
+        # Nadie libera: la espera vence con 503
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await controller.acquire(10)
+        assert timed_out.value.status_code == 503
+        controller.release(second)
+
+    asyncio.run(scenario())
+    snapshot = controller.snapshot()
+    assert snapshot["active"] == 0 and snapshot["inflight_bytes"] == 0 and snapshot["queued"] == 0
+    assert snapshot["admitted_total"] == 2
+    assert snapshot["rejected_queue_full_total"] == 1
+    assert snapshot["rejected_timeout_total"] == 1
+
+def test_upload_rejected_when_admission_is_saturated(monkeypatch):
+    from app.admission import admission_controller
+
+    monkeypatch.setattr(admission_controller, "max_concurrent", 0)
+    monkeypatch.setattr(admission_controller, "max_queue", 0)
+    df = pd.DataFrame({'PULocationID': [1], 'DOLocationID': [2]})
+
+    response = client.post("/uploads/trips-parquet",
+                           files={"file": ("busy.parquet", _trips_parquet(df, 1).getvalue())},
+                           data={"mode": "create"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(admission_controller.retry_after_seconds)
+    status = client.get("/uploads/admission").json()
+    assert status["rejected_queue_full_total"] >= 1
+    assert status["active"] == 0
+
+
+def test_idempotency_does_not_store_admission_rejections(monkeypatch):
+    from app.admission import admission_controller
+
+    df = pd.DataFrame({'PULocationID': [896], 'DOLocationID': [897]})
+    raw = _trips_parquet(df, 1).getvalue()
+    headers = {"Idempotency-Key": "busy-896"}
+
+    monkeypatch.setattr(admission_controller, "max_concurrent", 0)
+    monkeypatch.setattr(admission_controller, "max_queue", 0)
+    busy = client.post("/uploads/trips-parquet", headers=headers,
+                       files={"file": ("busy.parquet", raw)}, data={"mode": "create"})
+    assert busy.status_code == 429
+
+    # Con capacidad libre el reintento con la misma clave se ejecuta
+    monkeypatch.undo()
+    retry = client.post("/uploads/trips-parquet", headers=headers,
+                        files={"file": ("busy.parquet", raw)}, data={"mode": "create"})
+    assert retry.status_code == 200
+    assert "Idempotent-Replayed" not in retry.headers
+
+#TESTS KERNEL DE CONTEO DE RUTAS
+
+def _reference_route_counts(pickup, dropoff, top_n):
+    df = pd.DataFrame({'PULocationID': pickup, 'DOLocationID': dropoff})
+    counts = df.groupby(['PULocationID', 'DOLocationID']).size().reset_index(name='count')
+    counts = counts[counts['PULocationID'] != counts['DOLocationID']]
+    # groupby deja los pares ordenados: un sort estable desempata por (origen, destino)
+    counts = counts.sort_values('count', ascending=False, kind='stable')
+    top = [tuple(int(v) for v in row) for row in counts.head(top_n).itertuples(index=False)]
+    return sorted(set(pickup) | set(dropoff)), len(counts), top
+
+@pytest.mark.parametrize("max_zone, dense_cells", [
+    (265, None),          # IDs TLC: matriz densa directa
+    (5_000_000, None),    # IDs dispersos compactados
+    (5_000_000, 16),      # IDs dispersos contados con np.unique
+])
+def test_route_count_kernel_matches_groupby(monkeypatch, max_zone, dense_cells):
+    import numpy as np
+    from app import route_counts
+
+    if dense_cells is not None:
+        monkeypatch.setattr(route_counts, "DENSE_MAX_CELLS", dense_cells)
+    rng = np.random.default_rng(max_zone)
+    zones = rng.choice(np.arange(1, max_zone + 1), size=40, replace=False)
+    pickup = rng.choice(zones, size=5_000)
+    dropoff = rng.choice(zones, size=5_000)
+
+    for top_n in (1, 7, 50, None):
+        expected = _reference_route_counts(pickup.tolist(), dropoff.tolist(), top_n)
+        assert route_counts.count_route_pairs(pickup, dropoff, top_n) == expected
+
+
+#TESTS ARRANQUE EN FRÍO
+
+def test_app_import_does_not_load_ingest_stack():
+    import os
+    import subprocess
+    import sys
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # Proceso nuevo: en este ya se importó pandas (arriba y en otros tests)
+    code = "import sys, app.main; print(sorted(m for m in ('numpy', 'pandas', 'pyarrow') if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=backend_dir, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+def test_prewarm_loads_ingest_modules():
+    import sys
+    from app.warmup import HEAVY_MODULES, start_prewarm
+
+    start_prewarm().join(timeout=30)
+    assert all(name in sys.modules for name in HEAVY_MODULES)
+
+
+#TESTS INSPECCIÓN DEL FOOTER
+
+def test_inspect_parquet_reads_footer_metadata():
+    df = pd.DataFrame({
+        "PULocationID": [900, 901, 902, 903],
+        "DOLocationID": [901, 902, 903, 904],
+        "tpep_pickup_datetime": pd.date_range("2024-01-01", periods=4, freq="D"),
+    })
+    files = {"file": ("trips.parquet", _trips_parquet(df, row_group_size=2), "application/octet-stream")}
+
+    response = client.post("/uploads/inspect", files=files, data={"zone_ids": "904"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["valid"] is True
+    assert body["num_rows"] == 4
+    assert body["num_row_groups"] == 2
+    assert body["pickup_datetime_column"] == "tpep_pickup_datetime"
+    pickup = next(c for c in body["columns"] if c["name"] == "PULocationID")
+    assert (pickup["min"], pickup["max"], pickup["null_count"]) == (900, 903, 0)
+    # Solo el segundo row group puede contener la zona 904
+    assert body["estimate"]["row_groups_to_read"] == 1
+    assert body["estimate"]["row_groups_skipped"] == 1
+    # La inspección no modifica el store
+    assert client.get("/zones/900").status_code == 404
+
+def test_inspect_parquet_reports_invalid_schema():
+    df = pd.DataFrame({"PULocationID": [1]})
+    files = {"file": ("bad.parquet", _trips_parquet(df, 1), "application/octet-stream")}
+
+    body = client.post("/uploads/inspect", files=files).json()
+
+    assert body["valid"] is False
+    assert body["errors"] == ["Missing required columns: DOLocationID"]
+    assert body["estimate"] is None
+
+def test_upload_rejects_non_parquet_content_from_footer():
+    raw = b"not a parquet file" * 100
+
+    response = client.post(
+        "/uploads/trips-parquet", files={"file": ("fake.parquet", raw)}, data={"mode": "create"}
+    )
+    inspect = client.post("/uploads/inspect", files={"file": ("fake.parquet", raw)})
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Invalid parquet file")
+    assert inspect.status_code == 400
+
+
+#TESTS DECODIFICACIÓN EN PARALELO Y MUESTREO
+
+def test_parallel_row_group_decoding_matches_sequential():
+    import pyarrow as pa
+    from app.ingest import TripFilters, read_trips
+
+    df = pd.DataFrame({
+        "PULocationID": [900 + i % 7 for i in range(200)],
+        "DOLocationID": [910 + i % 5 for i in range(200)],
+    })
+    raw = _trips_parquet(df, row_group_size=10).getvalue()
+
+    for filters in (None, TripFilters(zone_ids={903, 912})):
+        sequential = read_trips(pa.BufferReader(raw), filters=filters, max_workers=1)
+        parallel = read_trips(pa.BufferReader(raw), filters=filters, max_workers=4)
+        assert parallel.table.equals(sequential.table)
+        assert parallel.row_groups_read == sequential.row_groups_read
+
+def test_read_trips_does_not_mutate_caller_filters():
+    import pyarrow as pa
+    from datetime import datetime, timezone
+    from app.ingest import TripFilters, read_trips
+
+    df = pd.DataFrame({
+        "tpep_pickup_datetime": pd.date_range("2024-01-01", periods=4, freq="D"),
+        "PULocationID": [1, 2, 3, 4],
+        "DOLocationID": [2, 3, 4, 1],
+    })
+    start = datetime(2024, 1, 2, tzinfo=timezone.utc)
+    filters = TripFilters(start=start)
+
+    result = read_trips(pa.BufferReader(_trips_parquet(df, 2).getvalue()), filters=filters)
+    assert result.table.num_rows == 3
+    # El objeto del llamador (parte de la clave de caché) queda igual
+    assert filters.start is start and filters.start.tzinfo is not None
+
+def test_upload_parquet_random_row_group_sample():
+    import random
+
+    # 10 row groups de 2 filas; cada row group tiene su propio par de zonas
+    df = pd.DataFrame({
+        "PULocationID": [920 + i // 2 for i in range(20)],
+        "DOLocationID": [940 + i // 2 for i in range(20)],
+    })
+    raw = _trips_parquet(df, row_group_size=2).getvalue()
+    data = {"mode": "create", "limit_rows": "4", "sample": "random_row_groups", "seed": "7"}
+
+    response = client.post("/uploads/trips-parquet", files={"file": ("sample.parquet", raw)}, data=data)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["sample"], body["sample_seed"]) == ("random_row_groups", 7)
+    assert body["rows_read"] == 4
+    # Solo se decodifican los row groups necesarios para llegar a limit_rows
+    assert body["row_groups_read"] == 2
+    order = list(range(10))
+    random.Random(7).shuffle(order)
+    for group in order[:2]:
+        assert client.get(f"/zones/{920 + group}").status_code == 200
+    assert client.get(f"/zones/{920 + order[2]}").status_code == 404
+
+    # Sin semilla se sortea una y se devuelve para repetir la muestra
+    data.pop("seed")
+    body = client.post("/uploads/inspect", files={"file": ("sample.parquet", raw)}, data=data).json()
+    assert body["sample_seed"] is not None
+    assert body["estimate"]["row_groups_to_read"] == 2
+
+def test_upload_parquet_rejects_unknown_sample_mode():
+    df = pd.DataFrame({"PULocationID": [1], "DOLocationID": [2]})
+    files = {"file": ("trips.parquet", _trips_parquet(df, 1), "application/octet-stream")}
+
+    response = client.post("/uploads/trips-parquet", files=files, data={"mode": "create", "sample": "tail"})
+
+    assert response.status_code == 400
+    assert "sample" in response.json()["detail"]
+
+
+#TESTS ZONAS POR COORDENADAS
+
+def _square_zones_geojson(zone_ids, size=0.01):
+    """Zonas cuadradas contiguas sobre el eje x; la primera tiene un hueco en el centro."""
+    import json
+
+    features = []
+    for i, zone_id in enumerate(zone_ids):
+        x0, y0 = -74.0 + i * size, 40.7
+        ring = [[x0, y0], [x0 + size, y0], [x0 + size, y0 + size], [x0, y0 + size], [x0, y0]]
+        rings = [ring]
+        if i == 0:
+            q = size / 4
+            rings.append([[x0 + q, y0 + q], [x0 + 3 * q, y0 + q], [x0 + 3 * q, y0 + 3 * q], [x0 + q, y0 + 3 * q]])
+        features.append({
+            "type": "Feature",
+            "properties": {"location_id": str(zone_id)},
+            "geometry": {"type": "Polygon", "coordinates": rings},
+        })
+    return json.dumps({"type": "FeatureCollection", "features": features}).encode()
+
+def test_zone_locator_point_in_polygon():
+    import json
+    from app.geo import ZoneLocator
+
+    locator = ZoneLocator.from_geojson(json.loads(_square_zones_geojson([950, 951, 952])), grid_size=8)
+
+    lon = [-73.9995, -73.995, -73.985, -73.975, -73.96, float("nan")]
+    lat = [40.7005, 40.705, 40.705, 40.709, 40.705, 40.705]
+    # El centro de la primera zona es un hueco; los dos últimos quedan fuera
+    assert locator.locate(lon, lat).tolist() == [950, 0, 951, 952, 0, 0]
+
+def test_zone_locator_shared_horizontal_edge():
+    import numpy as np
+    from app.geo import ZoneLocator
+
+    def rect(y0, y1):
+        return [np.array([[0, y0], [10, y0], [10, y1], [0, y1], [0, y0]], dtype=float)]
+
+    # El borde compartido (y=5.05) es horizontal y cruza celdas cuyo centro está en la zona 2
+    locator = ZoneLocator({1: rect(0, 5.05), 2: rect(5.05, 10)}, grid_size=4)
+    assert locator.locate([5, 5, 5, 5], [5.0, 5.1, 4.9, 6.0]).tolist() == [1, 2, 1, 2]
+
+def test_unreadable_zone_geometry_file_is_reported(monkeypatch):
+    from app.config import settings
+    from app.geo import set_zone_locator
+
+    trips = pd.DataFrame({
+        "pickup_longitude": [-73.9995], "pickup_latitude": [40.7005],
+        "dropoff_longitude": [-73.985], "dropoff_latitude": [40.705],
+    })
+    monkeypatch.setattr(settings, "taxi_zones_geojson", "/nonexistent/taxi_zones.geojson")
+    set_zone_locator(None)
+    try:
+        for _ in range(2):
+            response = client.post("/uploads/trips-parquet", data={"mode": "create"},
+                                   files={"file": ("yellow_2014.parquet", _trips_parquet(trips, 1))})
+            assert response.status_code == 400
+            assert "zone geometry" in response.json()["detail"]
+            assert "/nonexistent/taxi_zones.geojson" in response.json()["detail"]
+        status = client.get("/uploads/zone-geometry")
+        assert status.status_code == 404
+        assert "/nonexistent/taxi_zones.geojson" in status.json()["detail"]
+    finally:
+        monkeypatch.undo()
+        set_zone_locator(None)
+
+def test_upload_parquet_with_coordinates_assigns_zones():
+    from app.geo import set_zone_locator
+
+    trips = pd.DataFrame({
+        "pickup_longitude": [-73.9995, -73.9995, -73.985, -73.9995, 0.0],
+        "pickup_latitude": [40.7005, 40.7005, 40.705, 40.7005, 0.0],
+        "dropoff_longitude": [-73.985, -73.985, -73.975, -73.975, -73.985],
+        "dropoff_latitude": [40.705, 40.705, 40.705, 40.705, 40.705],
+    })
+    files = {"file": ("yellow_2014.parquet", _trips_parquet(trips, 2), "application/octet-stream")}
+
+    set_zone_locator(None)
+    response = client.post("/uploads/trips-parquet", files=files, data={"mode": "create"})
+    assert response.status_code == 400
+    assert "zone geometry" in response.json()["detail"]
+    assert client.get("/uploads/zone-geometry").status_code == 404
+
+    geometry = client.post(
+        "/uploads/zone-geometry", files={"file": ("zones.geojson", _square_zones_geojson([955, 956, 957]))}
+    )
+    try:
+        assert geometry.status_code == 200
+        assert geometry.json()["zones"] == 3
+
+        files["file"][1].seek(0)
+        response = client.post("/uploads/trips-parquet", files=files, data={"mode": "create"})
+
+        assert response.status_code == 200
+        assert response.json()["routes_created"] == 3
+        routes = {(r["pickup_zone_id"], r["dropoff_zone_id"]) for r in client.get("/routes").json()}
+        assert {(955, 956), (956, 957), (955, 957)} <= routes
+    finally:
+        set_zone_locator(None)
+
+
+#TESTS BÚSQUEDA POR CERCANÍA
+
+def test_nearest_and_within_zones():
+    points = {960: (40.7580, -73.9855), 961: (40.7527, -73.9772), 962: (40.7061, -74.0087), 963: (40.6413, -73.7781)}
+    for zone_id, (lat, lon) in points.items():
+        payload = {"id": zone_id, "borough": "Manhattan", "zone_name": f"Geo {zone_id}", "lat": lat, "lon": lon}
+        assert client.post("/zones", json=payload).status_code == 201
+    # Sin centroide: no participa de la búsqueda
+    client.post("/zones", json={"id": 964, "borough": "Manhattan", "zone_name": "Sin centroide"})
+
+    nearest = client.get("/zones/nearest", params={"lat": 40.7590, "lon": -73.9845, "k": 2}).json()
+    assert [z["id"] for z in nearest] == [960, 961]
+    assert nearest[0]["distance_km"] < nearest[1]["distance_km"]
+
+    within = client.get("/zones/within", params={"lat": 40.7580, "lon": -73.9855, "radius_km": 1.5}).json()
+    assert [z["id"] for z in within] == [960, 961]
+
+    # El índice sigue las mutaciones: mover, desactivar y borrar
+    client.put("/zones/962", json={"lat": 40.7585, "lon": -73.9850})
+    client.put("/zones/960", json={"active": False})
+    client.delete("/zones/961")
+    nearest = client.get("/zones/nearest", params={"lat": 40.7590, "lon": -73.9845, "k": 2, "active": True}).json()
+    assert [z["id"] for z in nearest] == [962, 963]
+
+def test_nearest_zones_validates_coordinates():
+    assert client.get("/zones/nearest", params={"lat": 95, "lon": 0}).status_code == 422
+    assert client.get("/zones/within", params={"lat": 40.7, "lon": -74.0, "radius_km": 0}).status_code == 422
+
+
+#TESTS REPLICACIÓN LÍDER/RÉPLICA
+
+def test_replication_log_and_snapshot():
+    since = client.get("/changes/latest").json()["seq"]
+    client.post("/zones", json={"id": 970, "borough": "Queens", "zone_name": "Replicada", "lat": 40.7, "lon": -73.8})
+    client.put("/zones/970", json={"active": False})
+
+    log = client.get("/replication/log", params={"since": since}).json()
+    events = [(e["entity"], e["op"], e["id"]) for e in log["events"]]
+    assert events == [("zone", "create", 970), ("zone", "update", 970)]
+    assert not log["truncated"] and log["latest_seq"] == log["events"][-1]["seq"]
+
+    snapshot = client.get("/replication/snapshot").json()
+    zone = next(z for z in snapshot["zones"] if z["id"] == 970)
+    assert zone["active"] is False and snapshot["seq"] >= log["latest_seq"]
+    assert client.get("/replication/status").json()["role"] == "leader"
+
+def test_change_feed_reset_forces_reload():
+    from app.changes import ChangeFeed
+
+    feed = ChangeFeed(capacity=2)
+    for zone_id in (1, 2, 3):
+        feed.publish("zone", "create", zone_id)
+    assert feed.since(0)[1] is True
+    assert [e["id"] for e in feed.since(1)[0]] == [2, 3]
+
+    feed.reset()
+    events, truncated = feed.since(3)
+    assert events == [] and truncated is True
+
+def test_follower_reloads_snapshot_when_leader_epoch_changes(monkeypatch):
+    from app import replication
+
+    loaded, applied = [], []
+    responses = {
+        "/replication/snapshot": [{"epoch": "a", "seq": 5, "zones": [], "routes": [], "next_route_id": 1},
+                                  {"epoch": "b", "seq": 9, "zones": [], "routes": [], "next_route_id": 1}],
+        # El líder reiniciado ya pasó la secuencia vieja: el log no viene truncado
+        "/replication/log": [{"epoch": "b", "truncated": False, "latest_seq": 9,
+                              "events": [{"seq": 6, "entity": "zone", "op": "delete", "id": 1}]}],
+    }
+    monkeypatch.setattr(replication.storage, "load_snapshot", lambda *args: loaded.append(args))
+    monkeypatch.setattr(replication.storage, "apply_change", applied.append)
+
+    follower = replication.Follower("http://leader")
+    monkeypatch.setattr(follower, "_get", lambda path, **params: responses[path].pop(0))
+
+    assert follower.poll(0) == 0
+    assert len(loaded) == 2 and applied == []
+    assert follower.leader_epoch == "b" and follower.applied_seq == 9
+
+def _free_port():
+    import socket
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _serve(port, **env):
+    import os
+    import subprocess
+    import sys
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PREWARM_INGEST="false", **{k.upper(): str(v) for k, v in env.items()})
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning",
+         # Los long polls de las réplicas no retrasan el apagado
+         "--timeout-graceful-shutdown", "1"],
+        cwd=backend_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def _wait_until(check, timeout=30):
+    import time
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return True
+        except Exception:
+            pass
+        time.sleep(0.1)
+    return False
+
+def test_follower_process_replicates_leader():
+    import httpx
+
+    leader_port, follower_port = _free_port(), _free_port()
+    leader_url = f"http://127.0.0.1:{leader_port}"
+    follower_url = f"http://127.0.0.1:{follower_port}"
+    processes = [_serve(leader_port)]
+    try:
+        assert _wait_until(lambda: httpx.get(f"{leader_url}/health").status_code == 200)
+        # Escrituras anteriores a la réplica: llegan con el snapshot
+        httpx.post(f"{leader_url}/zones/", json={"id": 971, "borough": "Bronx", "zone_name": "Origen"})
+        processes.append(_serve(follower_port, replication_leader_url=leader_url, replication_poll_seconds=2))
+        assert _wait_until(lambda: httpx.get(f"{follower_url}/zones/971").status_code == 200)
+
+        # Escrituras posteriores: llegan por el log
+        httpx.post(f"{leader_url}/zones/", json={"id": 972, "borough": "Bronx", "zone_name": "Destino"})
+        route = httpx.post(f"{leader_url}/routes/", json={
+            "pickup_zone_id": 971, "dropoff_zone_id": 972, "name": "Replicada"
+        }).json()
+        assert _wait_until(lambda: httpx.get(f"{follower_url}/routes/{route['id']}").status_code == 200)
+        # La cascada llega como eventos separados (ruta y zona)
+        httpx.delete(f"{leader_url}/zones/971", params={"cascade": "delete"})
+        assert _wait_until(lambda: httpx.get(f"{follower_url}/zones/971").status_code == 404)
+
+        response = httpx.get(f"{follower_url}/stats/")
+        assert response.json()["zones"]["total"] == 1 and response.json()["routes"]["total"] == 0
+        assert "x-replication-lag-seconds" in response.headers
+
+        rejected = httpx.post(f"{follower_url}/zones/", json={"id": 973, "borough": "Bronx", "zone_name": "No"})
+        assert rejected.status_code == 403
+        assert rejected.headers["x-replication-leader"] == leader_url
+
+        status = httpx.get(f"{follower_url}/replication/status").json()
+        assert status["role"] == "follower" and status["snapshots_loaded"] == 1
+        assert status["seq"] == httpx.get(f"{leader_url}/changes/latest").json()["seq"]
+
+        # Reinicio del líder: store vacío y secuencia desde cero; la réplica recarga el snapshot
+        processes[0].terminate()
+        processes[0].wait(timeout=10)
+        processes[0] = _serve(leader_port)
+        assert _wait_until(lambda: httpx.get(f"{leader_url}/health").status_code == 200)
+        httpx.post(f"{leader_url}/zones/", json={"id": 974, "borough": "Bronx", "zone_name": "Nuevo líder"})
+        assert _wait_until(lambda: httpx.get(f"{follower_url}/zones/974").status_code == 200)
+        assert httpx.get(f"{follower_url}/zones/972").status_code == 404
+        status = httpx.get(f"{follower_url}/replication/status").json()
+        assert status["snapshots_loaded"] == 2 and status["in_sync"] is True
+        assert status["leader_epoch"] == httpx.get(f"{leader_url}/replication/snapshot").json()["epoch"]
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+#TESTS MONITOR DEL EVENT LOOP
+
+def test_loop_monitor_attributes_blocking_handler():
+    import time
+    from contextlib import asynccontextmanager
+    from fastapi import FastAPI
+    from app.diagnostics import DiagnosticsMiddleware, LoopMonitor
+
+    monitor = LoopMonitor(interval=0.02, block_threshold=0.1)
+
+    @asynccontextmanager
+    async def lifespan(_):
+        monitor.start()
+        yield
+        monitor.stop()
+
+    blocking_app = FastAPI(lifespan=lifespan)
+    blocking_app.add_middleware(DiagnosticsMiddleware, monitor=monitor)
+
+    @blocking_app.get("/cpu/{n}")
+    async def cpu_bound(n: int):
+        # Trabajo sync dentro de un handler async: bloquea el loop
+        time.sleep(0.4)
+        return {"n": n}
+
+    with TestClient(blocking_app) as blocking_client:
+        time.sleep(0.1)
+        assert blocking_client.get("/cpu/1").status_code == 200
+        time.sleep(0.1)
+        diagnostics = monitor.snapshot()
+
+    assert diagnostics["status"] == "degraded"
+    assert diagnostics["event_loop"]["blocked_total"] >= 1
+    block = diagnostics["blocking"][0]
+    assert block["lag_ms"] >= 300
+    assert block["handler"].endswith("cpu_bound") and block["path"] == "GET /cpu/{n}"
+    # time.sleep es C: la línea más interna es la del handler
+    assert block["location"].endswith("in cpu_bound")
+
+def test_health_diagnostics_reports_loop_and_threadpool():
+    import time
+
+    with TestClient(app) as monitored_client:
+        time.sleep(0.3)
+        response = monitored_client.get("/health/diagnostics")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["running"] is True and body["event_loop"]["samples"] >= 1
+    assert body["threadpool"]["capacity"] > 0 and body["threadpool"]["queued"] == 0
+    assert body["in_flight_requests"] == 1
+
+
+#TESTS PLAN DE INGESTA (mode=plan)
+
+def _trips_file(pairs):
+    buffer = io.BytesIO()
+    pd.DataFrame(pairs, columns=["PULocationID", "DOLocationID"]).to_parquet(buffer, engine="pyarrow")
+    buffer.seek(0)
+    return {"file": ("plan.parquet", buffer, "application/octet-stream")}
+
+def test_plan_mode_reports_changes_without_mutating():
+    _create_zones(975, 976)
+    client.put("/zones/976", json={"active": False})
+    existing = _create_route(975, 976)
+    client.put(f"/routes/{existing}", json={"active": False})
+    pairs = [(975, 976)] * 3 + [(976, 977)] * 2
+    routes_before = len(client.get("/routes").json())
+
+    response = client.post("/uploads/trips-parquet", files=_trips_file(pairs), data={"mode": "plan"})
+
+    assert response.status_code == 200
+    plan = response.json()
+    assert plan["mode"] == "update"
+    assert plan["zones"] == {"create": [977], "update": [975, 976], "reactivate": [976]}
+    assert plan["routes"]["update"] == [
+        {"pickup_zone_id": 975, "dropoff_zone_id": 976, "trips": 3, "route_id": existing,
+         "reactivate": True, "reason": None}
+    ]
+    assert [(r["pickup_zone_id"], r["dropoff_zone_id"]) for r in plan["routes"]["create"]] == [(976, 977)]
+    assert plan["counts"]["routes_to_create"] == 1 and plan["counts"]["zones_to_create"] == 1
+    # Nada cambió en el store
+    assert client.get("/zones/977").status_code == 404
+    assert client.get("/zones/976").json()["active"] is False
+    assert len(client.get("/routes").json()) == routes_before
+
+    applied = client.post(f"/uploads/plans/{plan['plan_token']}/apply")
+    assert applied.status_code == 200
+    assert applied.json()["routes_created"] == 1 and applied.json()["cache_hit"] is True
+    assert applied.json()["zones_updated"] == plan["counts"]["zones_to_update"] == 2
+    assert applied.json()["routes_updated"] == plan["counts"]["routes_to_update"] == 1
+    assert client.get("/zones/977").status_code == 200
+    assert client.get(f"/routes/{existing}").json()["active"] is True
+    # Un plan se aplica una sola vez
+    assert client.post(f"/uploads/plans/{plan['plan_token']}/apply").status_code == 404
+
+def test_plan_apply_can_require_unchanged_store():
+    pairs = [(978, 979)] * 2
+    plan = client.post(
+        "/uploads/trips-parquet", files=_trips_file(pairs), data={"mode": "plan", "plan_mode": "create"}
+    ).json()
+    assert plan["mode"] == "create" and plan["zones"]["create"] == [978, 979]
+
+    _create_zones(980)
+    stale = client.post(f"/uploads/plans/{plan['plan_token']}/apply", params={"require_unchanged": True})
+    assert stale.status_code == 409
+    # El plan sigue disponible para aplicarlo igual
+    assert client.post(f"/uploads/plans/{plan['plan_token']}/apply").json()["zones_created"] == 2
+
+    invalid = client.post("/uploads/trips-parquet", files=_trips_file(pairs), data={"mode": "plan", "plan_mode": "x"})
+    assert invalid.status_code == 400
+
+
+def test_plan_counts_match_applied_counts_on_known_file():
+    pairs = [(981, 982)] * 2 + [(982, 981)]
+    client.post("/uploads/trips-parquet", files=_trips_file(pairs), data={"mode": "update"})
+
+    for plan_mode in ("update", "create"):
+        plan = client.post(
+            "/uploads/trips-parquet", files=_trips_file(pairs), data={"mode": "plan", "plan_mode": plan_mode}
+        ).json()
+        counts = plan["counts"]
+        assert counts["zones_to_reactivate"] == counts["routes_to_reactivate"] == 0
+        applied = client.post(f"/uploads/plans/{plan['plan_token']}/apply").json()
+        assert applied["zones_created"] == counts["zones_to_create"] == 0
+        assert applied["zones_updated"] == counts["zones_to_update"] == 2
+        assert applied["routes_created"] == counts["routes_to_create"] == 0
+        assert applied["routes_updated"] == counts["routes_to_update"] == (2 if plan_mode == "update" else 0)
+        assert counts["routes_unchanged"] == (0 if plan_mode == "update" else 2)
+
+#TESTS REFERENCIA DE ZONAS TLC
+
+def _reference_file(rows, name="taxi_zone_lookup.csv"):
+    text = '"LocationID","Borough","Zone","service_zone"\n'
+    text += "".join(f'{zone_id},"{borough}","{zone}","{service}"\n' for zone_id, borough, zone, service in rows)
+    return {"file": (name, text.encode(), "text/csv")}
+
+def test_zone_reference_upgrades_placeholders():
+    from collections import Counter
+    from app.zone_reference import set_zone_reference
+
+    client.post("/uploads/trips-parquet", files=_trips_file([(985, 986), (986, 987)]), data={"mode": "create"})
+    _create_zones(988)
+    rows = [
+        (985, "Queens", "Astoria", "Boro Zone"),
+        (986, "Bronx", "Bedford Park", "Boro Zone"),
+        (988, "Manhattan", "Midtown", "Yellow Zone"),
+        (989, "Brooklyn", "Bushwick", "Boro Zone"),
+    ]
+    try:
+        response = client.post("/zones/reference", files=_reference_file(rows))
+        assert response.status_code == 200
+        body = response.json()
+        assert body["rows"] == 4 and body["zones_upgraded"] == 2 and body["zones_missing"] == 1
+        assert body["remembered"] is True
+        assert client.get("/zones/985").json()["zone_name"] == "Astoria"
+        assert client.get("/zones/986").json()["borough"] == "Bronx"
+        # Sin overwrite una zona con datos propios no se toca; 987 no está en la referencia
+        assert client.get("/zones/988").json()["zone_name"] != "Midtown"
+        assert client.get("/zones/987").json()["zone_name"] == "Zone 987"
+        zones = client.get("/zones/").json()
+        assert client.get("/stats/").json()["zones"]["by_borough"] == dict(Counter(z["borough"] for z in zones))
+
+        # La ingesta nombra las zonas nuevas con la referencia recordada
+        assert client.get("/zones/reference").json() == {
+            "loaded": True, "source": "taxi_zone_lookup.csv", "rows": 4, "error": None
+        }
+        client.post("/uploads/trips-parquet", files=_trips_file([(985, 989)]), data={"mode": "update"})
+        assert client.get("/zones/989").json()["zone_name"] == "Bushwick"
+
+        overwritten = client.post("/zones/reference", files=_reference_file(rows), data={"overwrite": "true"})
+        assert overwritten.json()["zones_updated"] == 1
+        assert client.get("/zones/988").json()["service_zone"] == "Yellow Zone"
+    finally:
+        set_zone_reference(None)
+
+def test_zone_reference_rejects_invalid_files():
+    bad_columns = {"file": ("lookup.csv", b"id,name\n1,x\n", "text/csv")}
+    assert client.post("/zones/reference", files=bad_columns).status_code == 400
+    wrong_type = {"file": ("lookup.txt", b"x", "text/plain")}
+    assert client.post("/zones/reference", files=wrong_type).status_code == 400
+
+def test_zone_reference_unreadable_lookup_falls_back_to_placeholders(monkeypatch):
+    from app.config import settings
+    from app.zone_reference import set_zone_reference
+
+    monkeypatch.setattr(settings, "taxi_zone_lookup", "/nonexistent/taxi_zone_lookup.csv")
+    set_zone_reference(None)
+    try:
+        response = client.post("/uploads/trips-parquet", files=_trips_file([(990, 991)]), data={"mode": "create"})
+        assert response.status_code == 200
+        assert client.get("/zones/990").json()["zone_name"] == "Zone 990"
+        status = client.get("/zones/reference")
+        assert status.status_code == 200
+        assert status.json()["loaded"] is False
+        assert "/nonexistent/taxi_zone_lookup.csv" in status.json()["error"]
+    finally:
+        monkeypatch.undo()
+        set_zone_reference(None)
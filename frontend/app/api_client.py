@@ -0,0 +1,164 @@
+"""
+api_client.py - Cliente HTTP compartido por todas las páginas.
+Reutiliza un único requests.Session (pool de conexiones keep-alive con
+reintentos acotados) en lugar de abrir una conexión nueva por llamada, cachea
+el health check entre páginas y registra el tiempo de cada petición para el
+panel de depuración de la barra lateral.
+"""
+
+import os
+import time
+import uuid
+from collections import deque
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_URL = os.getenv("API_URL", "http://localhost:8000")
+HEALTH_ENDPOINT = f"{API_URL}/health"
+
+DEFAULT_TIMEOUT = 10
+# Conexiones abiertas que se conservan hacia el backend
+POOL_MAXSIZE = 16
+# Peticiones que se muestran en el panel de depuración
+TIMINGS_KEPT = 50
+
+
+@st.cache_resource
+def get_session():
+    """Session compartida por todas las páginas y usuarios del proceso."""
+    retry = Retry(
+        total=3,
+        connect=3,
+        read=2,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        # POST se reintenta porque post() siempre envía Idempotency-Key:
+        # el backend responde al reintento sin volver a ejecutar la operación
+        allowed_methods=frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS", "POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _record(method, path, status, elapsed):
+    timings = st.session_state.setdefault("_api_timings", deque(maxlen=TIMINGS_KEPT))
+    timings.append({
+        "Método": method,
+        "Ruta": path,
+        "Estado": status,
+        "ms": round(elapsed * 1000, 1),
+    })
+
+
+def request(method, path, **kwargs):
+    """Petición al backend; path es relativo a API_URL (ej. "/zones")."""
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    started = time.perf_counter()
+    try:
+        response = get_session().request(method, f"{API_URL}{path}", **kwargs)
+    except requests.exceptions.RequestException as e:
+        _record(method, path, type(e).__name__, time.perf_counter() - started)
+        raise
+    _record(method, path, response.status_code, time.perf_counter() - started)
+    return response
+
+
+def get(path, **kwargs):
+    return request("GET", path, **kwargs)
+
+
+def post(path, **kwargs):
+    """POST con Idempotency-Key propia: los reintentos no duplican zonas, rutas ni ingestas."""
+    headers = {"Idempotency-Key": uuid.uuid4().hex, **kwargs.pop("headers", {})}
+    return request("POST", path, headers=headers, **kwargs)
+
+
+def put(path, **kwargs):
+    return request("PUT", path, **kwargs)
+
+
+def delete(path, **kwargs):
+    return request("DELETE", path, **kwargs)
+
+
+def get_page(path, params=None, page=1, page_size=50, **kwargs):
+    """
+    Pide una página de un listado paginado (GET /zones, GET /routes).
+    Devuelve (registros, total que cumple los filtros según X-Total-Count).
+    """
+    params = dict(params or {}, limit=page_size, offset=(page - 1) * page_size)
+    response = get(path, params=params, **kwargs)
+    response.raise_for_status()
+    items = response.json()
+    return items, int(response.headers.get("X-Total-Count", len(items)))
+
+
+@st.cache_data(ttl=5, show_spinner=False)
+def check_backend_health():
+    """
+    Verifica si el backend está disponible llamando a GET /health.
+    El resultado se comparte entre páginas durante unos segundos.
+    """
+    try:
+        response = get("/health", timeout=5)
+        if response.status_code == 200:
+            return {
+                "status": "healthy",
+                "message": "Backend funcionando correctamente",
+                "details": response.json() if response.json() else {}
+            }
+        else:
+            return {
+                "status": "error",
+                "message": f"Backend respondió con error: {response.status_code}",
+                "details": response.text[:100] if response.text else ""
+            }
+    except requests.exceptions.ConnectionError:
+        return {
+            "status": "offline",
+            "message": "No se puede conectar al backend",
+            "details": f"URL: {HEALTH_ENDPOINT}"
+        }
+    except requests.exceptions.Timeout:
+        return {
+            "status": "timeout",
+            "message": "El backend no respondió a tiempo",
+            "details": "Timeout después de 5 segundos"
+        }
+    except Exception as e:
+        return {
+            "status": "unknown_error",
+            "message": f"Error inesperado: {str(e)}",
+            "details": str(e)
+        }
+
+
+def health_sidebar():
+    """Estado del backend en la barra lateral (usa el health check cacheado)."""
+    status = check_backend_health()["status"]
+    if status == "healthy":
+        st.sidebar.success("Backend conectado")
+    elif status in ("offline", "timeout"):
+        st.sidebar.error("Backend no disponible")
+    else:
+        st.sidebar.error("Backend con problemas")
+
+
+def debug_sidebar():
+    """Panel con el tiempo de las últimas peticiones al backend."""
+    timings = list(st.session_state.get("_api_timings", ()))
+    with st.sidebar.expander("Depuración: peticiones al backend"):
+        if not timings:
+            st.caption("Sin peticiones registradas")
+            return
+        total_ms = sum(t["ms"] for t in timings)
+        st.caption(f"{len(timings)} peticiones recientes, {total_ms:,.1f} ms en total")
+        st.dataframe(list(reversed(timings)), hide_index=True, use_container_width=True)
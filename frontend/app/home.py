@@ -4,8 +4,9 @@ Muestra título, estado del backend y navegación básica.
 """
 
 import streamlit as st
-import requests
-import os
+
+import api_client
+from api_client import HEALTH_ENDPOINT, check_backend_health
 
 # ============================================
 # CONFIGURACIÓN
@@ -24,54 +25,6 @@ y rutas entre ellas, además de cargar datos reales desde archivos .parquet.
 
 st.markdown("---")  
 
-# ============================================
-# CONFIGURACIÓN DE URL
-# ============================================
-API_URL = os.environ.get("API_URL", "http://localhost:8000")
-HEALTH_ENDPOINT = f"{API_URL}/health"
-
-# ============================================
-# MISMA FUNCIÓN PARA VERIFICAR BACKEND
-# ============================================
-def check_backend_health():
-    """
-    Verifica si el backend está disponible llamando a GET /health
-    Misma función que antes pero solo devuelve estado simple
-    """
-    try:
-        response = requests.get(HEALTH_ENDPOINT, timeout=5)
-        if response.status_code == 200:
-            return {
-                "status": "healthy",
-                "message": "Backend funcionando correctamente",
-                "details": response.json() if response.json() else {}
-            }
-        else:
-            return {
-                "status": "error",
-                "message": f"Backend respondió con error: {response.status_code}",
-                "details": response.text[:100] if response.text else ""
-            }
-    except requests.exceptions.ConnectionError:
-        return {
-            "status": "offline",
-            "message": "No se puede conectar al backend",
-            "details": f"URL: {HEALTH_ENDPOINT}"
-        }
-    except requests.exceptions.Timeout:
-        return {
-            "status": "timeout", 
-            "message": "El backend no respondió a tiempo",
-            "details": "Timeout después de 5 segundos"
-        }
-    except Exception as e:
-        return {
-            "status": "unknown_error",
-            "message": f"Error inesperado: {str(e)}",
-            "details": str(e)
-        }
-
-
 # ============================================
 # ESTADO DEL BACKEND
 # ============================================
@@ -121,4 +74,6 @@ with col3:
                  label="Cargar Datos", 
                  icon="📤",
                  use_container_width=True)
-    st.caption("Subir .parquet")
\ No newline at end of file
+    st.caption("Subir .parquet")
+
+api_client.debug_sidebar()
@@ -1,36 +1,27 @@
 import streamlit as st
 import requests
-import os
 import pandas as pd
 
-# Configuración de URL
-API_URL = os.getenv("API_URL", "http://localhost:8000")
+import api_client
+from pagination import fetch_page, page_controls
+from record_picker import id_picker, zone_label
 
 st.set_page_config(page_title="Gestión de Zonas", layout="wide")
 
 st.title("Gestión de Zonas (Zones)")
 
 # Funciones para conectar con el Backend
-@st.cache_data(ttl=10)
-def get_all_zones_cached():
-    """Obtiene TODAS las zonas (sin filtros, con cache)"""
-    return get_all_zones()
-
-def get_all_zones():
-    """Obtiene TODAS las zonas sin filtros"""
+def get_zone_stats():
+    """Obtiene los conteos de zonas (por municipio, estado, etc.) desde GET /stats/zones"""
     try:
-        response = requests.get(f"{API_URL}/zones", timeout=5)
+        response = api_client.get("/stats/zones", timeout=5)
         response.raise_for_status()
         return response.json()
-    except requests.exceptions.ConnectionError:
-        st.error("No se puede conectar al backend. Asegúrate de que esté ejecutándose.")
-        return []
-    except Exception as e:
-        st.error(f"Error al cargar zonas: {str(e)}")
-        return []
+    except Exception:
+        return {}
 
 def get_filtered_zones(active=None, borough=None):
-    """Obtiene zonas con filtros opcionales (solo para la tabla)"""
+    """Obtiene la página actual de zonas con filtros opcionales (solo para la tabla)"""
     params = {}
     if active is not None:
         params["active"] = active
@@ -38,27 +29,18 @@ def get_filtered_zones(active=None, borough=None):
         params["borough"] = borough
     
     try:
-        response = requests.get(f"{API_URL}/zones", params=params, timeout=5)
-        response.raise_for_status()
-        return response.json()
+        return fetch_page("zones_table", "/zones", params)
     except:
-        return []
+        return [], 0
 
 # Verificar estado del backend en sidebar
-try:
-    health_response = requests.get(f"{API_URL}/health", timeout=2)
-    if health_response.status_code == 200:
-        st.sidebar.success("Backend conectado")
-    else:
-        st.sidebar.error("Backend con problemas")
-except:
-    st.sidebar.error("Backend no disponible")
+api_client.health_sidebar()
 
 #FILTROS DE BÚSQUEDA
 st.subheader("Buscar Zonas")
 
-# Obtener todas las zonas para los borough options
-all_zones_data = get_all_zones_cached()
+# Total de zonas desde las estadísticas del backend (sin descargar la colección)
+total_zones = get_zone_stats().get("total", 0)
 
 # Contenedor para filtros
 with st.container():
@@ -67,9 +49,9 @@ with st.container():
     with col1:
         @st.cache_data(ttl=2)  # Cache corto para que se actualice rápido
         def get_boroughs():
-            zones = get_all_zones()
-            boroughs = list(set([z.get("borough") for z in zones if z.get("borough")]))
-            return sorted([b for b in boroughs if b])
+            # Contadores precalculados en el backend: no hace falta descargar todas las zonas
+            stats = get_zone_stats()
+            return sorted(b for b in stats.get("by_borough", {}) if b)
         
         boroughs_list = get_boroughs()
         borough_options = ["Todos"] + boroughs_list if boroughs_list else ["Todos"]
@@ -114,24 +96,22 @@ if search_button or refresh_button:
 # TABLA DE ZONAS
 st.subheader("Zonas Registradas")
 
-# Obtener datos con filtros
-filtered_zones_data = get_filtered_zones(active=active_filter, borough=borough_filter)
+# Obtener solo la página actual con filtros
+filtered_zones_data, filtered_total = get_filtered_zones(active=active_filter, borough=borough_filter)
 
 if filtered_zones_data:
-    # Preparar datos para la tabla
-    table_data = []
-    for zone in filtered_zones_data:
-        table_data.append({
-            "ID": zone.get("id", ""),
-            "Nombre": zone.get("zone_name", ""),
-            "Municipio": zone.get("borough", ""),
-            "Zona Servicio": zone.get("service_zone", ""),
-            "Estado": "Activa" if zone.get("active", False) else "Inactiva",
-            "Creada": zone.get("created_at", "").split("T")[0] if zone.get("created_at") else ""
-        })
-    
+    # Preparar datos para la tabla por columnas (sin recorrer fila por fila)
+    zones_df = pd.DataFrame(filtered_zones_data)
+    df = pd.DataFrame({
+        "ID": zones_df["id"],
+        "Nombre": zones_df["zone_name"],
+        "Municipio": zones_df["borough"],
+        "Zona Servicio": zones_df["service_zone"],
+        "Estado": zones_df["active"].map({True: "Activa", False: "Inactiva"}),
+        "Creada": zones_df["created_at"].fillna("").str.split("T").str[0],
+    })
+
     # Mostrar tabla
-    df = pd.DataFrame(table_data)
     st.dataframe(
         df,
         use_container_width=True,
@@ -142,12 +122,13 @@ if filtered_zones_data:
         }
     )
 
-    st.caption(f"Mostrando {len(filtered_zones_data)} de {len(all_zones_data)} zonas totales")
+    page_controls("zones_table", filtered_total)
+    st.caption(f"Mostrando {len(filtered_zones_data)} de {filtered_total} zonas filtradas ({total_zones} zonas totales)")
     
 else:
-    if all_zones_data:
+    if total_zones:
         st.info("No se encontraron zonas con los filtros seleccionados.")
-        st.caption(f"Hay {len(all_zones_data)} zonas en el sistema")
+        st.caption(f"Hay {total_zones} zonas en el sistema")
     else:
         st.info("No hay zonas en el sistema. Crea la primera zona usando el formulario abajo.")
 
@@ -246,8 +227,8 @@ if selected_tab == "Crear Zona":
                     # Enviar al backend
                     try:
                         with st.spinner("Creando zona..."):
-                            response = requests.post(
-                                f"{API_URL}/zones", 
+                            response = api_client.post(
+                                "/zones",
                                 json=new_zone,
                                 timeout=10
                             )
@@ -272,144 +253,146 @@ elif selected_tab == "Editar Zona":
     with st.container():
         st.markdown("### Editar Zona Existente")
         
-        all_zones_for_edit = get_all_zones()
+        # La zona se elige por ID con un GET /zones/{id} (por defecto, la primera de la página visible)
+        selected_id, selected_zone = id_picker(
+            "ID de la zona a editar", "/zones", "edit_zone_id", zone_label,
+            default=filtered_zones_data[0]["id"] if filtered_zones_data else None
+        )
         
-        if not all_zones_for_edit:
-            st.info("No hay zonas disponibles para editar.")
+        if selected_zone is None:
+            st.info("Escribe el ID de una zona existente para editarla.")
         else:
-            # Selector de zona
-            zone_options = {z['id']: f"ID: {z['id']} | {z['zone_name']} ({z['borough']})" 
-                           for z in all_zones_for_edit}
-            
-            selected_id = st.selectbox(
-                "Selecciona una zona para editar",
-                options=list(zone_options.keys()),
-                format_func=lambda x: zone_options[x],
-                key="edit_zone_selector_main"
-            )
+            st.info(f"Editando: **{selected_zone['zone_name']}**")
             
-            selected_zone = next((z for z in all_zones_for_edit if z['id'] == selected_id), None)
-            
-            if selected_zone:
-                st.info(f"Editando: **{selected_zone['zone_name']}**")
+            with st.form(key=f"edit_form_{selected_id}"):
+                col1, col2 = st.columns(2)
                 
-                with st.form(key=f"edit_form_{selected_id}"):
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        new_zone_name = st.text_input(
-                            "Nombre de Zona",
-                            value=selected_zone.get('zone_name', ''),
-                            key=f"name_{selected_id}"
-                        )
-                        new_borough = st.text_input(
-                            "Municipio (Borough)",
-                            value=selected_zone.get('borough', ''),
-                            key=f"boro_{selected_id}"
-                        )
+                with col1:
+                    new_zone_name = st.text_input(
+                        "Nombre de Zona",
+                        value=selected_zone.get('zone_name', ''),
+                        key=f"name_{selected_id}"
+                    )
+                    new_borough = st.text_input(
+                        "Municipio (Borough)",
+                        value=selected_zone.get('borough', ''),
+                        key=f"boro_{selected_id}"
+                    )
+                
+                with col2:
+                    new_service_zone = st.text_input(
+                        "Zona de Servicio",
+                        value=selected_zone.get('service_zone', 'Unknown'),
+                        key=f"serv_{selected_id}"
+                    )
+                    new_active = st.checkbox(
+                        "Activa",
+                        value=bool(selected_zone.get('active', True)),
+                        key=f"act_{selected_id}"
+                    )
+                
+                deactivate_routes = st.checkbox(
+                    "Al desactivar la zona, desactivar también sus rutas",
+                    value=True,
+                    key=f"cascade_{selected_id}"
+                )
+
+                update_submitted = st.form_submit_button("Guardar Cambios", type="primary")
+                
+                if update_submitted:
+                    payload = {
+                        "zone_name": new_zone_name.strip(),
+                        "borough": new_borough.strip(),
+                        "service_zone": new_service_zone.strip() if new_service_zone.strip() else "Unknown",
+                        "active": new_active
+                    }
                     
-                    with col2:
-                        new_service_zone = st.text_input(
-                            "Zona de Servicio",
-                            value=selected_zone.get('service_zone', 'Unknown'),
-                            key=f"serv_{selected_id}"
-                        )
-                        new_active = st.checkbox(
-                            "Activa",
-                            value=bool(selected_zone.get('active', True)),
-                            key=f"act_{selected_id}"
+                    try:
+                        response = api_client.put(
+                            f"/zones/{selected_id}",
+                            json=payload,
+                            params={"cascade": "deactivate"} if deactivate_routes else None,
+                            timeout=10
                         )
-                    
-                    update_submitted = st.form_submit_button("Guardar Cambios", type="primary")
-                    
-                    if update_submitted:
-                        payload = {
-                            "zone_name": new_zone_name.strip(),
-                            "borough": new_borough.strip(),
-                            "service_zone": new_service_zone.strip() if new_service_zone.strip() else "Unknown",
-                            "active": new_active
-                        }
-                        
-                        try:
-                            response = requests.put(
-                                f"{API_URL}/zones/{selected_id}",
-                                json=payload,
-                                timeout=10
-                            )
-                            if response.status_code == 200:
-                                st.success("¡Zona actualizada!")
-                                get_all_zones_cached.clear()
-                                st.rerun()
-                            else:
-                                st.error(f"Error: {response.text}")
-                        except Exception as e:
-                            st.error(f"Error de conexión: {e}")
+                        if response.status_code == 200:
+                            st.success("¡Zona actualizada!")
+                            st.rerun()
+                        else:
+                            st.error(f"Error: {response.text}")
+                    except Exception as e:
+                        st.error(f"Error de conexión: {e}")
 
 # ELIMINAR ZONA 
 else:
     with st.container():
         st.markdown("### Eliminar Zona")
         
-        # Obtener TODAS las zonas para eliminar
-        all_zones_for_delete = get_all_zones()
+        selected_id_del, selected_zone_del = id_picker(
+            "ID de la zona a eliminar", "/zones", "delete_zone_id", zone_label,
+            default=filtered_zones_data[0]["id"] if filtered_zones_data else None
+        )
         
-        if not all_zones_for_delete:
-            st.info("No hay zonas disponibles para eliminar.")
+        if selected_zone_del is None:
+            st.info("Escribe el ID de una zona existente para eliminarla.")
         else:
-            # Selector de zona para eliminar
-            zone_options_del = {z['id']: f"{z['id']} - {z['zone_name']} ({z['borough']}) - {'Activa' if z.get('active') else 'Inactiva'}" 
-                               for z in all_zones_for_delete}
-            selected_id_del = st.selectbox(
-                "Selecciona una zona para eliminar",
-                options=list(zone_options_del.keys()),
-                format_func=lambda x: zone_options_del[x],
-                key="delete_zone_select",
-                index=0 if zone_options_del else None
+            # Mostrar información de la zona a eliminar
+            st.warning("**Zona seleccionada para eliminar:**")
+            
+            col_info1, col_info2 = st.columns(2)
+            with col_info1:
+                st.metric("ID", selected_id_del)
+                st.metric("Nombre", selected_zone_del.get('zone_name', ''))
+            with col_info2:
+                st.metric("Municipio", selected_zone_del.get('borough', ''))
+                st.metric("Estado", "Activa" if selected_zone_del.get('active') else "Inactiva")
+            
+            # Qué hacer con las rutas que usan la zona
+            cascade_labels = {
+                "restrict": "No eliminar si tiene rutas",
+                "deactivate": "Desactivar sus rutas",
+                "delete": "Eliminar también sus rutas",
+            }
+            cascade = st.radio(
+                "Rutas asociadas",
+                options=list(cascade_labels.keys()),
+                format_func=lambda x: cascade_labels[x],
+                horizontal=True,
+                key="delete_zone_cascade"
             )
+
+            # Botón de eliminación directa
+            st.divider()
+            st.markdown("### Confirmar eliminación")
             
-            selected_zone_del = next((z for z in all_zones_for_delete if z['id'] == selected_id_del), None)
+            col_btn1, col_btn2 = st.columns(2)
             
-            if selected_zone_del:
-                # Mostrar información de la zona a eliminar
-                st.warning("**Zona seleccionada para eliminar:**")
-                
-                col_info1, col_info2 = st.columns(2)
-                with col_info1:
-                    st.metric("ID", selected_id_del)
-                    st.metric("Nombre", selected_zone_del.get('zone_name', ''))
-                with col_info2:
-                    st.metric("Municipio", selected_zone_del.get('borough', ''))
-                    st.metric("Estado", "Activa" if selected_zone_del.get('active') else "Inactiva")
-                
-                # Botón de eliminación directa
-                st.divider()
-                st.markdown("### Confirmar eliminación")
-                
-                col_btn1, col_btn2 = st.columns(2)
-                
-                with col_btn1:
-                    if st.button("Eliminar Zona", 
-                               type="primary",
-                               use_container_width=True,
-                               key="delete_zone_button"):
+            with col_btn1:
+                if st.button("Eliminar Zona", 
+                           type="primary",
+                           use_container_width=True,
+                           key="delete_zone_button"):
+                    
+                    try:
+                        with st.spinner("Eliminando zona..."):
+                            response = api_client.delete(
+                                f"/zones/{selected_id_del}",
+                                params={"cascade": cascade},
+                                timeout=10
+                            )
                         
-                        try:
-                            with st.spinner("Eliminando zona..."):
-                                response = requests.delete(
-                                    f"{API_URL}/zones/{selected_id_del}",
-                                    timeout=10
-                                )
-                            
-                            if response.status_code == 204:
-                                st.success("Zona eliminada exitosamente!")
-                                st.balloons()
-                                st.rerun()
-                            else:
-                                st.error(f"Error al eliminar: {response.status_code}")
-                        except Exception as e:
-                            st.error(f"Error de conexión: {str(e)}")
-                
-                with col_btn2:
-                    if st.button("Cancelar", use_container_width=True, key="cancel_delete"):
-                        st.rerun()
+                        if response.status_code == 204:
+                            st.success("Zona eliminada exitosamente!")
+                            st.balloons()
+                            st.rerun()
+                        elif response.status_code == 409:
+                            st.error("La zona tiene rutas asociadas. Elige desactivar o eliminar sus rutas.")
+                        else:
+                            st.error(f"Error al eliminar: {response.status_code}")
+                    except Exception as e:
+                        st.error(f"Error de conexión: {str(e)}")
+            
+            with col_btn2:
+                if st.button("Cancelar", use_container_width=True, key="cancel_delete"):
+                    st.rerun()
 
+api_client.debug_sidebar()
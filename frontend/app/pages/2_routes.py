@@ -1,81 +1,38 @@
 import streamlit as st
 import requests
-import os
 import pandas as pd
 from datetime import datetime
 
-# Configuración de URL 
-API_URL = os.getenv("API_URL", "http://localhost:8000")
+import api_client
+from pagination import fetch_page, page_controls
+from record_picker import fetch_zone_names, id_picker, route_label, zone_label
 
 st.set_page_config(page_title="Gestión de Rutas", layout="wide")
 
 st.title("Gestión de Rutas (Routes)")
 
 # Funciones para conectar con el Backend
-@st.cache_data(ttl=10)
-def get_all_routes_cached():
-    return get_all_routes()
-
-def get_all_routes():
-    try:
-        response = requests.get(f"{API_URL}/routes", timeout=5)
-        if response.status_code == 200:
-            return response.json()
-        return []
-    except:
-        return []
-
 def get_filtered_routes(active=None, pickup=None, dropoff=None):
     params = {}
     if active is not None:
         params["active"] = active
-    if pickup is not None and pickup != "Todos":
+    if pickup is not None:
         params["pickup_zone_id"] = pickup
-    if dropoff is not None and dropoff != "Todos":
+    if dropoff is not None:
         params["dropoff_zone_id"] = dropoff
     
     try:
-        response = requests.get(f"{API_URL}/routes", params=params, timeout=5)
-        if response.status_code == 200:
-            return response.json()
-        return []
-    except:
-        return []
-
-def get_zones():
-    try:
-        response = requests.get(f"{API_URL}/zones", timeout=5)
-        if response.status_code == 200:
-            zones = response.json()
-            return sorted(zones, key=lambda x: x.get('zone_name', ''))
-        return []
-    except:
-        return []
-
-def get_zone_info(zone_id):
-    try:
-        response = requests.get(f"{API_URL}/zones/{zone_id}", timeout=3)
-        if response.status_code == 200:
-            return response.json()
-        return None
+        return fetch_page("routes_table", "/routes", params)
     except:
-        return None
+        return [], 0
 
 # Verificar estado del backend
-try:
-    health_response = requests.get(f"{API_URL}/health", timeout=2)
-    if health_response.status_code == 200:
-        st.sidebar.success("Backend conectado")
-    else:
-        st.sidebar.error("Backend con problemas")
-except:
-    st.sidebar.error("Backend no disponible")
+api_client.health_sidebar()
 
 # FILTROS DE BÚSQUEDA
 st.subheader("Buscar Rutas")
 
-# Obtener todas las zonas para los dropdowns
-zones = get_zones()
+# Las zonas se eligen por ID (un GET /zones/{id} por campo), no de una lista con todas
 
 # Contenedor para filtros
 with st.container():
@@ -90,22 +47,13 @@ with st.container():
         )
     
     with col2:
-        # Preparar opciones para dropdown de pickup
-        pickup_options = ["Todos"] + [{"id": z["id"], "name": f"{z['zone_name']} (ID: {z['id']})"} for z in zones]
-        selected_pickup = st.selectbox(
-            "Zona Origen",
-            options=["Todos"] + [z["id"] for z in zones],
-            format_func=lambda x: "Todos" if x == "Todos" else next((f"{z['zone_name']} (ID: {z['id']})" for z in zones if z["id"] == x), f"ID: {x}"),
-            key="pickup_filter_select"
+        pickup_filter, _ = id_picker(
+            "ID Zona Origen", "/zones", "pickup_filter_id", zone_label, help="Vacío para todas"
         )
     
     with col3:
-        # Preparar opciones para dropdown de dropoff
-        selected_dropoff = st.selectbox(
-            "Zona Destino",
-            options=["Todos"] + [z["id"] for z in zones],
-            format_func=lambda x: "Todos" if x == "Todos" else next((f"{z['zone_name']} (ID: {z['id']})" for z in zones if z["id"] == x), f"ID: {x}"),
-            key="dropoff_filter_select"
+        dropoff_filter, _ = id_picker(
+            "ID Zona Destino", "/zones", "dropoff_filter_id", zone_label, help="Vacío para todas"
         )
     
     with col4:
@@ -122,9 +70,6 @@ if selected_status == "Activas":
 elif selected_status == "Inactivas":
     active_filter = False
 
-pickup_filter = selected_pickup if selected_pickup != "Todos" else None
-dropoff_filter = selected_dropoff if selected_dropoff != "Todos" else None
-
 # Botón de búsqueda o refrescar
 if search_button or refresh_button:
     st.rerun()
@@ -132,24 +77,25 @@ if search_button or refresh_button:
 # TABLA DE RUTAS
 st.subheader("Rutas Registradas")
 
-filtered_routes_data = get_filtered_routes(active=active_filter, pickup=pickup_filter, dropoff=dropoff_filter)
+filtered_routes_data, filtered_total = get_filtered_routes(active=active_filter, pickup=pickup_filter, dropoff=dropoff_filter)
 
 if filtered_routes_data:
-    enriched_data = []
-    for route in filtered_routes_data:
-        pickup_zone = get_zone_info(route.get("pickup_zone_id"))
-        dropoff_zone = get_zone_info(route.get("dropoff_zone_id"))
-        
-        enriched_data.append({
-            "ID": route.get("id", ""),
-            "Nombre": route.get("name", ""),
-            "Origen": f"{pickup_zone.get('zone_name', 'N/A') if pickup_zone else 'N/A'} (ID: {route.get('pickup_zone_id')})",
-            "Destino": f"{dropoff_zone.get('zone_name', 'N/A') if dropoff_zone else 'N/A'} (ID: {route.get('dropoff_zone_id')})",
-            "Estado": "Activa" if route.get("active", False) else "Inactiva",
-            "Creada": route.get("created_at", "").split("T")[0] if route.get("created_at") else ""
-        })
-    
-    df = pd.DataFrame(enriched_data)
+    # Tabla construida por columnas; los nombres de zona de la página se piden
+    # juntos con un solo GET /zones?ids=... (antes, uno por origen y destino)
+    routes_df = pd.DataFrame(filtered_routes_data)
+    zone_names = fetch_zone_names(pd.concat([routes_df["pickup_zone_id"], routes_df["dropoff_zone_id"]]))
+
+    def zone_column(ids):
+        return ids.map(zone_names).fillna("N/A") + " (ID: " + ids.astype(str) + ")"
+
+    df = pd.DataFrame({
+        "ID": routes_df["id"],
+        "Nombre": routes_df["name"],
+        "Origen": zone_column(routes_df["pickup_zone_id"]),
+        "Destino": zone_column(routes_df["dropoff_zone_id"]),
+        "Estado": routes_df["active"].map({True: "Activa", False: "Inactiva"}),
+        "Creada": routes_df["created_at"].fillna("").str.split("T").str[0],
+    })
     st.dataframe(
         df,
         use_container_width=True,
@@ -159,7 +105,8 @@ if filtered_routes_data:
             "Estado": st.column_config.TextColumn(width="small"), 
         }
     )
-    st.caption(f"Total: {len(filtered_routes_data)} rutas encontradas")
+    page_controls("routes_table", filtered_total)
+    st.caption(f"Total: {filtered_total} rutas encontradas")
 
 
 # CREAR/EDITAR/ELIMINAR
@@ -178,53 +125,120 @@ if selected_tab == "Crear Ruta":
     with st.container():
         st.markdown("### Crear Nueva Ruta")
         
-        zones = get_zones()
+        # Los IDs de zona van fuera del formulario para mostrar la zona encontrada al escribirlos
+        col1, col2 = st.columns(2)
+        with col1:
+            pu_id, pu_zone = id_picker("ID Zona de Origen *", "/zones", "create_pickup", zone_label)
+        with col2:
+            do_id, do_zone = id_picker("ID Zona de Destino *", "/zones", "create_dropoff", zone_label)
         
-        if not zones:
-            st.warning("No hay zonas disponibles. Crea zonas primero en la página de Zonas.")
+        with st.form("create_route_form", clear_on_submit=True):
+            r_name = st.text_input(
+                "Nombre de la Ruta *", 
+                placeholder="Ej: Manhattan to Brooklyn Express",
+                help="Mínimo 3 caracteres",
+                key="create_route_name"
+            )
+            r_active = st.checkbox("Activa", value=True, key="create_route_active")
+            
+            submitted = st.form_submit_button("Crear Ruta", type="primary", use_container_width=True)
+            
+            if submitted:
+                errors = []
+                if pu_zone is None or do_zone is None:
+                    errors.append("Error: Indica IDs de zonas de origen y destino existentes.")
+                elif pu_id == do_id:
+                    errors.append("Error: La zona de origen y destino no pueden ser iguales.")
+                if len(r_name.strip()) < 3:
+                    errors.append("Error: El nombre debe tener al menos 3 caracteres.")
+                
+                if errors:
+                    for error in errors:
+                        st.error(error)
+                else:
+                    new_route = {
+                        "pickup_zone_id": int(pu_id),
+                        "dropoff_zone_id": int(do_id),
+                        "name": r_name.strip(),
+                        "active": r_active
+                    }
+                    
+                    try:
+                        with st.spinner("Creando ruta..."):
+                            response = api_client.post("/routes", json=new_route, timeout=10)
+                        
+                        if response.status_code in [200, 201]:
+                            st.success("Ruta creada exitosamente!")
+                            st.rerun()
+                        elif response.status_code == 400:
+                            error_detail = response.json().get('detail', 'Error de validación')
+                            st.error(f"Error de validación: {error_detail}")
+                        elif response.status_code == 404:
+                            st.error("Error: Una de las zonas no existe.")
+                        else:
+                            st.error(f"Error del servidor: {response.status_code}")
+                    except requests.exceptions.ConnectionError:
+                        st.error("No se puede conectar al backend.")
+                    except Exception as e:
+                        st.error(f"Error: {str(e)}")
+
+# TAB 2: EDITAR RUTA
+elif selected_tab == "Editar Ruta":
+    with st.container():
+        st.markdown("### Editar Ruta Existente")
+        
+        # La ruta se elige por ID (por defecto, la primera de la página visible de la tabla)
+        selected_id, selected_route = id_picker(
+            "ID de la ruta a editar", "/routes", "edit_route_id", route_label,
+            default=filtered_routes_data[0]["id"] if filtered_routes_data else None
+        )
         
+        if selected_route is None:
+            st.info("Escribe el ID de una ruta existente para editarla.")
         else:
-            with st.form("create_route_form", clear_on_submit=True):
-                zone_options = {z['id']: f"{z['zone_name']} (ID: {z['id']}, {z['borough']})" for z in zones}
-                
-                col1, col2 = st.columns(2)
-                with col1:
-                    pu_id = st.selectbox(
-                        "Zona de Origen *", 
-                        options=list(zone_options.keys()), 
-                        format_func=lambda x: zone_options[x],
-                        key="create_pickup"
-                    )
-                with col2:
-                    do_id = st.selectbox(
-                        "Zona de Destino *", 
-                        options=list(zone_options.keys()), 
-                        format_func=lambda x: zone_options[x],
-                        key="create_dropoff"
-                    )
-                
+            st.info(f"Editando ruta: **{selected_route['name']}**")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                pu_id, pu_zone = id_picker(
+                    "ID Zona de Origen", "/zones", f"pu_{selected_id}", zone_label,
+                    default=selected_route['pickup_zone_id']
+                )
+            with col2:
+                do_id, do_zone = id_picker(
+                    "ID Zona de Destino", "/zones", f"do_{selected_id}", zone_label,
+                    default=selected_route['dropoff_zone_id']
+                )
+            
+            with st.form(key=f"edit_form_route_{selected_id}"):
                 r_name = st.text_input(
-                    "Nombre de la Ruta *", 
-                    placeholder="Ej: Manhattan to Brooklyn Express",
-                    help="Mínimo 3 caracteres",
-                    key="create_route_name"
+                    "Nombre de la Ruta",
+                    value=selected_route.get('name', ''),
+                    key=f"name_{selected_id}"
                 )
-                r_active = st.checkbox("Activa", value=True, key="create_route_active")
                 
-                submitted = st.form_submit_button("Crear Ruta", type="primary", use_container_width=True)
+                r_active = st.checkbox(
+                    "Activa",
+                    value=bool(selected_route.get('active', True)),
+                    key=f"active_{selected_id}" 
+                )
                 
-                if submitted:
-                    errors = []
-                    if pu_id == do_id:
-                        errors.append("Error: La zona de origen y destino no pueden ser iguales.")
-                    if len(r_name.strip()) < 3:
-                        errors.append("Error: El nombre debe tener al menos 3 caracteres.")
-                    
-                    if errors:
-                        for error in errors:
-                            st.error(error)
+                update_submitted = st.form_submit_button(
+                    "Guardar Cambios",
+                    type="primary",
+                    use_container_width=True
+                )
+                
+                if update_submitted:
+                    # Validaciones
+                    if pu_zone is None or do_zone is None:
+                        st.error("Error: Indica IDs de zonas de origen y destino existentes.")
+                    elif pu_id == do_id:
+                        st.error("Error: Origen y destino no pueden ser iguales.")
+                    elif len(r_name.strip()) < 3:
+                        st.error("Error: El nombre debe tener al menos 3 caracteres.")
                     else:
-                        new_route = {
+                        update_data = {
                             "pickup_zone_id": int(pu_id),
                             "dropoff_zone_id": int(do_id),
                             "name": r_name.strip(),
@@ -232,170 +246,53 @@ if selected_tab == "Crear Ruta":
                         }
                         
                         try:
-                            with st.spinner("Creando ruta..."):
-                                response = requests.post(f"{API_URL}/routes", json=new_route, timeout=10)
+                            with st.spinner("Actualizando ruta..."):
+                                response = api_client.put(
+                                    f"/routes/{selected_id}",
+                                    json=update_data,
+                                    timeout=10
+                                )
                             
-                            if response.status_code in [200, 201]:
-                                st.success("Ruta creada exitosamente!")
+                            if response.status_code == 200:
+                                st.success("¡Ruta actualizada exitosamente!")
                                 st.rerun()
-                            elif response.status_code == 400:
-                                error_detail = response.json().get('detail', 'Error de validación')
-                                st.error(f"Error de validación: {error_detail}")
-                            elif response.status_code == 404:
-                                st.error("Error: Una de las zonas no existe.")
                             else:
-                                st.error(f"Error del servidor: {response.status_code}")
-                        except requests.exceptions.ConnectionError:
-                            st.error("No se puede conectar al backend.")
+                                st.error(f"Error: {response.text}")
                         except Exception as e:
-                            st.error(f"Error: {str(e)}")
-
-# TAB 2: EDITAR RUTA
-elif selected_tab == "Editar Ruta":
-    with st.container():
-        st.markdown("### Editar Ruta Existente")
-        
-        all_routes = get_all_routes()
-        
-        if not all_routes:
-            st.info("No hay rutas disponibles para editar.")
-        else:
-            route_options = {}
-            for route in all_routes:
-                route_options[route['id']] = f"ID {route['id']}: {route['name']}"
-            
-            selected_id = st.selectbox(
-                "Selecciona una ruta para editar",
-                options=list(route_options.keys()),
-                format_func=lambda x: route_options[x],
-                key="edit_route_selector_main"
-            )
-            
-            selected_route = next((r for r in all_routes if r['id'] == selected_id), None)
-            
-            if selected_route:
-                st.info(f"Editando ruta: **{selected_route['name']}**")
-                
-                with st.form(key=f"edit_form_route_{selected_id}"):
-                    zones = get_zones()
-                    zone_options = {z['id']: f"{z['zone_name']} (ID: {z['id']})" for z in zones}
-                    
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        # Buscamos el índice actual para el origen
-                        pu_index = 0
-                        ids_list = list(zone_options.keys())
-                        if selected_route['pickup_zone_id'] in ids_list:
-                            pu_index = ids_list.index(selected_route['pickup_zone_id'])
-
-                        pu_id = st.selectbox(
-                            "Zona de Origen", 
-                            options=ids_list, 
-                            format_func=lambda x: zone_options[x],
-                            index=pu_index,
-                            key=f"pu_{selected_id}" 
-                        )
-                    with col2:
-                        # Buscamos el índice actual para el destino
-                        do_index = 0
-                        if selected_route['dropoff_zone_id'] in ids_list:
-                            do_index = ids_list.index(selected_route['dropoff_zone_id'])
-
-                        do_id = st.selectbox(
-                            "Zona de Destino", 
-                            options=ids_list, 
-                            format_func=lambda x: zone_options[x],
-                            index=do_index,
-                            key=f"do_{selected_id}"
-                        )
-                    
-                    r_name = st.text_input(
-                        "Nombre de la Ruta",
-                        value=selected_route.get('name', ''),
-                        key=f"name_{selected_id}"
-                    )
-                    
-                    r_active = st.checkbox(
-                        "Activa",
-                        value=bool(selected_route.get('active', True)),
-                        key=f"active_{selected_id}" 
-                    )
-                    
-                    update_submitted = st.form_submit_button(
-                        "Guardar Cambios",
-                        type="primary",
-                        use_container_width=True
-                    )
-                    
-                    if update_submitted:
-                        # Validaciones
-                        if pu_id == do_id:
-                            st.error("Error: Origen y destino no pueden ser iguales.")
-                        elif len(r_name.strip()) < 3:
-                            st.error("Error: El nombre debe tener al menos 3 caracteres.")
-                        else:
-                            update_data = {
-                                "pickup_zone_id": int(pu_id),
-                                "dropoff_zone_id": int(do_id),
-                                "name": r_name.strip(),
-                                "active": r_active
-                            }
-                            
-                            try:
-                                with st.spinner("Actualizando ruta..."):
-                                    response = requests.put(
-                                        f"{API_URL}/routes/{selected_id}",
-                                        json=update_data,
-                                        timeout=10
-                                    )
-                                
-                                if response.status_code == 200:
-                                    st.success("¡Ruta actualizada exitosamente!")
-                                    get_all_routes_cached.clear() # Limpiar cache de la tabla
-                                    st.rerun()
-                                else:
-                                    st.error(f"Error: {response.text}")
-                            except Exception as e:
-                                st.error(f"Error de conexión: {str(e)}")
+                            st.error(f"Error de conexión: {str(e)}")
 
 # TAB 3: ELIMINAR RUTA
 else:
     with st.container():
         st.markdown("### Eliminar Ruta")
         
-        all_routes = get_all_routes()
+        selected_id, selected_route = id_picker(
+            "ID de la ruta a eliminar", "/routes", "delete_route_id", route_label,
+            default=filtered_routes_data[0]["id"] if filtered_routes_data else None
+        )
         
-        if not all_routes:
-            st.info("No hay rutas disponibles para eliminar.")
+        if selected_route is None:
+            st.info("Escribe el ID de una ruta existente para eliminarla.")
         else:
-            route_options = {r['id']: f"{r['name']} (ID: {r['id']})" for r in all_routes}
-            selected_id = st.selectbox(
-                "Selecciona una ruta para eliminar",
-                options=list(route_options.keys()),
-                format_func=lambda x: route_options[x],
-                key="delete_route_select"
-            )
+            st.warning(f"¿Eliminar ruta: {selected_route['name']}?")
             
-            selected_route = next((r for r in all_routes if r['id'] == selected_id), None)
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("Eliminar", type="primary", use_container_width=True, key="delete_button"):
+                    try:
+                        with st.spinner("Eliminando..."):
+                            response = api_client.delete(f"/routes/{selected_id}", timeout=10)
+                        
+                        if response.status_code == 204:
+                            st.success("Ruta eliminada!")
+                            st.rerun()
+                        else:
+                            st.error(f"Error: {response.status_code}")
+                    except Exception as e:
+                        st.error(f"Error: {str(e)}")
             
-            if selected_route:
-                st.warning(f"¿Eliminar ruta: {selected_route['name']}?")
-                
-                col1, col2 = st.columns(2)
-                with col1:
-                    if st.button("Eliminar", type="primary", use_container_width=True, key="delete_button"):
-                        try:
-                            with st.spinner("Eliminando..."):
-                                response = requests.delete(f"{API_URL}/routes/{selected_id}", timeout=10)
-                            
-                            if response.status_code == 204:
-                                st.success("Ruta eliminada!")
-                                st.rerun()
-                            else:
-                                st.error(f"Error: {response.status_code}")
-                        except Exception as e:
-                            st.error(f"Error: {str(e)}")
-                
-                with col2:
-                    if st.button("Cancelar", use_container_width=True, key="cancel_button"):
-                        st.rerun()
\ No newline at end of file
+            with col2:
+                if st.button("Cancelar", use_container_width=True, key="cancel_button"):
+                    st.rerun()
+
+api_client.debug_sidebar()
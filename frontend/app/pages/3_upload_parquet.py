@@ -1,29 +1,79 @@
 import streamlit as st
 import requests
-import os
 
-# Configuración de URL y Página
-API_URL = os.getenv("API_URL", "http://localhost:8000")
+import api_client
+
+# Configuración de Página
 st.set_page_config(page_title="Carga de Datos Parquet", layout="wide")
 
 st.title("Carga de parquet")
 
+# Tamaño de cada bloque enviado al backend (subida por partes)
+CHUNK_SIZE = 8 * 1024 * 1024
+CHUNK_RETRIES = 3
+
+
+def upload_in_chunks(uploaded_file, progress_bar):
+    """
+    Envía el archivo al backend por bloques usando la sesión de subida resumable.
+    Si un bloque falla, consulta el offset recibido y continúa desde ahí.
+    Devuelve el upload_id de la sesión.
+    """
+    total_size = uploaded_file.size
+    response = api_client.post(
+        "/uploads/sessions",
+        json={"file_name": uploaded_file.name, "total_size": total_size},
+        timeout=10
+    )
+    response.raise_for_status()
+    upload_id = response.json()["upload_id"]
+
+    offset = 0
+    failures = 0
+    while offset < total_size:
+        # Leer solo el bloque actual (sin copiar el archivo completo con getvalue())
+        uploaded_file.seek(offset)
+        chunk = uploaded_file.read(CHUNK_SIZE)
+        try:
+            chunk_response = api_client.put(
+                f"/uploads/sessions/{upload_id}",
+                params={"offset": offset},
+                data=chunk,
+                timeout=60
+            )
+            if chunk_response.status_code == 409:
+                # El backend tiene otro offset: continuar desde el que reporta
+                offset = int(chunk_response.headers.get("Upload-Offset", offset))
+                continue
+            chunk_response.raise_for_status()
+            offset = chunk_response.json()["received_bytes"]
+            failures = 0
+        except requests.exceptions.RequestException:
+            failures += 1
+            if failures > CHUNK_RETRIES:
+                raise
+            # Reanudar desde lo que el backend alcanzó a guardar
+            status = api_client.get(f"/uploads/sessions/{upload_id}", timeout=10)
+            status.raise_for_status()
+            offset = status.json()["received_bytes"]
+
+        progress_bar.progress(min(offset / total_size, 1.0) if total_size else 1.0,
+                              text=f"Subiendo... {offset:,} de {total_size:,} bytes")
+
+    return upload_id
+
+
 # Verificar estado del backend en sidebar 
-try:
-    health_response = requests.get(f"{API_URL}/health", timeout=2)
-    if health_response.status_code == 200:
-        st.sidebar.success("Backend conectado")
-    else:
-        st.sidebar.error("Backend con problemas")
-except:
-    st.sidebar.error("Backend no disponible")
+api_client.health_sidebar()
 
 st.subheader("Configuración de Ingesta")
 
 with st.container():
     col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
     with col1:
-        uploaded_file = st.file_uploader("Selecciona un archivo .parquet", type=["parquet"])
+        uploaded_files = st.file_uploader("Selecciona uno o más archivos .parquet",
+                                          type=["parquet"],
+                                          accept_multiple_files=True)
     with col2:
         limit_rows = st.number_input("Límite filas", 
                                      min_value=1000, 
@@ -34,68 +84,206 @@ with st.container():
     with col3:
         top_n = st.number_input("Top N rutas", min_value=1, max_value=200, value=50)
     with col4:
-        mode = st.selectbox("Modo", options=["create", "update"])
+        mode = st.selectbox("Modo", options=["create", "update", "plan"],
+                            help="plan: muestra qué zonas y rutas cambiarían, sin aplicar nada")
+
+plan_mode = "update"
+if mode == "plan":
+    plan_mode = st.radio("Planificar como", options=["update", "create"], horizontal=True)
+
+with st.expander("Filtros opcionales"):
+    use_dates = st.checkbox("Filtrar por fecha de recogida")
+    col_start, col_end = st.columns(2)
+    with col_start:
+        start_date = st.date_input("Desde (incluida)", disabled=not use_dates)
+    with col_end:
+        end_date = st.date_input("Hasta (excluida)", disabled=not use_dates)
+    zone_ids = st.text_input("IDs de zona (separados por coma)",
+                             placeholder="Ej: 132, 138, 161",
+                             help="Se conservan los viajes cuyo origen o destino esté en la lista")
+    random_sample = st.checkbox("Muestra aleatoria de row groups",
+                                help="Con límite de filas menor que el archivo, lee row groups al azar "
+                                     "en lugar de los primeros")
+    sample_seed = st.number_input("Semilla", min_value=0, value=0, step=1, disabled=not random_sample)
+
+
+def ingest_params():
+    """Parámetros de ingesta que se envían al backend (todos los del formulario)."""
+    payload = {"top_n_routes": top_n, "limit_rows": limit_rows, "mode": mode}
+    if mode == "plan":
+        payload["plan_mode"] = plan_mode
+    if use_dates:
+        payload["start"] = start_date.isoformat()
+        payload["end"] = end_date.isoformat()
+    if zone_ids.strip():
+        payload["zone_ids"] = zone_ids.strip()
+    if random_sample:
+        payload["sample"] = "random_row_groups"
+        payload["seed"] = int(sample_seed)
+    return payload
+
+
+def show_result(data):
+    """Resumen de una ingesta terminada."""
+    m1, m2, m3, m4, m5 = st.columns(5)
+    with m1:
+        # 'rows_read' viene del backend: rows_read = len(df)
+        st.metric("Filas Leídas", f"{data.get('rows_read', 0):,}")
+    with m2:
+        st.metric("Rutas Detectadas", data.get("routes_detected", 0))
+
+    with m3:
+        # Rutas nuevas creadas
+        st.metric("Rutas Creadas", data.get("routes_created", 0))
+    
+    with m4:
+        # Rutas que ya existían y se activaron
+        st.metric("Rutas Actualizadas", data.get("routes_updated", 0))
+    
+    with m5:
+        # Conteo de la lista de errores
+        error_list = data.get("errors", [])
+        st.metric("Errores", len(error_list))
+    
+    # Segunda fila para Zonas 
+    z1, z2 = st.columns(2)
+    with z1:
+        st.info(f"Zonas Creadas: {data.get('zones_created', 0)}")
+    with z2:
+        st.info(f"Zonas Actualizadas: {data.get('zones_updated', 0)}")
+
+    # Manejo de errores (backend devuelve una lista en 'errors')
+    error_list = data.get("errors", [])
+    if error_list:
+        with st.expander(f"Ver {len(error_list)} detalle(s) de errores"):
+            for error in error_list:
+                st.error(error)
+
+
+def show_plan(plan, job_id):
+    """Plan de una subida con mode=plan: qué cambiaría y botón para aplicarlo."""
+    counts = plan["counts"]
+    st.caption(f"Plan en modo {plan['mode']}: no se modificó nada todavía")
+    p1, p2, p3, p4 = st.columns(4)
+    with p1:
+        st.metric("Zonas a crear", counts["zones_to_create"])
+    with p2:
+        st.metric("Zonas a actualizar", counts["zones_to_update"])
+    with p3:
+        st.metric("Rutas a crear", counts["routes_to_create"])
+    with p4:
+        st.metric("Rutas a actualizar", counts["routes_to_update"])
+    st.caption(f"Se reactivan {counts['zones_to_reactivate']} zonas y {counts['routes_to_reactivate']} rutas; "
+               f"sin cambios: {counts['routes_unchanged']} rutas")
+
+    with st.expander("Ver detalle"):
+        st.write("Zonas a crear:", plan["zones"]["create"])
+        st.write("Zonas a reactivar:", plan["zones"]["reactivate"])
+        st.dataframe(plan["routes"]["create"] + plan["routes"]["update"], use_container_width=True)
+
+    applied = st.session_state.applied_plans.get(job_id)
+    if applied is not None:
+        st.success("Plan aplicado")
+        show_result(applied)
+    elif st.button("Aplicar plan", key=f"apply_plan_{job_id}"):
+        response = api_client.post(f"/uploads/plans/{plan['plan_token']}/apply", timeout=60)
+        if response.status_code == 200:
+            st.session_state.applied_plans[job_id] = response.json()
+            st.rerun(scope="fragment")
+        else:
+            st.error(response.json().get("detail", "No se pudo aplicar el plan"))
+
+
+STAGE_LABELS = {
+    "queued": "En cola",
+    "reading": "Leyendo row groups",
+    "aggregating": "Agregando rutas",
+    "applying": "Aplicando zonas y rutas",
+    "planning": "Calculando plan",
+    "done": "Terminado",
+    "failed": "Falló",
+}
+
+# Trabajos lanzados en esta sesión del navegador: [job_id, ...]
+st.session_state.setdefault("upload_jobs", [])
+# Resultado de aplicar el plan de un trabajo: {job_id: resultado}
+st.session_state.setdefault("applied_plans", {})
 
 if st.button("Iniciar Procesamiento", type="primary", use_container_width=True):
-    if uploaded_file is None:
+    if not uploaded_files:
         st.warning("Por favor, selecciona un archivo.")
+    elif use_dates and start_date >= end_date:
+        st.warning("La fecha inicial debe ser anterior a la final.")
     else:
-        with st.spinner("Procesando datos..."):
+        for uploaded_file in uploaded_files:
+            progress_bar = st.progress(0.0, text=f"Subiendo {uploaded_file.name}...")
             try:
-                files = {"file": (uploaded_file.name, uploaded_file.getvalue(), "application/octet-stream")}
-             
-                payload = {"top_n_routes": top_n, "mode": mode}
-                
-                response = requests.post(
-                    f"{API_URL}/uploads/trips-parquet", 
-                    files=files, 
-                    data=payload,  
-                    timeout=60
+                upload_id = upload_in_chunks(uploaded_file, progress_bar)
+                # El backend procesa el archivo en segundo plano y responde de inmediato
+                response = api_client.post(
+                    f"/uploads/sessions/{upload_id}/jobs",
+                    data=ingest_params(),
+                    timeout=30
                 )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    st.success("¡Archivo procesado!")
-                    
-                    st.markdown("---")
-                    st.subheader("Resumen de la Operación")
-                    
-                    m1, m2, m3, m4, m5 = st.columns(5)
-                    with m1:
-                        # 'rows_read' viene del backend: rows_read = len(df)
-                        st.metric("Filas Leídas", f"{data.get('rows_read', 0):,}")
-                    with m2:
-                        st.metric("Rutas Detectadas", data.get("routes_detected", 0))
-
-                    with m3:
-                        # Rutas nuevas creadas
-                        st.metric("Rutas Creadas", data.get("routes_created", 0))
-                    
-                    with m4:
-                        # Rutas que ya existían y se activaron
-                        st.metric("Rutas Actualizadas", data.get("routes_updated", 0))
-                    
-                    with m5:
-                        # Conteo de la lista de errores
-                        error_list = data.get("errors", [])
-                        st.metric("Errores", len(error_list))
-                    
-                    # Segunda fila para Zonas 
-                    st.write("")
-                    z1, z2 = st.columns(2)
-                    with z1:
-                        st.info(f"Zonas Creadas: {data.get('zones_created', 0)}")
-                    with z2:
-                        st.info(f"Zonas Actualizadas: {data.get('zones_updated', 0)}")
-
-                    # Manejo de errores (backend devuelve una lista en 'errors')
-                    error_list = data.get("errors", [])
-                    if error_list:
-                        with st.expander(f"Ver {len(error_list)} detalle(s) de errores"):
-                            for error in error_list:
-                                st.error(error)
-                                
+                if response.status_code == 202:
+                    st.session_state.upload_jobs.append(response.json()["job_id"])
+                    progress_bar.progress(1.0, text=f"{uploaded_file.name}: subido, procesando en segundo plano")
                 else:
-                    st.error(f"Error: {response.json().get('detail', 'Error desconocido')}")
+                    st.error(f"{uploaded_file.name}: {response.json().get('detail', 'Error desconocido')}")
             except Exception as e:
-                st.error(f"Error de conexión: {str(e)}")
\ No newline at end of file
+                st.error(f"Error de conexión: {str(e)}")
+
+
+@st.fragment(run_every=2)
+def show_jobs():
+    """Estado de los trabajos de ingesta; se refresca solo, sin recargar la página."""
+    if not st.session_state.upload_jobs:
+        return
+
+    st.markdown("---")
+    st.subheader("Procesamientos")
+    for job_id in reversed(st.session_state.upload_jobs):
+        try:
+            response = api_client.get(f"/uploads/jobs/{job_id}", timeout=5)
+        except Exception:
+            st.warning("No se pudo consultar el estado de los procesamientos.")
+            return
+        if response.status_code == 404:
+            continue
+        job = response.json()
+
+        with st.container(border=True):
+            st.markdown(f"**{job['file_name']}** · {STAGE_LABELS.get(job['stage'], job['stage'])}")
+            if job["stage"] == "done" and "plan_token" in job["result"]:
+                show_plan(job["result"], job_id)
+            elif job["stage"] == "done":
+                show_result(job["result"])
+            elif job["stage"] == "failed":
+                st.error(f"Error: {job['error']}")
+            else:
+                total = job.get("rows_total") or 0
+                fraction = min(job["rows_processed"] / total, 1.0) if total else 0.0
+                eta = job.get("eta_seconds")
+                st.progress(
+                    fraction,
+                    text=(f"{job['rows_processed']:,} de {total:,} filas · "
+                          f"{job['rows_per_second']:,.0f} filas/s · "
+                          f"ETA {f'{eta:.0f} s' if eta is not None else '--'}")
+                )
+
+    if st.button("Limpiar terminados", key="clear_finished_jobs"):
+        pending = []
+        for job_id in st.session_state.upload_jobs:
+            try:
+                job = api_client.get(f"/uploads/jobs/{job_id}", timeout=5).json()
+            except Exception:
+                job = {}
+            if job.get("stage") not in ("done", "failed", None):
+                pending.append(job_id)
+        st.session_state.upload_jobs = pending
+        st.rerun(scope="fragment")
+
+
+show_jobs()
+
+api_client.debug_sidebar()
@@ -0,0 +1,41 @@
+"""
+pagination.py - Tablas paginadas contra el backend.
+Cada página pide solo limit/offset registros (el total llega en X-Total-Count),
+de modo que el costo de dibujar la tabla no crece con el tamaño de la colección.
+"""
+
+import math
+
+import streamlit as st
+
+import api_client
+
+PAGE_SIZES = [25, 50, 100, 500]
+DEFAULT_PAGE_SIZE = 50
+
+
+def fetch_page(key, path, params=None):
+    """Descarga la página actual de la tabla identificada por key; devuelve (registros, total)."""
+    st.session_state.setdefault(f"{key}_page", 1)
+    st.session_state.setdefault(f"{key}_page_size", DEFAULT_PAGE_SIZE)
+    page = int(st.session_state[f"{key}_page"])
+    page_size = st.session_state[f"{key}_page_size"]
+
+    items, total = api_client.get_page(path, params, page, page_size, timeout=5)
+
+    # Los filtros cambiaron y la página quedó fuera de rango: ir a la última
+    pages = max(1, math.ceil(total / page_size))
+    if page > pages:
+        st.session_state[f"{key}_page"] = pages
+        st.rerun()
+    return items, total
+
+
+def page_controls(key, total):
+    """Selector de página y de filas por página (debajo de la tabla)."""
+    pages = max(1, math.ceil(total / st.session_state[f"{key}_page_size"]))
+    col_page, col_size, _ = st.columns([1, 1, 3])
+    with col_page:
+        st.number_input(f"Página (de {pages})", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    with col_size:
+        st.selectbox("Filas por página", PAGE_SIZES, key=f"{key}_page_size")
@@ -0,0 +1,58 @@
+"""
+record_picker.py - Selección de zonas y rutas por ID en los formularios.
+Los selectores no listan la colección completa: se escribe el ID y el registro
+se busca con un único GET /zones/{id} o /routes/{id}, de modo que dibujar un
+formulario cuesta lo mismo con 100 que con 100.000 registros.
+"""
+
+import requests
+import streamlit as st
+
+import api_client
+
+
+def fetch_record(path, record_id):
+    """Registro path/{record_id}, o None si no existe o el backend no responde."""
+    try:
+        response = api_client.get(f"{path}/{int(record_id)}", timeout=5)
+    except requests.exceptions.RequestException:
+        return None
+    return response.json() if response.status_code == 200 else None
+
+
+def fetch_zone_names(zone_ids):
+    """{id: nombre} de las zonas pedidas con un solo GET /zones?ids=... (las que no existen se omiten)."""
+    zone_ids = sorted({int(zone_id) for zone_id in zone_ids})
+    if not zone_ids:
+        return {}
+    try:
+        response = api_client.get("/zones", params={"ids": ",".join(map(str, zone_ids))}, timeout=5)
+        response.raise_for_status()
+    except requests.exceptions.RequestException:
+        return {}
+    return {zone["id"]: zone["zone_name"] for zone in response.json()}
+
+
+def zone_label(zone):
+    return f"{zone['zone_name']} (ID: {zone['id']}, {zone['borough']})"
+
+
+def route_label(route):
+    return f"{route['name']} (ID: {route['id']}, {route['pickup_zone_id']} → {route['dropoff_zone_id']})"
+
+
+def id_picker(label, path, key, describe, default=None, help=None):
+    """
+    Campo numérico para el ID y, debajo, el registro encontrado.
+    Devuelve (id, registro); (None, None) si el campo está vacío y
+    (id, None) si el ID no existe.
+    """
+    record_id = st.number_input(label, min_value=1, step=1, value=default, key=key, help=help)
+    if record_id is None:
+        return None, None
+    record = fetch_record(path, record_id)
+    if record is None:
+        st.caption(f"No existe el ID {int(record_id)}")
+    else:
+        st.caption(describe(record))
+    return int(record_id), record